@@ -2,10 +2,13 @@
 
 from fastapi import APIRouter
 
+from app.api.admin import router as admin_router
 from app.api.chat import router as chat_router
 from app.api.ejercicios import router as ejercicios_router
 from app.api.registros import router as registros_router
 from app.api.informes import router as informes_router
+from app.api.jobs import router as jobs_router
+from app.api.sync import router as sync_router
 
 # Main API router
 api_router = APIRouter()
@@ -15,5 +18,8 @@ api_router.include_router(chat_router)
 api_router.include_router(ejercicios_router)
 api_router.include_router(registros_router)
 api_router.include_router(informes_router)
+api_router.include_router(jobs_router)
+api_router.include_router(sync_router)
+api_router.include_router(admin_router)
 
 __all__ = ["api_router"]
@@ -0,0 +1,36 @@
+import asyncio
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from app.core.config import Settings, get_settings
+from app.core.profiling import listar_perfiles, ruta_perfil, token_valido
+from app.schemas import PerfilResponse
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def profiling_autorizado(x_profile_token: Optional[str] = Header(default=None)) -> Settings:
+    """Require profiling to be enabled and, if configured, ``X-Profile-Token: <profiling_token>``."""
+    settings = get_settings()
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="El profiling no está activado")
+    if settings.profiling_token and not token_valido(x_profile_token, settings):
+        raise HTTPException(status_code=403, detail="Token de profiling no válido")
+    return settings
+
+
+@router.get("/profiles", response_model=List[PerfilResponse])
+async def get_profiles(settings: Settings = Depends(profiling_autorizado)):
+    """List the saved request profiles, newest first."""
+    return await asyncio.to_thread(listar_perfiles, settings.profiling_dir)
+
+
+@router.get("/profiles/{perfil_id}")
+async def get_profile(perfil_id: str, settings: Settings = Depends(profiling_autorizado)):
+    """Download a profile (speedscope JSON: open it at https://www.speedscope.app)."""
+    ruta = ruta_perfil(settings.profiling_dir, perfil_id)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(ruta, media_type="application/json", filename=ruta.name)
@@ -1,9 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
+from app.api.deps import get_paciente_id, prefer_respond_async
+from app.api.idempotencia import Idempotencia, get_idempotencia
+from app.api.informes import cache_namespace as informes_cache
+from app.cache import CacheBackend, get_cache
+from app.core.deadline import PlazoAgotado
 from app.db import get_session
-from app.repositories import EjercicioRepository, RegistroRepository
+from app.jobs import enqueue
+from app.repositories import EjercicioRepository, EstadoEjercicioRepository, RegistroRepository
 from app.services import get_bedrock_service, BedrockService
 from app.schemas import (
     ChatMessage,
@@ -17,29 +24,60 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
-@router.post("/", response_model=ChatResponse)
+@router.post(
+    "/",
+    response_model=ChatResponse,
+    responses={202: {"model": ChatResponse, "description": "Registros guardados, recomendación encolada"}}
+)
 async def process_chat_message(
     message: ChatMessage,
+    idempotencia: Idempotencia = Depends(get_idempotencia),
     session: AsyncSession = Depends(get_session),
-    bedrock: BedrockService = Depends(get_bedrock_service)
+    paciente_id: str = Depends(get_paciente_id),
+    bedrock: BedrockService = Depends(get_bedrock_service),
+    cache: CacheBackend = Depends(get_cache),
+    asincrono: bool = Depends(prefer_respond_async)
 ):
     """
     Process natural language message and extract exercise data.
     
+    A message may describe a whole session; every exercise is saved in
+    the same transaction and one recommendation covers all of them.
+    With ``Prefer: respond-async`` the recommendation is left to a
+    background job: the response is 202 with ``job_id`` to poll at
+    ``/jobs/{job_id}``.
+    
+    Bedrock calls stop short of the request deadline: a late extraction
+    saves nothing and asks the user to retry, a late recommendation is
+    replaced by the deterministic traffic-light one.
+    
+    A retry with the same ``Idempotency-Key`` gets the first response back
+    (waiting for it if the first request is still running) instead of
+    saving the registros again.
+    
     Example: "Hoy búlgaras 3x10 con 12kg, dolor 2"
     """
+    if idempotencia.respuesta is not None:
+        return idempotencia.respuesta
+    
     try:
         # Extract exercise data from message
-        datos = await bedrock.extraer_datos_ejercicio(message.mensaje)
+        ejercicios_extraidos = await bedrock.extraer_ejercicios(message.mensaje)
+    except PlazoAgotado:
+        return ChatResponse(
+            mensaje="⏱️ El servicio de IA está tardando demasiado. Inténtalo de nuevo en unos segundos.",
+            datos_extraidos=None,
+            registro_guardado=False
+        )
     except Exception as e:
-        logger.error(f"Error al llamar a Bedrock para extraer datos: {e}", exc_info=True)
+        logger.error("Error al llamar a Bedrock para extraer datos: %s", e, exc_info=True)
         return ChatResponse(
             mensaje=f"⚠️ Error al conectar con el servicio de IA: {str(e)}. Verifica la configuración de AWS Bedrock.",
             datos_extraidos=None,
             registro_guardado=False
         )
     
-    if not datos:
+    if not ejercicios_extraidos:
         return ChatResponse(
             mensaje="No pude entender tu mensaje. Por favor, incluye el ejercicio, series, repeticiones, peso y nivel de dolor.",
             datos_extraidos=None,
@@ -47,46 +85,96 @@ async def process_chat_message(
         )
     
     try:
-        # Get or create ejercicio
-        ejercicio_repo = EjercicioRepository(session)
-        ejercicio = await ejercicio_repo.get_or_create(
-            nombre=datos.ejercicio,
+        # Resolve or create all ejercicios in one query
+        ejercicio_repo = EjercicioRepository(session, paciente_id)
+        ejercicios = await ejercicio_repo.get_or_create_many(
+            [datos.ejercicio for datos in ejercicios_extraidos],
             categoria="General"
         )
         
-        # Create registro
-        registro_repo = RegistroRepository(session)
-        registro_data = RegistroCreate(
-            ejercicio_nombre=datos.ejercicio,
-            series=datos.series,
-            reps=datos.reps,
-            peso=datos.peso,
-            dolor_intra=datos.dolor_intra
+        # Create registros
+        registro_repo = RegistroRepository(session, paciente_id)
+        registros = await registro_repo.create_many([
+            (
+                RegistroCreate(
+                    ejercicio_nombre=datos.ejercicio,
+                    series=datos.series,
+                    reps=datos.reps,
+                    peso=datos.peso,
+                    dolor_intra=datos.dolor_intra
+                ),
+                ejercicios[datos.ejercicio].id
+            )
+            for datos in ejercicios_extraidos
+        ])
+        await enqueue(
+            session, paciente_id, "siguiente_sesion",
+            {"ejercicio_ids": list(dict.fromkeys(registro.ejercicio_id for registro in registros))}
         )
         
-        registro = await registro_repo.create(registro_data, ejercicio.id)
+        # Rolling state was updated by create_many(); read it and generate one recommendation
+        estado_repo = EstadoEjercicioRepository(session, paciente_id)
+        entradas = []
+        for datos, registro in zip(ejercicios_extraidos, registros):
+            estado = await estado_repo.get(registro.ejercicio_id)
+            entradas.append({
+                "ejercicio": datos.ejercicio,
+                "dolor_actual": datos.dolor_intra,
+                "historial_dolor": estado.dolores_recientes,
+                "volumen_actual": registro.series * registro.reps * registro.peso
+            })
         
-        # Get pain history and generate recommendation
-        historial_dolor = await registro_repo.get_recent_dolor(ejercicio.id)
-        volumen = registro.series * registro.reps * registro.peso
+        lineas = [
+            f"{datos.ejercicio} - {datos.series}x{datos.reps} @ {datos.peso}kg (Dolor: {datos.dolor_intra}/10)"
+            for datos in ejercicios_extraidos
+        ]
+        if len(lineas) == 1:
+            mensaje = f"✅ Registro guardado: {lineas[0]}"
+        else:
+            mensaje = f"✅ {len(lineas)} registros guardados:\n" + "\n".join(f"- {linea}" for linea in lineas)
         
-        recomendacion = await bedrock.generar_recomendacion(
-            ejercicio=datos.ejercicio,
-            dolor_actual=datos.dolor_intra,
-            historial_dolor=historial_dolor,
-            volumen_actual=volumen
-        )
+        if asincrono:
+            # Queued in this transaction: the job exists only if the registros do
+            job = await enqueue(session, paciente_id, "recomendacion", {"entradas": entradas})
+            respuesta = ChatResponse(
+                mensaje=mensaje,
+                datos_extraidos=ejercicios_extraidos[0],
+                ejercicios_extraidos=ejercicios_extraidos,
+                registro_guardado=True,
+                job_id=job.id
+            )
+            contenido = respuesta.model_dump(mode="json", by_alias=True)
+            cabeceras = {"Location": f"/api/v1/jobs/{job.id}", "Preference-Applied": "respond-async"}
+            await idempotencia.guardar(session, 202, contenido, cabeceras)
+            await session.commit()
+            await cache.invalidate(informes_cache(paciente_id))
+            return JSONResponse(status_code=202, content=contenido, headers=cabeceras)
         
-        return ChatResponse(
-            mensaje=f"✅ Registro guardado: {datos.ejercicio} - {datos.series}x{datos.reps} @ {datos.peso}kg (Dolor: {datos.dolor_intra}/10)",
-            datos_extraidos=datos,
-            registro_guardado=True,
-            recomendacion=recomendacion
+        respuesta = ChatResponse(
+            mensaje=mensaje,
+            datos_extraidos=ejercicios_extraidos[0],
+            ejercicios_extraidos=ejercicios_extraidos,
+            registro_guardado=True
+        )
+        # Committed with the registros: what a retry gets if this request dies waiting on Bedrock
+        await idempotencia.guardar(
+            session, 200, respuesta.model_dump(mode="json", by_alias=True), provisional=True
         )
+        # Saved: end the transaction (state row locks, SQLite's single writer) before waiting on Bedrock
+        await session.commit()
+        # Only now: a report computed before the commit must not be cached as current
+        await cache.invalidate(informes_cache(paciente_id))
+        respuesta.recomendacion = await bedrock.generar_recomendacion_sesion(entradas)
+        await idempotencia.guardar(session, 200, respuesta.model_dump(mode="json", by_alias=True))
+        
+        return respuesta
     except Exception as e:
-        logger.error(f"Error al procesar registro de ejercicio: {e}", exc_info=True)
+        logger.error("Error al procesar registro de ejercicio: %s", e, exc_info=True)
+        # All or nothing: do not let get_session commit a partial session
+        await session.rollback()
         return ChatResponse(
             mensaje=f"⚠️ Error al guardar el registro: {str(e)}",
-            datos_extraidos=datos,
+            datos_extraidos=ejercicios_extraidos[0],
+            ejercicios_extraidos=ejercicios_extraidos,
             registro_guardado=False
         )
@@ -0,0 +1,33 @@
+"""Shared FastAPI dependencies for the API routers."""
+
+import re
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.core.config import get_settings
+
+_PACIENTE_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def get_paciente_id(
+    x_paciente_id: Optional[str] = Header(default=None, description="Paciente al que pertenecen los datos")
+) -> str:
+    """Resolve the patient a request acts on (``X-Paciente-Id`` header or the default patient)."""
+    if x_paciente_id is None:
+        return get_settings().default_paciente_id
+    if not _PACIENTE_ID_RE.match(x_paciente_id):
+        raise HTTPException(status_code=400, detail="Identificador de paciente no válido")
+    return x_paciente_id
+
+
+def prefer_respond_async(
+    prefer: Optional[str] = Header(default=None, description='"respond-async" para procesar la IA en segundo plano')
+) -> bool:
+    """Whether the client asked for asynchronous processing (``Prefer: respond-async``, RFC 7240)."""
+    if not prefer:
+        return False
+    return any(
+        preferencia.split(";")[0].strip().lower() == "respond-async"
+        for preferencia in prefer.split(",")
+    )
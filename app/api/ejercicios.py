@@ -2,19 +2,21 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.db import get_session
-from app.repositories import EjercicioRepository
-from app.schemas import EjercicioCreate, EjercicioResponse
+from app.api.deps import get_paciente_id
+from app.db import get_session, get_read_session
+from app.repositories import EjercicioRepository, PrescripcionRepository
+from app.schemas import EjercicioCreate, EjercicioResponse, SiguienteSesionResponse
 
 router = APIRouter(prefix="/ejercicios", tags=["ejercicios"])
 
 
 @router.get("/", response_model=List[EjercicioResponse])
 async def get_all_ejercicios(
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
     """Get all ejercicios."""
-    repo = EjercicioRepository(session)
+    repo = EjercicioRepository(session, paciente_id)
     ejercicios = await repo.get_all()
     return ejercicios
 
@@ -22,10 +24,11 @@ async def get_all_ejercicios(
 @router.get("/{ejercicio_id}", response_model=EjercicioResponse)
 async def get_ejercicio(
     ejercicio_id: str,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
     """Get ejercicio by ID."""
-    repo = EjercicioRepository(session)
+    repo = EjercicioRepository(session, paciente_id)
     ejercicio = await repo.get_by_id(ejercicio_id)
     
     if not ejercicio:
@@ -34,13 +37,33 @@ async def get_ejercicio(
     return ejercicio
 
 
+@router.get("/{ejercicio_id}/siguiente-sesion", response_model=SiguienteSesionResponse)
+async def get_siguiente_sesion(
+    ejercicio_id: str,
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
+):
+    """
+    Get the suggested load for the next session of an ejercicio.
+    
+    Precomputed by a background job after each registro or dolor_24h
+    update (traffic light on the last session, capped by the latest 24h
+    response); ``registro_id`` tells which session it is based on.
+    """
+    prescripcion = await PrescripcionRepository(session, paciente_id).get(ejercicio_id)
+    if not prescripcion:
+        raise HTTPException(status_code=404, detail="No hay prescripción para este ejercicio todavía")
+    return prescripcion
+
+
 @router.post("/", response_model=EjercicioResponse, status_code=201)
 async def create_ejercicio(
     data: EjercicioCreate,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
     """Create new ejercicio."""
-    repo = EjercicioRepository(session)
+    repo = EjercicioRepository(session, paciente_id)
     
     # Check if already exists
     existing = await repo.get_by_nombre(data.nombre)
@@ -57,10 +80,11 @@ async def create_ejercicio(
 @router.get("/buscar/{nombre}", response_model=EjercicioResponse)
 async def search_ejercicio_by_name(
     nombre: str,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
     """Search ejercicio by name."""
-    repo = EjercicioRepository(session)
+    repo = EjercicioRepository(session, paciente_id)
     ejercicio = await repo.get_by_nombre(nombre)
     
     if not ejercicio:
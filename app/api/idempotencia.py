@@ -0,0 +1,207 @@
+"""Idempotency keys for the POSTs that clients retry.
+
+Mobile clients retry ``POST /chat/`` and ``POST /registros/`` on timeouts.
+Sent with an ``Idempotency-Key`` header (any string of up to 255
+characters, e.g. a UUID per user action), a retry never repeats the work:
+
+- the first request reserves the key in ``claves_idempotencia``, in its own
+  short transaction so that retries see it at once, for
+  ``idempotency_bloqueo`` seconds;
+- the route stores its response with ``Idempotencia.guardar`` in the same
+  transaction as its writes. Retries arriving meanwhile check the key every
+  ``idempotency_sondeo`` seconds (within their own deadline) and then get
+  that response back, marked ``Idempotent-Replayed: true``, for
+  ``idempotency_ttl`` seconds;
+- a request that ends without storing a response (an error, or a Bedrock
+  failure that asks the user to try again) releases the key; the key of a
+  request that died is taken over once its reservation lapses;
+- reusing a key for a different body or route is rejected with 422.
+
+The chat commits its registros before waiting on the recommendation, so it
+stores a provisional response (without the recommendation) in that
+transaction: if it dies while waiting, retries get back the registros it
+saved instead of saving them again.
+
+The route must declare this dependency before its ``get_session`` one, so
+the key is released only after the request's transaction has committed or
+failed.
+"""
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import get_paciente_id
+from app.core.config import get_settings
+from app.db import get_session_factory
+from app.models import ClaveIdempotencia, EstadoIdempotencia
+from app.repositories import IdempotenciaRepository
+
+logger = logging.getLogger(__name__)
+
+HEADER_REPLAYED = "Idempotent-Replayed"
+MAX_LONGITUD_CLAVE = 255
+
+
+def _terminada(fila: ClaveIdempotencia, ahora: datetime) -> bool:
+    """Whether the request behind ``fila`` is over and its response can be replayed."""
+    if fila.estado == EstadoIdempotencia.COMPLETADA.value:
+        return True
+    # Died after storing a provisional response
+    return fila.status_code is not None and fila.bloqueada_hasta <= ahora
+
+
+def _respuesta_guardada(fila: ClaveIdempotencia) -> JSONResponse:
+    return JSONResponse(
+        status_code=fila.status_code,
+        content=fila.respuesta,
+        headers={**(fila.cabeceras or {}), HEADER_REPLAYED: "true"}
+    )
+
+
+class Idempotencia:
+    """Idempotency-Key state of one request (see the module docstring)."""
+    
+    def __init__(self, paciente_id: str, clave: Optional[str] = None, huella: str = ""):
+        self.paciente_id = paciente_id
+        self.clave = clave
+        self.huella = huella
+        # Reservation held by this request
+        self.intento: Optional[str] = None
+        # Response of an earlier request with the same key: return it instead of running the route
+        self.respuesta: Optional[JSONResponse] = None
+        self.guardada = False
+    
+    async def reservar(self, session_factory: sessionmaker) -> None:
+        """
+        Reserve the key, or wait for the request holding it and take its response.
+        
+        The key is polled on the primary: a lagging replica would show a
+        finished request as still in progress.
+        """
+        settings = get_settings()
+        while True:
+            async with session_factory() as session:
+                fila, reservada = await IdempotenciaRepository(session, self.paciente_id).reservar(
+                    self.clave, self.huella, settings.idempotency_bloqueo, settings.idempotency_ttl
+                )
+                await session.commit()
+            if reservada:
+                self.intento = fila.intento
+                return
+            
+            while fila is not None:
+                ahora = datetime.utcnow()
+                if fila.expira_en <= ahora:
+                    break
+                if fila.huella != self.huella:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="La Idempotency-Key ya se usó con otra petición"
+                    )
+                if _terminada(fila, ahora):
+                    self.respuesta = _respuesta_guardada(fila)
+                    return
+                if fila.bloqueada_hasta <= ahora:
+                    # Its request died: take the key over
+                    break
+                await asyncio.sleep(settings.idempotency_sondeo)
+                async with session_factory() as session:
+                    fila = await IdempotenciaRepository(session, self.paciente_id).get(self.clave)
+            # Released, expired or abandoned: try to reserve it again
+    
+    async def guardar(
+        self,
+        session: AsyncSession,
+        status_code: int,
+        respuesta,
+        cabeceras: Optional[dict] = None,
+        provisional: bool = False
+    ) -> None:
+        """
+        Store the response in ``session``'s transaction (nothing without Idempotency-Key).
+        
+        Args:
+            session: The request's write session
+            status_code: HTTP status of the response
+            respuesta: JSON body
+            cabeceras: Headers to send again with the body (e.g. ``Location``)
+            provisional: Response to replay if the request dies before storing
+                the final one; retries keep waiting meanwhile
+        """
+        if self.intento is None:
+            return
+        guardada = await IdempotenciaRepository(session, self.paciente_id).guardar(
+            self.clave, self.intento, status_code, respuesta, cabeceras,
+            get_settings().idempotency_ttl, provisional=provisional
+        )
+        if not guardada:
+            logger.warning("Idempotency key %s lapsed before its response was stored", self.clave)
+        self.guardada = guardada and not provisional
+    
+    async def liberar(self, session_factory: sessionmaker) -> None:
+        """Release the reservation of a request that ended without a final response."""
+        try:
+            async with session_factory() as session:
+                await IdempotenciaRepository(session, self.paciente_id).liberar(self.clave, self.intento)
+                await session.commit()
+        except Exception as e:
+            # The reservation lapses on its own
+            logger.warning("Idempotency key %s could not be released: %s", self.clave, e)
+
+
+async def get_idempotencia(
+    request: Request,
+    idempotency_key: Optional[str] = Header(
+        default=None, description="Clave única de la acción: los reintentos con la misma clave no la repiten"
+    ),
+    paciente_id: str = Depends(get_paciente_id),
+    session_factory: sessionmaker = Depends(get_session_factory)
+) -> AsyncIterator[Idempotencia]:
+    """Reserve the request's ``Idempotency-Key`` (see the module docstring)."""
+    if idempotency_key is None:
+        yield Idempotencia(paciente_id)
+        return
+    if not 0 < len(idempotency_key) <= MAX_LONGITUD_CLAVE or not idempotency_key.isprintable():
+        raise HTTPException(status_code=400, detail="Idempotency-Key no válida")
+    
+    cuerpo = await request.body()
+    huella = hashlib.sha256(f"{request.method} {request.url.path}\n".encode() + cuerpo).hexdigest()
+    idempotencia = Idempotencia(paciente_id, idempotency_key, huella)
+    await idempotencia.reservar(session_factory)
+    if idempotencia.intento is None:
+        yield idempotencia
+        return
+    
+    try:
+        yield idempotencia
+    except BaseException:
+        await idempotencia.liberar(session_factory)
+        raise
+    if not idempotencia.guardada:
+        await idempotencia.liberar(session_factory)
+
+
+async def purgar_claves_caducadas(session_factory: sessionmaker, intervalo: float = 3600) -> None:
+    """
+    Background task: delete expired idempotency keys every ``intervalo`` seconds.
+    
+    Runs until cancelled (from the application lifespan).
+    """
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            async with session_factory() as session:
+                borradas = await IdempotenciaRepository(session).purgar()
+                await session.commit()
+            if borradas:
+                logger.info("Purged %s expired idempotency keys", borradas)
+        except Exception as e:
+            logger.error("Failed to purge idempotency keys: %s", e, exc_info=True)
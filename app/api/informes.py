@@ -1,49 +1,116 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, Path
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from app.db import get_session
+from app.api.deps import get_paciente_id, prefer_respond_async
+from app.api.jobs import job_aceptado
+from app.cache import CacheBackend, get_cache
+from app.db import get_read_session, get_session_factory
+from app.jobs import enqueue
 from app.repositories import RegistroRepository
-from app.services import get_bedrock_service, BedrockService
-from app.schemas import TendenciaData, InformeMensual
+from app.services import (
+    get_bedrock_service,
+    get_series,
+    BedrockService,
+    calcular_metricas_carga,
+    preparar_informe_mensual
+)
+from app.schemas import TendenciaData, InformeCarga, InformeMensual, JobResponse
 
 router = APIRouter(prefix="/informes", tags=["informes"])
 
 
+def cache_namespace(paciente_id: str) -> str:
+    """Cache namespace for a patient's report data derived from registros."""
+    return f"informes:{paciente_id}"
+
+
 @router.get("/tendencias/{ejercicio_id}", response_model=List[TendenciaData])
 async def get_tendencias(
     ejercicio_id: str,
     limit: int = Query(default=30, le=100),
-    session: AsyncSession = Depends(get_session)
+    desde: Optional[datetime] = Query(default=None, description="Sesiones desde esta fecha (incluida)"),
+    hasta: Optional[datetime] = Query(default=None, description="Sesiones anteriores a esta fecha"),
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
-    """Get trend data for a specific ejercicio (for charts)."""
-    repo = RegistroRepository(session)
-    registros = await repo.get_by_ejercicio(ejercicio_id, limit=limit)
+    """
+    Get trend data for a specific ejercicio (for charts).
     
-    return [
-        TendenciaData(
-            fecha=r.fecha,
-            volumen_total=r.series * r.reps * r.peso,
-            dolor_intra=r.dolor_intra,
-            dolor_24h=r.dolor_24h
-        )
-        for r in reversed(registros)  # Chronological order
-    ]
+    The latest ``limit`` sessions in ``[desde, hasta)``, in chronological
+    order, served from the in-memory series store.
+    """
+    serie = (await get_series().obtener(session, paciente_id)).ejercicio(ejercicio_id)
+    if serie is None:
+        return []
+    return serie.tendencia(limit, desde, hasta)
+
+
+@router.get("/carga/{ejercicio_id}", response_model=InformeCarga)
+async def get_carga(
+    ejercicio_id: str,
+    semanas: int = Query(default=12, ge=1, le=520),
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id),
+    cache: CacheBackend = Depends(get_cache)
+):
+    """
+    Training-load report over the full history of an ejercicio.
+    
+    Returns the current acute:chronic workload ratio and the weekly load,
+    monotony and strain of the last ``semanas`` weeks.
+    """
+    async def calcular():
+        serie = (await get_series().obtener(session, paciente_id)).ejercicio(ejercicio_id)
+        if serie is None:
+            return None
+        metricas = calcular_metricas_carga(serie.carga_diaria(), semanas=semanas)
+        if metricas is None:
+            return None
+        return InformeCarga(ejercicio_id=ejercicio_id, **metricas).model_dump(mode="json")
+    
+    # ACWR is relative to today, so entries also expire with the TTL
+    informe = await cache.get_or_set(
+        cache_namespace(paciente_id), f"carga:{ejercicio_id}:{semanas}", calcular, ttl=300
+    )
+    if informe is None:
+        raise HTTPException(status_code=404, detail="No hay registros para este ejercicio")
+    return informe
 
 
-@router.get("/mensual/{year}/{month}", response_model=InformeMensual)
+@router.get(
+    "/mensual/{year}/{month}",
+    response_model=InformeMensual,
+    responses={202: {"model": JobResponse, "description": "Informe encolado (Prefer: respond-async)"}}
+)
 async def get_monthly_report(
     year: int = Path(...),
     month: int = Path(..., ge=1, le=12),
-    session: AsyncSession = Depends(get_session),
-    bedrock: BedrockService = Depends(get_bedrock_service)
+    session: AsyncSession = Depends(get_read_session),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    paciente_id: str = Depends(get_paciente_id),
+    bedrock: BedrockService = Depends(get_bedrock_service),
+    asincrono: bool = Depends(prefer_respond_async)
 ):
-    """Generate monthly executive report with AI analysis."""
+    """
+    Generate monthly executive report with AI analysis.
+    
+    With ``Prefer: respond-async`` the report is generated by a background
+    job: the response is 202 with the job, to be polled at ``Location``.
+    """
     if year < 2020 or year > 2030:
         raise HTTPException(status_code=400, detail="Año fuera de rango válido")
     
-    repo = RegistroRepository(session)
+    if asincrono:
+        # Queue on the primary in its own short transaction (this route reads from the replica)
+        async with session_factory() as escritura:
+            job = await enqueue(escritura, paciente_id, "informe_mensual", {"year": year, "month": month})
+            await escritura.commit()
+        return job_aceptado(job)
+    
+    repo = RegistroRepository(session, paciente_id)
     registros = await repo.get_monthly_data(year, month)
     
     if not registros:
@@ -53,28 +120,7 @@ async def get_monthly_report(
         )
     
     # Prepare data for AI analysis
-    ejercicios_set = set()
-    datos_para_ia = []
-    tendencias = []
-    
-    for r in registros:
-        ejercicios_set.add(r.ejercicio.nombre)
-        volumen = r.series * r.reps * r.peso
-        
-        datos_para_ia.append({
-            "fecha": r.fecha.isoformat(),
-            "ejercicio": r.ejercicio.nombre,
-            "volumen": volumen,
-            "dolor_intra": r.dolor_intra,
-            "dolor_24h": r.dolor_24h
-        })
-        
-        tendencias.append(TendenciaData(
-            fecha=r.fecha,
-            volumen_total=volumen,
-            dolor_intra=r.dolor_intra,
-            dolor_24h=r.dolor_24h
-        ))
+    datos_para_ia, tendencias, ejercicios_analizados = preparar_informe_mensual(registros)
     
     # Generate AI summary
     periodo = f"{month:02d}/{year}"
@@ -82,7 +128,7 @@ async def get_monthly_report(
     
     return InformeMensual(
         periodo=periodo,
-        ejercicios_analizados=len(ejercicios_set),
+        ejercicios_analizados=ejercicios_analizados,
         total_sesiones=len(registros),
         resumen=resumen,
         tendencias=tendencias
@@ -91,28 +137,17 @@ async def get_monthly_report(
 
 @router.get("/estadisticas")
 async def get_estadisticas_generales(
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id),
+    cache: CacheBackend = Depends(get_cache)
 ):
-    """Get general statistics."""
-    repo = RegistroRepository(session)
-    
-    # Get all registros
-    registros = await repo.get_all(limit=1000)
-    pendientes = await repo.get_pending_dolor_24h()
-    
-    if not registros:
-        return {
-            "total_registros": 0,
-            "pendientes_dolor_24h": 0,
-            "promedio_dolor_intra": 0,
-            "ultimo_registro": None
-        }
+    """
+    Get general statistics (cached until the next registro write).
     
-    dolor_total = sum(r.dolor_intra for r in registros)
+    ``promedio_dolor_intra`` is over the latest 1000 sessions.
+    """
+    async def calcular():
+        return (await get_series().obtener(session, paciente_id)).estadisticas(ventana=1000)
     
-    return {
-        "total_registros": len(registros),
-        "pendientes_dolor_24h": len(pendientes),
-        "promedio_dolor_intra": round(dolor_total / len(registros), 2),
-        "ultimo_registro": registros[0].fecha if registros else None
-    }
+    # Short TTL: pendientes_dolor_24h also changes as registros age past 24h
+    return await cache.get_or_set(cache_namespace(paciente_id), "estadisticas", calcular, ttl=60)
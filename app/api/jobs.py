@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import get_paciente_id
+from app.db import get_session_factory
+from app.models import Job
+from app.repositories import JobRepository
+from app.schemas import JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def job_aceptado(job: Job) -> JSONResponse:
+    """202 response for a job queued by ``Prefer: respond-async``, pointing at its status URL."""
+    return JSONResponse(
+        status_code=202,
+        content=JobResponse.model_validate(job).model_dump(mode="json"),
+        headers={"Location": f"/api/v1/jobs/{job.id}", "Preference-Applied": "respond-async"}
+    )
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    session_factory: sessionmaker = Depends(get_session_factory),
+    paciente_id: str = Depends(get_paciente_id)
+):
+    """
+    Poll a background job.
+    
+    Read from the primary: a replica may not have the job yet right after
+    it was queued.
+    """
+    async with session_factory() as session:
+        job = await JobRepository(session, paciente_id).get_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
@@ -1,9 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+from typing import List, Literal, Optional
 
-from app.db import get_session
+from app.api.deps import get_paciente_id
+from app.api.idempotencia import Idempotencia, get_idempotencia
+from app.api.informes import cache_namespace as informes_cache
+from app.api.responses import respuesta_filas
+from app.cache import CacheBackend, get_cache
+from app.db import get_session, get_read_session, get_read_session_factory
+from app.jobs import enqueue
 from app.repositories import RegistroRepository, EjercicioRepository
+from app.services.export_service import EXPORTERS, MEDIA_TYPES, parquet_disponible
 from app.schemas import (
     RegistroCreate, 
     RegistroResponse, 
@@ -17,88 +27,82 @@ router = APIRouter(prefix="/registros", tags=["registros"])
 async def get_all_registros(
     limit: int = Query(default=100, le=500),
     offset: int = Query(default=0, ge=0),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
     """Get all registros with pagination."""
-    repo = RegistroRepository(session)
-    registros = await repo.get_all(limit=limit, offset=offset)
-    
-    return [
-        RegistroResponse(
-            id=r.id,
-            fecha=r.fecha,
-            series=r.series,
-            reps=r.reps,
-            peso=r.peso,
-            dolor_intra=r.dolor_intra,
-            dolor_24h=r.dolor_24h,
-            notas=r.notas,
-            ejercicio_nombre=r.ejercicio.nombre,
-            volumen_total=r.series * r.reps * r.peso
-        )
-        for r in registros
-    ]
+    repo = RegistroRepository(session, paciente_id)
+    return respuesta_filas(await repo.get_all_filas(limit=limit, offset=offset))
 
 
 @router.get("/pendientes", response_model=List[RegistroResponse])
 async def get_pending_dolor_24h(
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
     """Get registros pending dolor_24h update (more than 24h old)."""
-    repo = RegistroRepository(session)
-    registros = await repo.get_pending_dolor_24h()
+    repo = RegistroRepository(session, paciente_id)
+    return respuesta_filas(await repo.get_pending_dolor_24h_filas())
+
+
+@router.get("/export")
+async def export_registros(
+    format: Literal["csv", "ndjson", "parquet"] = Query(default="csv"),
+    desde: Optional[datetime] = Query(default=None),
+    hasta: Optional[datetime] = Query(default=None),
+    ejercicio_id: Optional[str] = Query(default=None),
+    session_factory: sessionmaker = Depends(get_read_session_factory),
+    paciente_id: str = Depends(get_paciente_id)
+):
+    """
+    Export the full registro history as CSV, NDJSON or Parquet.
     
-    return [
-        RegistroResponse(
-            id=r.id,
-            fecha=r.fecha,
-            series=r.series,
-            reps=r.reps,
-            peso=r.peso,
-            dolor_intra=r.dolor_intra,
-            dolor_24h=r.dolor_24h,
-            notas=r.notas,
-            ejercicio_nombre=r.ejercicio.nombre,
-            volumen_total=r.series * r.reps * r.peso
+    Rows are streamed from a server-side cursor into a chunked response,
+    so memory use does not depend on the size of the export.
+    """
+    if format == "parquet" and not parquet_disponible():
+        raise HTTPException(
+            status_code=501,
+            detail="La exportación Parquet requiere pyarrow instalado en el servidor"
         )
-        for r in registros
-    ]
+    
+    async def batches():
+        async with session_factory() as session:
+            repo = RegistroRepository(session, paciente_id)
+            async for batch in repo.stream_for_export(
+                desde=desde,
+                hasta=hasta,
+                ejercicio_id=ejercicio_id
+            ):
+                yield batch
+    
+    return StreamingResponse(
+        EXPORTERS[format](batches()),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="registros.{format}"'}
+    )
 
 
 @router.get("/ejercicio/{ejercicio_id}", response_model=List[RegistroResponse])
 async def get_registros_by_ejercicio(
     ejercicio_id: str,
     limit: int = Query(default=50, le=200),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
     """Get registros for a specific ejercicio."""
-    repo = RegistroRepository(session)
-    registros = await repo.get_by_ejercicio(ejercicio_id, limit=limit)
-    
-    return [
-        RegistroResponse(
-            id=r.id,
-            fecha=r.fecha,
-            series=r.series,
-            reps=r.reps,
-            peso=r.peso,
-            dolor_intra=r.dolor_intra,
-            dolor_24h=r.dolor_24h,
-            notas=r.notas,
-            ejercicio_nombre=r.ejercicio.nombre,
-            volumen_total=r.series * r.reps * r.peso
-        )
-        for r in registros
-    ]
+    repo = RegistroRepository(session, paciente_id)
+    return respuesta_filas(await repo.get_by_ejercicio_filas(ejercicio_id, limit=limit))
 
 
 @router.get("/{registro_id}", response_model=RegistroResponse)
 async def get_registro(
     registro_id: int,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
 ):
     """Get registro by ID."""
-    repo = RegistroRepository(session)
+    repo = RegistroRepository(session, paciente_id)
     registro = await repo.get_by_id(registro_id)
     
     if not registro:
@@ -121,11 +125,22 @@ async def get_registro(
 @router.post("/", response_model=RegistroResponse, status_code=201)
 async def create_registro(
     data: RegistroCreate,
-    session: AsyncSession = Depends(get_session)
+    idempotencia: Idempotencia = Depends(get_idempotencia),
+    session: AsyncSession = Depends(get_session),
+    paciente_id: str = Depends(get_paciente_id),
+    cache: CacheBackend = Depends(get_cache)
 ):
-    """Create new registro."""
-    ejercicio_repo = EjercicioRepository(session)
-    registro_repo = RegistroRepository(session)
+    """
+    Create new registro.
+    
+    A retry with the same ``Idempotency-Key`` gets the first response back
+    instead of creating the registro again.
+    """
+    if idempotencia.respuesta is not None:
+        return idempotencia.respuesta
+    
+    ejercicio_repo = EjercicioRepository(session, paciente_id)
+    registro_repo = RegistroRepository(session, paciente_id)
     
     # Get or create ejercicio
     ejercicio = await ejercicio_repo.get_or_create(
@@ -134,8 +149,10 @@ async def create_registro(
     )
     
     registro = await registro_repo.create(data, ejercicio.id)
+    # The next-session prescription is recomputed by a worker once this commits
+    await enqueue(session, paciente_id, "siguiente_sesion", {"ejercicio_ids": [ejercicio.id]})
     
-    return RegistroResponse(
+    respuesta = RegistroResponse(
         id=registro.id,
         fecha=registro.fecha,
         series=registro.series,
@@ -147,22 +164,31 @@ async def create_registro(
         ejercicio_nombre=ejercicio.nombre,
         volumen_total=registro.series * registro.reps * registro.peso
     )
+    await idempotencia.guardar(session, 201, respuesta.model_dump(mode="json", by_alias=True))
+    # Invalidate once committed: a report computed before the commit must not be cached as current
+    await session.commit()
+    await cache.invalidate(informes_cache(paciente_id))
+    return respuesta
 
 
 @router.patch("/{registro_id}/dolor-24h", response_model=RegistroResponse)
 async def update_dolor_24h(
     registro_id: int,
     data: RegistroUpdate,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    paciente_id: str = Depends(get_paciente_id),
+    cache: CacheBackend = Depends(get_cache)
 ):
     """Update dolor_24h for a registro."""
-    repo = RegistroRepository(session)
+    repo = RegistroRepository(session, paciente_id)
     registro = await repo.update_dolor_24h(registro_id, data.dolor_24h)
     
     if not registro:
         raise HTTPException(status_code=404, detail="Registro no encontrado")
     
-    return RegistroResponse(
+    await enqueue(session, paciente_id, "siguiente_sesion", {"ejercicio_ids": [registro.ejercicio_id]})
+    
+    respuesta = RegistroResponse(
         id=registro.id,
         fecha=registro.fecha,
         series=registro.series,
@@ -174,3 +200,6 @@ async def update_dolor_24h(
         ejercicio_nombre=registro.ejercicio.nombre,
         volumen_total=registro.series * registro.reps * registro.peso
     )
+    await session.commit()
+    await cache.invalidate(informes_cache(paciente_id))
+    return respuesta
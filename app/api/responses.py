@@ -0,0 +1,35 @@
+"""Response helpers for the list endpoints."""
+
+import importlib.util
+from typing import Any, Sequence
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Row
+
+from app.core.config import get_settings
+
+
+def orjson_disponible() -> bool:
+    """Whether the optional orjson package is installed."""
+    return importlib.util.find_spec("orjson") is not None
+
+
+def respuesta_filas(filas: Sequence[Row]) -> Any:
+    """
+    Build a list response from row tuples shaped like the response model.
+    
+    By default the rows are returned as dicts and validated once by the
+    route's ``response_model``. With ``fast_json_responses`` (and orjson
+    installed) they are serialised straight to JSON: the values come from
+    the database already typed, so the validation pass is skipped.
+    
+    Args:
+        filas: Rows whose labels match the response model's fields
+        
+    Returns:
+        A list of dicts or an ``ORJSONResponse``
+    """
+    contenido = [fila._asdict() for fila in filas]
+    if get_settings().fast_json_responses and orjson_disponible():
+        return ORJSONResponse(contenido)
+    return contenido
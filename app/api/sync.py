@@ -0,0 +1,68 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_paciente_id
+from app.db import get_read_session
+from app.repositories import (
+    ENTIDAD_EJERCICIO,
+    ENTIDAD_REGISTRO,
+    CambioRepository,
+    EjercicioRepository,
+    RegistroRepository
+)
+from app.schemas import SyncResponse
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("", response_model=SyncResponse)
+async def sync(
+    since: Optional[int] = Query(default=None, ge=0, description="Token de la sincronización anterior (sin él: todo)"),
+    limit: int = Query(default=1000, ge=1, le=10000, description="Máximo de cambios por respuesta"),
+    cursor: Optional[int] = Query(default=None, ge=0, description="Siguiente página de una instantánea"),
+    session: AsyncSession = Depends(get_read_session),
+    paciente_id: str = Depends(get_paciente_id)
+):
+    """
+    Ejercicios and registros inserted or updated since ``since``.
+    
+    Without ``since`` (or with a token from another database) the response
+    is a full snapshot with ``completo=true``. Otherwise only the changed entities are
+    returned; while ``hay_mas`` is true, call again with the new token.
+    
+    Snapshots are paged by registro ID, ``limit`` registros per page (the
+    ejercicios come in the first one). While ``hay_mas`` is true, call again
+    with the returned ``token`` and ``cursor``. The token stays the one of
+    the first page, so the delta after the last page returns every write
+    made meanwhile (rows changed after it was taken may come twice).
+    """
+    cambios = CambioRepository(session, paciente_id)
+    ejercicio_repo = EjercicioRepository(session, paciente_id)
+    registro_repo = RegistroRepository(session, paciente_id)
+    
+    ultimo = await cambios.ultimo()
+    if since is None or since > ultimo or cursor is not None:
+        # Rows written before the change log existed have no entries: snapshot everything
+        primera = cursor is None or since is None or since > ultimo
+        filas = await registro_repo.get_filas_tras_id(0 if primera else cursor, limit + 1)
+        hay_mas = len(filas) > limit
+        filas = filas[:limit]
+        return SyncResponse(
+            token=ultimo if primera else since,
+            completo=primera,
+            hay_mas=hay_mas,
+            cursor=filas[-1].id if hay_mas else None,
+            ejercicios=await ejercicio_repo.get_all() if primera else [],
+            registros=filas
+        )
+    
+    ids, token, hay_mas = await cambios.desde(since, limit)
+    return SyncResponse(
+        token=token,
+        completo=False,
+        hay_mas=hay_mas,
+        ejercicios=await ejercicio_repo.get_by_ids(ids[ENTIDAD_EJERCICIO]),
+        registros=await registro_repo.get_filas_by_ids([int(i) for i in ids[ENTIDAD_REGISTRO]])
+    )
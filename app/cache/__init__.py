@@ -0,0 +1,19 @@
+"""Shared cache backends (in-memory, SQLite file, Redis protocol)."""
+
+from app.cache.cache import (
+    CacheBackend,
+    MemoryCache,
+    SQLiteCache,
+    RedisCache,
+    create_cache,
+    get_cache
+)
+
+__all__ = [
+    "CacheBackend",
+    "MemoryCache",
+    "SQLiteCache",
+    "RedisCache",
+    "create_cache",
+    "get_cache"
+]
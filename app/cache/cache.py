@@ -0,0 +1,388 @@
+"""Shared cache abstraction with pluggable backends.
+
+All backends store serialized bytes under namespaced keys. Invalidating a
+namespace bumps a generation counter that is part of every key, so stale
+entries become unreachable at once on every worker and simply age out
+through their TTL (or LRU eviction).
+"""
+
+import asyncio
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+from app.core.config import get_settings, Settings
+
+
+class JsonSerializer:
+    """JSON serializer (portable, human-readable)."""
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    """orjson serializer (fastest JSON; requires the optional orjson package)."""
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value, default=str)
+
+    def loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class PickleSerializer:
+    """Pickle serializer (any Python object; only for trusted cache servers)."""
+    name = "pickle"
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class CacheBackend(ABC):
+    """Base class for cache backends: namespacing, TTLs and serialization."""
+
+    def __init__(
+        self,
+        serializer=None,
+        default_ttl: Optional[float] = None,
+        prefix: str = "physiotrainer:"
+    ):
+        self.serializer = serializer or JsonSerializer()
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    @abstractmethod
+    async def _get_raw(self, key: str) -> Optional[bytes]:
+        """Return the stored bytes for ``key`` or None if missing/expired."""
+
+    @abstractmethod
+    async def _set_raw(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        """Store ``value`` under ``key`` with an optional TTL in seconds."""
+
+    @abstractmethod
+    async def _delete_raw(self, key: str) -> None:
+        """Remove ``key`` if present."""
+
+    @abstractmethod
+    async def _incr(self, key: str) -> int:
+        """Atomically increment an integer counter and return the new value."""
+
+    async def close(self) -> None:
+        """Release backend resources."""
+
+    async def _generation(self, namespace: str) -> int:
+        raw = await self._get_raw(f"{self.prefix}ns:{namespace}")
+        return int(raw) if raw else 0
+
+    async def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{await self._generation(namespace)}:{key}"
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Get a cached value, or None if missing."""
+        raw = await self._get_raw(await self._key(namespace, key))
+        return None if raw is None else self.serializer.loads(raw)
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None
+    ) -> None:
+        """Cache a value; ``ttl`` defaults to the backend's ``default_ttl``."""
+        await self._set_raw(
+            await self._key(namespace, key),
+            self.serializer.dumps(value),
+            ttl if ttl is not None else self.default_ttl
+        )
+
+    async def delete(self, namespace: str, key: str) -> None:
+        """Remove a single cached value."""
+        await self._delete_raw(await self._key(namespace, key))
+
+    async def invalidate(self, namespace: str) -> None:
+        """Invalidate every key of a namespace."""
+        await self._incr(f"{self.prefix}ns:{namespace}")
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Return the cached value or compute it with ``factory`` and cache it.
+        
+        The value is stored under the generation read before computing it,
+        so a result computed while the namespace is invalidated is dropped
+        with the old generation instead of being served as current.
+        """
+        clave = await self._key(namespace, key)
+        raw = await self._get_raw(clave)
+        if raw is not None:
+            return self.serializer.loads(raw)
+        value = await factory()
+        await self._set_raw(clave, self.serializer.dumps(value), ttl if ttl is not None else self.default_ttl)
+        return value
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU cache with TTLs."""
+
+    def __init__(self, max_entries: int = 10_000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[Optional[float], bytes]] = OrderedDict()
+
+    async def _get_raw(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def _set_raw(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def _delete_raw(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def _incr(self, key: str) -> int:
+        raw = await self._get_raw(key)
+        value = int(raw) + 1 if raw else 1
+        self._data[key] = (None, str(value).encode())
+        return value
+
+
+class SQLiteCache(CacheBackend):
+    """File-backed cache shared by all workers on a single host."""
+
+    # Purge expired rows every N writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+
+    def _run(self, fn, *args):
+        with self._lock:
+            return fn(*args)
+
+    def _get_sync(self, key: str) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_sync(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        self._conn.execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, value, expires_at)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def _incr_sync(self, key: str) -> int:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            value = int(row[0]) + 1 if row else 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, NULL)",
+                (key, str(value).encode())
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return value
+
+    async def _get_raw(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._run, self._get_sync, key)
+
+    async def _set_raw(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        await asyncio.to_thread(self._run, self._set_sync, key, value, ttl)
+
+    async def _delete_raw(self, key: str) -> None:
+        await asyncio.to_thread(self._run, self._conn.execute, "DELETE FROM cache WHERE key = ?", (key,))
+
+    async def _incr(self, key: str) -> int:
+        return await asyncio.to_thread(self._run, self._incr_sync, key)
+
+    async def close(self) -> None:
+        self._run(self._conn.close)
+
+
+class RedisProtocolError(Exception):
+    """Error reply or malformed data from a Redis-protocol server."""
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache on any server speaking the Redis protocol (RESP2).
+
+    Implements the handful of commands the cache needs directly on asyncio
+    streams, so no client library is required.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", **kwargs):
+        super().__init__(**kwargs)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", str(self.db))
+
+    @staticmethod
+    def _encode(*parts) -> bytes:
+        out = [f"*{len(parts)}\r\n".encode()]
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisProtocolError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            return [await self._read_reply() for _ in range(int(payload))]
+        raise RedisProtocolError(f"Unexpected reply: {line!r}")
+
+    async def _send(self, *parts):
+        self._writer.write(self._encode(*parts))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def execute(self, *parts):
+        """Run one command, reconnecting once if the connection dropped."""
+        async with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._writer is None:
+                        await self._connect()
+                    return await self._send(*parts)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    self._writer = None
+                    if attempt == 2:
+                        raise
+
+    async def _get_raw(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def _set_raw(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        if ttl:
+            await self.execute("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            await self.execute("SET", key, value)
+
+    async def _delete_raw(self, key: str) -> None:
+        await self.execute("DEL", key)
+
+    async def _incr(self, key: str) -> int:
+        return await self.execute("INCR", key)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+SERIALIZERS = {
+    "json": JsonSerializer,
+    "orjson": OrjsonSerializer,
+    "pickle": PickleSerializer
+}
+
+
+def create_cache(settings: Settings) -> CacheBackend:
+    """Build the cache backend selected by ``settings.cache_backend``."""
+    kwargs = {
+        "serializer": SERIALIZERS[settings.cache_serializer](),
+        "default_ttl": settings.cache_default_ttl
+    }
+    if settings.cache_backend == "memory":
+        return MemoryCache(max_entries=settings.cache_max_entries, **kwargs)
+    if settings.cache_backend == "sqlite":
+        path = settings.cache_url or os.path.join(os.getcwd(), "physiotrainer-cache.db")
+        return SQLiteCache(path, **kwargs)
+    if settings.cache_backend == "redis":
+        return RedisCache(settings.cache_url or "redis://localhost:6379/0", **kwargs)
+    raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+
+
+# Singleton instance - lazy initialization like the Bedrock service
+_cache: Optional[CacheBackend] = None
+
+
+def get_cache() -> CacheBackend:
+    """Get the shared cache backend (lazy initialization)."""
+    global _cache
+    if _cache is None:
+        _cache = create_cache(get_settings())
+    return _cache
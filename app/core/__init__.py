@@ -1,5 +1,37 @@
 """Core module for application configuration and utilities."""
 
+from app.core.admission import AdmissionMiddleware, ControlAdmision, get_control_admision
 from app.core.config import Settings, get_settings
+from app.core.deadline import (
+    DeadlineMiddleware,
+    PlazoAgotado,
+    con_plazo,
+    plazo,
+    plazo_actual,
+    registrar_plazo_agotado,
+    tiempo_restante
+)
+from app.core.logs import RequestIdMiddleware, configurar_logging, request_id_actual
+from app.core.metrics import Metricas, metricas
+from app.core.profiling import ProfilingMiddleware
 
-__all__ = ["Settings", "get_settings"]
+__all__ = [
+    "AdmissionMiddleware",
+    "ControlAdmision",
+    "get_control_admision",
+    "Settings",
+    "get_settings",
+    "DeadlineMiddleware",
+    "PlazoAgotado",
+    "con_plazo",
+    "plazo",
+    "plazo_actual",
+    "registrar_plazo_agotado",
+    "tiempo_restante",
+    "RequestIdMiddleware",
+    "configurar_logging",
+    "request_id_actual",
+    "Metricas",
+    "metricas",
+    "ProfilingMiddleware"
+]
@@ -0,0 +1,229 @@
+"""Inbound admission control.
+
+``AdmissionMiddleware`` decides, before routing, whether an ``/api/``
+request is served:
+
+1. Per-client token bucket. Every client (its IP, or the first value of
+   ``admission_cliente_cabecera`` behind a proxy) earns
+   ``admission_tasa`` tokens per second up to ``admission_rafaga``. An AI
+   request (``admission_rutas_ia``: Bedrock calls, slow reports) costs
+   ``admission_coste_ia`` tokens and any other request costs
+   ``admission_coste_crud``. A client without enough tokens gets ``429``
+   with ``Retry-After`` set to the time needed to earn them.
+2. Concurrency caps. At most ``admission_concurrencia`` requests run at
+   once, and at most ``admission_concurrencia_ia`` of them are AI requests,
+   so slow Bedrock calls can never take every slot from cheap requests.
+   Requests over a cap wait in a short FIFO queue (``admission_cola``
+   places, ``admission_espera_max`` seconds); past that they get ``429``.
+
+State is per process, like the rest of the in-memory caches.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import metricas
+
+CLASE_IA = "ia"
+CLASE_CRUD = "crud"
+METRICA_RECHAZOS = "physiotrainer_admission_rejected_total"
+METRICA_ESPERA = "physiotrainer_admission_wait_seconds"
+
+metricas.describir(METRICA_RECHAZOS, "Requests shed with 429, by class and reason (cuota, concurrencia).")
+metricas.describir(METRICA_ESPERA, "Time admitted requests spent queued for a concurrency slot.")
+
+
+class LimitadorConcurrencia:
+    """
+    Concurrency cap with a bounded FIFO queue.
+    
+    Freed slots are handed straight to the oldest waiter, so a burst of
+    new arrivals cannot overtake queued requests. Uses plain futures
+    rather than ``asyncio.Semaphore`` so one instance can serve several
+    event loops over its lifetime (tests, benchmarks).
+    """
+    
+    def __init__(self, capacidad: int, cola: int, espera_max: float):
+        """
+        Args:
+            capacidad: Requests allowed to run at once
+            cola: Requests allowed to wait for a slot
+            espera_max: Seconds a request waits before being rejected
+        """
+        self.capacidad = capacidad
+        self.cola = cola
+        self.espera_max = espera_max
+        self.activos = 0
+        self._esperando: deque[asyncio.Future] = deque()
+    
+    async def entrar(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False if the request must be shed."""
+        if self.activos < self.capacidad and not self._esperando:
+            self.activos += 1
+            return True
+        if len(self._esperando) >= self.cola:
+            return False
+        
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperando.append(futuro)
+        try:
+            # The slot is transferred by salir(); wait_for returns it even if it lands on the timeout
+            await asyncio.wait_for(futuro, self.espera_max)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            if futuro.done() and not futuro.cancelled():
+                self.salir()
+            raise
+        finally:
+            if futuro in self._esperando:
+                self._esperando.remove(futuro)
+    
+    def salir(self) -> None:
+        """Release a slot, handing it to the oldest waiter if any."""
+        while self._esperando:
+            futuro = self._esperando.popleft()
+            if not futuro.done():
+                futuro.set_result(None)
+                return
+        self.activos -= 1
+
+
+class ControlAdmision:
+    """Token buckets per client plus the concurrency caps (see the module docstring)."""
+    
+    def __init__(self, settings: Settings):
+        self.tasa = settings.admission_tasa
+        self.coste_ia = settings.admission_coste_ia
+        self.coste_crud = settings.admission_coste_crud
+        # A request costing more than the burst could never be admitted
+        self.rafaga = max(settings.admission_rafaga, self.coste_ia, self.coste_crud)
+        self.rutas_ia = tuple(settings.admission_rutas_ia)
+        self.max_clientes = settings.admission_max_clientes
+        self.cabecera = settings.admission_cliente_cabecera.lower().encode()
+        # client -> [tokens, time.monotonic() of the last update], least recently seen first
+        self._cubos: OrderedDict[str, list[float]] = OrderedDict()
+        self.global_ = LimitadorConcurrencia(
+            settings.admission_concurrencia, settings.admission_cola, settings.admission_espera_max
+        )
+        self.ia = LimitadorConcurrencia(
+            settings.admission_concurrencia_ia, settings.admission_cola, settings.admission_espera_max
+        )
+    
+    def cliente(self, scope) -> str:
+        """Identity the token bucket is kept for."""
+        if self.cabecera:
+            for nombre, valor in scope["headers"]:
+                if nombre == self.cabecera:
+                    # X-Forwarded-For: client, proxy1, proxy2
+                    return valor.decode("latin-1").split(",")[0].strip()
+        cliente = scope.get("client")
+        return cliente[0] if cliente else "-"
+    
+    def clase(self, ruta: str) -> Optional[str]:
+        """``CLASE_IA``, ``CLASE_CRUD``, or None for routes outside admission control."""
+        if not ruta.startswith("/api/"):
+            return None
+        return CLASE_IA if ruta.startswith(self.rutas_ia) else CLASE_CRUD
+    
+    def consumir(self, cliente: str, coste: float) -> float:
+        """
+        Charge ``coste`` tokens to ``cliente``.
+        
+        Returns:
+            0 if the request is admitted, otherwise the seconds until the
+            client has earned enough tokens
+        """
+        ahora = time.monotonic()
+        cubo = self._cubos.get(cliente)
+        if cubo is None:
+            cubo = self._cubos[cliente] = [self.rafaga, ahora]
+            if len(self._cubos) > self.max_clientes:
+                # Forgotten clients start again with a full bucket
+                self._cubos.popitem(last=False)
+        else:
+            self._cubos.move_to_end(cliente)
+        
+        tokens = min(self.rafaga, cubo[0] + (ahora - cubo[1]) * self.tasa)
+        cubo[1] = ahora
+        if tokens >= coste:
+            cubo[0] = tokens - coste
+            return 0.0
+        cubo[0] = tokens
+        return (coste - tokens) / self.tasa
+
+
+_control: Optional[ControlAdmision] = None
+
+
+def get_control_admision() -> ControlAdmision:
+    """Process-wide admission state (lazy initialization)."""
+    global _control
+    if _control is None:
+        _control = ControlAdmision(get_settings())
+    return _control
+
+
+def reset_control_admision() -> None:
+    """Drop the admission state so it is rebuilt from the current settings."""
+    global _control
+    _control = None
+
+
+def _rechazo(clase: str, motivo: str, retry_after: float) -> JSONResponse:
+    metricas.incrementar(METRICA_RECHAZOS, clase=clase, motivo=motivo)
+    detalle = (
+        "Demasiadas peticiones: espera antes de reintentar"
+        if motivo == "cuota"
+        else "Servidor saturado: reintenta en unos segundos"
+    )
+    return JSONResponse(
+        status_code=429,
+        content={"detail": detalle},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionMiddleware:
+    """ASGI middleware shedding load with ``429`` (see the module docstring)."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().admission_control:
+            await self.app(scope, receive, send)
+            return
+        control = get_control_admision()
+        clase = control.clase(scope["path"])
+        if clase is None:
+            await self.app(scope, receive, send)
+            return
+        
+        coste = control.coste_ia if clase == CLASE_IA else control.coste_crud
+        espera = control.consumir(control.cliente(scope), coste)
+        if espera > 0:
+            await _rechazo(clase, "cuota", espera)(scope, receive, send)
+            return
+        
+        limitadores = [control.ia, control.global_] if clase == CLASE_IA else [control.global_]
+        inicio = time.monotonic()
+        tomados = []
+        try:
+            for limitador in limitadores:
+                if not await limitador.entrar():
+                    await _rechazo(clase, "concurrencia", limitador.espera_max)(scope, receive, send)
+                    return
+                tomados.append(limitador)
+            metricas.observar(METRICA_ESPERA, time.monotonic() - inicio, clase=clase)
+            await self.app(scope, receive, send)
+        finally:
+            for limitador in tomados:
+                limitador.salir()
@@ -0,0 +1,198 @@
+"""End-to-end request deadlines.
+
+``DeadlineMiddleware`` gives every HTTP request a deadline: the route's
+default from ``Settings.request_deadlines`` (longest matching path prefix,
+``request_deadline`` otherwise), or the ``X-Request-Deadline-Ms`` header
+capped at ``request_deadline_max``. The deadline lives in a context
+variable, so code further down the call stack reads the remaining budget
+without it being passed around:
+
+- database sessions on PostgreSQL set ``statement_timeout`` to it;
+- Bedrock calls give up ``request_deadline_reserva`` seconds before it so
+  the route can still answer with its deterministic fallback;
+- when it expires, the middleware cancels whatever is left of the request
+  and answers 504.
+
+Every miss is counted in ``physiotrainer_deadline_exceeded_total`` by
+route prefix and stage.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import metricas
+
+HEADER_DEADLINE = "X-Request-Deadline-Ms"
+METRICA_PLAZO_AGOTADO = "physiotrainer_deadline_exceeded_total"
+
+metricas.describir(
+    METRICA_PLAZO_AGOTADO,
+    "Requests whose deadline expired, by route prefix and stage (request, bedrock, db)."
+)
+
+T = TypeVar("T")
+
+
+class PlazoAgotado(Exception):
+    """The request deadline expired before the work finished."""
+
+
+@dataclass(frozen=True)
+class Plazo:
+    """Deadline of the current request."""
+    
+    expira: float  # time.monotonic() value
+    ruta: str  # Metric label: the matched prefix of Settings.request_deadlines, or "*"
+    
+    def restante(self) -> float:
+        """Seconds left (negative once expired)."""
+        return self.expira - time.monotonic()
+
+
+_plazo_actual: ContextVar[Optional[Plazo]] = ContextVar("plazo_actual", default=None)
+
+
+def plazo_actual() -> Optional[Plazo]:
+    """Deadline of the request being served, or None outside requests (jobs, scripts)."""
+    return _plazo_actual.get()
+
+
+def tiempo_restante() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is none."""
+    plazo_vigente = _plazo_actual.get()
+    return plazo_vigente.restante() if plazo_vigente is not None else None
+
+
+@contextmanager
+def plazo(segundos: float, ruta: str = "*") -> Iterator[Plazo]:
+    """Run the enclosed block under a deadline ``segundos`` from now."""
+    plazo_vigente = Plazo(time.monotonic() + segundos, ruta)
+    token = _plazo_actual.set(plazo_vigente)
+    try:
+        yield plazo_vigente
+    finally:
+        _plazo_actual.reset(token)
+
+
+def registrar_plazo_agotado(etapa: str) -> None:
+    """Count a deadline miss at ``etapa`` (``"request"``, ``"bedrock"``, ``"db"``)."""
+    plazo_vigente = _plazo_actual.get()
+    metricas.incrementar(
+        METRICA_PLAZO_AGOTADO,
+        ruta=plazo_vigente.ruta if plazo_vigente is not None else "*",
+        etapa=etapa
+    )
+
+
+async def con_plazo(trabajo: Awaitable[T], reserva: float = 0.0) -> T:
+    """
+    Await ``trabajo`` within the current deadline.
+    
+    Args:
+        trabajo: Coroutine or future to wait for
+        reserva: Seconds to keep back for the caller's fallback
+    
+    Returns:
+        The result of ``trabajo``
+    
+    Raises:
+        PlazoAgotado: Less than ``reserva`` seconds were left, or ``trabajo``
+            did not finish in time (it is cancelled)
+    """
+    restante = tiempo_restante()
+    if restante is None:
+        return await trabajo
+    disponible = restante - reserva
+    if disponible <= 0:
+        if asyncio.iscoroutine(trabajo):
+            trabajo.close()
+        raise PlazoAgotado("No queda tiempo antes del plazo de la petición")
+    try:
+        return await asyncio.wait_for(trabajo, disponible)
+    except asyncio.TimeoutError:
+        raise PlazoAgotado(f"Plazo de la petición agotado tras {disponible:.2f}s") from None
+
+
+def resolver_plazo(ruta: str, cabecera: Optional[str], settings: Settings) -> tuple[str, float]:
+    """
+    Deadline for a request path.
+    
+    Args:
+        ruta: Request path
+        cabecera: Value of ``X-Request-Deadline-Ms``, if sent
+        settings: Application settings
+    
+    Returns:
+        ``(prefijo, segundos)``: the metric label and the deadline length,
+        0 meaning no deadline
+    """
+    prefijo, segundos = "*", settings.request_deadline
+    for candidato in sorted(settings.request_deadlines, key=len, reverse=True):
+        if ruta.startswith(candidato):
+            prefijo, segundos = candidato, settings.request_deadlines[candidato]
+            break
+    
+    if cabecera:
+        try:
+            pedido = float(cabecera) / 1000
+        except ValueError:
+            pedido = 0.0
+        if pedido > 0:
+            segundos = min(pedido, settings.request_deadline_max)
+    return prefijo, segundos
+
+
+class DeadlineMiddleware:
+    """ASGI middleware enforcing the request deadline (see the module docstring)."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        cabecera = None
+        nombre_cabecera = HEADER_DEADLINE.lower().encode()
+        for nombre, valor in scope["headers"]:
+            if nombre == nombre_cabecera:
+                cabecera = valor.decode("latin-1")
+                break
+        prefijo, segundos = resolver_plazo(scope["path"], cabecera, get_settings())
+        if segundos <= 0:
+            await self.app(scope, receive, send)
+            return
+        
+        respuesta_iniciada = False
+        
+        async def send_con_estado(message):
+            nonlocal respuesta_iniciada
+            if message["type"] == "http.response.start":
+                respuesta_iniciada = True
+            await send(message)
+        
+        limite = asyncio.timeout(segundos)
+        with plazo(segundos, prefijo):
+            try:
+                async with limite:
+                    await self.app(scope, receive, send_con_estado)
+            except TimeoutError:
+                if not limite.expired():
+                    raise
+                registrar_plazo_agotado("request")
+                if respuesta_iniciada:
+                    # Too late for a status code; let the server drop the connection
+                    raise
+                respuesta = JSONResponse(
+                    status_code=504,
+                    content={"detail": f"La petición superó su plazo de {segundos:g}s"}
+                )
+                await respuesta(scope, receive, send)
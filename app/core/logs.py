@@ -0,0 +1,195 @@
+"""Non-blocking structured logging.
+
+Log calls on the event loop only build the record and put it on a bounded
+queue; a ``QueueListener`` thread formats it (JSON lines by default) and
+writes it to stdout, so a slow log collector never stalls request
+handling:
+
+- ``ColaLogs`` stamps each record with the request id and merges its
+  ``%``-style arguments into the message before queueing, so arguments
+  changed after the call are not rendered late; timestamps, JSON and
+  output are left to the listener. Records that do not fit in
+  ``log_cola`` are dropped and counted in
+  ``physiotrainer_logs_dropped_total`` rather than blocking.
+- ``FiltroMuestreo`` keeps only a fraction of the records below WARNING of
+  high-volume loggers (``log_muestreo``, e.g. one SQL statement in ten).
+- ``RequestIdMiddleware`` takes ``X-Request-Id`` from the request (or makes
+  one up), exposes it to every log record of the request and returns it in
+  the response.
+
+Log with ``%``-style arguments (``logger.info("x=%s", x)``), not f-strings:
+disabled or sampled-out records then cost no formatting at all.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import metricas
+
+HEADER_REQUEST_ID = "X-Request-Id"
+METRICA_DESCARTADOS = "physiotrainer_logs_dropped_total"
+FORMATO_TEXTO = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+metricas.describir(METRICA_DESCARTADOS, "Log records dropped because the logging queue was full.")
+
+request_id_actual: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_ATRIBUTOS_RECORD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+# Renders tracebacks before queueing, while the exception is still the caller's
+_formateador_excepciones = logging.Formatter()
+
+
+class FormateadorJSON(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request id and extras."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            datos["request_id"] = request_id
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD:
+                datos[clave] = valor
+        if record.exc_info:
+            datos["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Rendered by ColaLogs before queueing
+            datos["exc_info"] = record.exc_text
+        if record.stack_info:
+            datos["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FiltroMuestreo(logging.Filter):
+    """Keep records below WARNING of the given loggers (and their children) at a rate (0-1)."""
+    
+    def __init__(self, tasas: dict[str, float]):
+        super().__init__()
+        self.tasas = tasas
+        self._por_logger: dict[str, Optional[float]] = {}
+    
+    def _tasa(self, nombre: str) -> Optional[float]:
+        if nombre not in self._por_logger:
+            # Most specific configured ancestor
+            prefijos = [p for p in self.tasas if nombre == p or nombre.startswith(p + ".")]
+            self._por_logger[nombre] = self.tasas[max(prefijos, key=len)] if prefijos else None
+        return self._por_logger[nombre]
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        tasa = self._tasa(record.name)
+        return tasa is None or random.random() < tasa
+
+
+class ColaLogs(QueueHandler):
+    """``QueueHandler`` that leaves the output format to the listener thread and never blocks."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the base class, do not apply the output formatter here; only freeze what
+        # the caller may still change (arguments, the exception being handled) and the context
+        record.request_id = request_id_actual.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _formateador_excepciones.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metricas.incrementar(METRICA_DESCARTADOS)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configurar_logging(settings: Optional[Settings] = None, stream: Optional[TextIO] = None) -> QueueListener:
+    """
+    Route all logging through the queue (see the module docstring).
+    
+    Replaces the root logger's handlers; calling it again returns the
+    running listener.
+    
+    Args:
+        settings: Settings to use (default: ``get_settings()``)
+        stream: Where the listener writes (default: stdout)
+    
+    Returns:
+        The started listener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    settings = settings or get_settings()
+    
+    salida = logging.StreamHandler(stream or sys.stdout)
+    salida.setFormatter(FormateadorJSON() if settings.log_formato == "json" else logging.Formatter(FORMATO_TEXTO))
+    handler = ColaLogs(queue.Queue(settings.log_cola))
+    handler.addFilter(FiltroMuestreo(settings.log_muestreo))
+    
+    raiz = logging.getLogger()
+    for anterior in raiz.handlers[:]:
+        raiz.removeHandler(anterior)
+    raiz.addHandler(handler)
+    raiz.setLevel(settings.log_nivel)
+    # SQL statements in debug; engines are created without echo, which adds its own synchronous handler
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if settings.debug else logging.WARNING)
+    
+    _listener = QueueListener(handler.queue, salida)
+    _listener.start()
+    atexit.register(detener_logging)
+    return _listener
+
+
+def detener_logging() -> None:
+    """Write out the queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving each request an id for its log records (see the module docstring)."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        nombre_cabecera = HEADER_REQUEST_ID.lower().encode()
+        recibido = next((v.decode("latin-1") for n, v in scope["headers"] if n == nombre_cabecera), "")
+        request_id = recibido if 0 < len(recibido) <= 128 and recibido.isprintable() else uuid.uuid4().hex
+        
+        async def send_con_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (nombre_cabecera, request_id.encode())]}
+            await send(message)
+        
+        token = request_id_actual.set(request_id)
+        try:
+            await self.app(scope, receive, send_con_id)
+        finally:
+            request_id_actual.reset(token)
@@ -0,0 +1,97 @@
+"""In-process metrics exported in the Prometheus text format.
+
+Counters and summaries (count and sum of observations) keyed by name and
+labels. Each worker process keeps its own values; Prometheus adds them up
+across the scraped targets.
+"""
+
+import math
+import threading
+from collections import defaultdict
+
+Etiquetas = tuple[tuple[str, str], ...]
+
+
+def _formatear_etiquetas(etiquetas: Etiquetas) -> str:
+    if not etiquetas:
+        return ""
+    pares = []
+    for clave, valor in etiquetas:
+        valor = valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{clave}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def _formatear_valor(valor: float) -> str:
+    # Exact: integral counts as integers, anything else with all the digits of the float
+    if math.isnan(valor):
+        return "NaN"
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if valor.is_integer() and abs(valor) < 2 ** 53:
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class Metricas:
+    """Registry of counters and summaries."""
+    
+    def __init__(self):
+        self._contadores: dict[str, dict[Etiquetas, float]] = defaultdict(lambda: defaultdict(float))
+        self._resumenes: dict[str, dict[Etiquetas, list[float]]] = defaultdict(dict)
+        self._ayuda: dict[str, str] = {}
+        # Updated from the event loop and from worker threads (boto3 calls, sync dependencies)
+        self._lock = threading.Lock()
+    
+    def describir(self, nombre: str, ayuda: str) -> None:
+        """Set the ``# HELP`` line of a metric."""
+        self._ayuda[nombre] = ayuda
+    
+    def incrementar(self, nombre: str, valor: float = 1.0, **etiquetas: str) -> None:
+        """Add ``valor`` to the counter ``nombre`` with the given labels."""
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            self._contadores[nombre][clave] += valor
+    
+    def observar(self, nombre: str, valor: float, **etiquetas: str) -> None:
+        """Record one observation (e.g. a duration in seconds) in the summary ``nombre``."""
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            resumen = self._resumenes[nombre].setdefault(clave, [0.0, 0.0])
+            resumen[0] += 1
+            resumen[1] += valor
+    
+    def valor(self, nombre: str, **etiquetas: str) -> float:
+        """Current value of a counter (0 if it was never incremented)."""
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            return self._contadores.get(nombre, {}).get(clave, 0.0)
+    
+    def exportar(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lineas = []
+        with self._lock:
+            for nombre, series in sorted(self._contadores.items()):
+                if nombre in self._ayuda:
+                    lineas.append(f"# HELP {nombre} {self._ayuda[nombre]}")
+                lineas.append(f"# TYPE {nombre} counter")
+                for etiquetas, valor in sorted(series.items()):
+                    lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {_formatear_valor(valor)}")
+            for nombre, series in sorted(self._resumenes.items()):
+                if nombre in self._ayuda:
+                    lineas.append(f"# HELP {nombre} {self._ayuda[nombre]}")
+                lineas.append(f"# TYPE {nombre} summary")
+                for etiquetas, (cuenta, suma) in sorted(series.items()):
+                    formato = _formatear_etiquetas(etiquetas)
+                    lineas.append(f"{nombre}_count{formato} {_formatear_valor(cuenta)}")
+                    lineas.append(f"{nombre}_sum{formato} {_formatear_valor(suma)}")
+        return "\n".join(lineas) + "\n"
+    
+    def reset(self) -> None:
+        """Drop every recorded value (tests and benchmarks)."""
+        with self._lock:
+            self._contadores.clear()
+            self._resumenes.clear()
+
+
+metricas = Metricas()
@@ -0,0 +1,279 @@
+"""On-demand sampling profiler for single requests.
+
+With ``profiling_enabled`` on, a request sent with
+``X-Profile: <profiling_token>`` is sampled by a background thread every
+``profiling_intervalo_ms``. Each sample is the request's stack at that
+moment:
+
+- while its coroutine runs on the event loop, the loop thread's frames from
+  the request down (routing, pydantic, SQLAlchemy, JSON encoding...);
+- while it is suspended, the chain of awaits it is parked on, ending in an
+  ``[await]`` frame: time waiting on the database, on Bedrock (boto3 runs
+  in a worker thread, so it shows as the ``to_thread`` await) or on the
+  client.
+
+Samples are weighted by the time since the previous one, so the profile
+adds up to the request's wall-clock time (while the loop runs Python code
+the sampler only gets the GIL every ``sys.getswitchinterval()``, 5 ms by
+default, so CPU-bound stretches get fewer, heavier samples). Sampling stops
+after ``profiling_max_muestras`` samples, so a long request cannot grow the
+profile without bound. It is saved in speedscope's
+format (https://www.speedscope.app, which also draws it as a flame graph)
+to ``profiling_dir``, keeping the newest ``profiling_max_archivos``; its id
+is returned in ``X-Profile-Id`` and listed by ``GET /api/v1/admin/profiles``.
+
+One request is profiled at a time per process. When disabled the
+middleware costs one settings lookup per request.
+"""
+
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+HEADER_PROFILE = "X-Profile"
+HEADER_PROFILE_ID = "X-Profile-Id"
+SUFIJO_PERFIL = ".speedscope.json"
+_ESQUEMA = "https://www.speedscope.app/file-format-schema.json"
+_ID_VALIDO = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+# Leaf of the samples taken while the request is suspended
+_ESPERA = ("[await]", "", 0)
+
+# Held from the start of a profile until its file is written
+_en_curso = threading.Lock()
+
+
+def _clave(frame) -> tuple[str, str, int]:
+    code = frame.f_code
+    return code.co_qualname, code.co_filename, code.co_firstlineno
+
+
+def _pila_suspendida(coro) -> list:
+    """Frames of a suspended coroutine and of what it awaits, outermost first."""
+    frames = []
+    objeto = coro
+    while objeto is not None:
+        frame = getattr(objeto, "cr_frame", None) or getattr(objeto, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        objeto = getattr(objeto, "cr_await", None) or getattr(objeto, "gi_yieldfrom", None)
+    return frames
+
+
+def token_valido(valor: Optional[str], settings: Settings) -> bool:
+    """Whether a header value unlocks profiling (any value if no token is configured)."""
+    if not valor:
+        return False
+    if not settings.profiling_token:
+        return True
+    return hmac.compare_digest(valor.encode(), settings.profiling_token.encode())
+
+
+class PerfilPeticion:
+    """Samples one request coroutine from a background thread (see the module docstring)."""
+    
+    def __init__(
+        self,
+        nombre: str,
+        directorio: str,
+        intervalo: float,
+        max_archivos: int,
+        max_muestras: int = 60_000
+    ):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.nombre = nombre
+        self.directorio = Path(directorio)
+        self.intervalo = intervalo
+        self.max_archivos = max_archivos
+        self.max_muestras = max_muestras
+        self._coro = None
+        self._raiz = None
+        self._hilo_loop = threading.get_ident()
+        self._detener = threading.Event()
+        self._frames: dict[tuple[str, str, int], int] = {}
+        self._muestras: list[list[int]] = []
+        self._pesos: list[float] = []
+    
+    def iniciar(self, coro) -> None:
+        """Start sampling ``coro`` (created but not yet awaited)."""
+        self._coro = coro
+        self._raiz = coro.cr_frame
+        threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True).start()
+    
+    def detener(self) -> None:
+        """Stop sampling; the sampler thread then writes the profile."""
+        self._detener.set()
+    
+    def _indice(self, clave: tuple[str, str, int]) -> int:
+        indice = self._frames.get(clave)
+        if indice is None:
+            indice = self._frames[clave] = len(self._frames)
+        return indice
+    
+    def _muestra(self) -> list[int]:
+        pila = []
+        frame = sys._current_frames().get(self._hilo_loop)
+        while frame is not None and frame is not self._raiz:
+            pila.append(frame)
+            frame = frame.f_back
+        if frame is not None:
+            # Running: loop thread frames from the request coroutine down
+            pila.append(frame)
+            claves = [_clave(f) for f in reversed(pila)]
+        else:
+            claves = [_clave(f) for f in _pila_suspendida(self._coro)] + [_ESPERA]
+        return [self._indice(clave) for clave in claves]
+    
+    def _run(self) -> None:
+        try:
+            duracion_ms = self._muestrear()
+        finally:
+            self._coro = self._raiz = None
+            _en_curso.release()
+        try:
+            self._guardar(duracion_ms)
+        except OSError as e:
+            logger.warning("Profile %s could not be saved: %s", self.id, e)
+    
+    def _muestrear(self) -> float:
+        inicio = anterior = time.perf_counter()
+        while not self._detener.wait(self.intervalo):
+            ahora = time.perf_counter()
+            self._muestras.append(self._muestra())
+            self._pesos.append((ahora - anterior) * 1000)
+            anterior = ahora
+            if len(self._muestras) >= self.max_muestras:
+                # The rest of the request is not sampled
+                self._detener.wait()
+                break
+        return (time.perf_counter() - inicio) * 1000
+    
+    def _guardar(self, duracion_ms: float) -> None:
+        nombre = f"{self.nombre} ({duracion_ms:.0f} ms)"
+        if len(self._muestras) >= self.max_muestras:
+            nombre = f"{self.nombre} ({duracion_ms:.0f} ms, first {sum(self._pesos):.0f} ms sampled)"
+        documento = {
+            "$schema": _ESQUEMA,
+            "name": nombre,
+            "exporter": "physiotrainer",
+            "shared": {
+                "frames": [
+                    {"name": nombre, "file": archivo, "line": linea} if archivo else {"name": nombre}
+                    for nombre, archivo, linea in self._frames
+                ]
+            },
+            "profiles": [{
+                "type": "sampled",
+                "name": self.nombre,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(self._pesos),
+                "samples": self._muestras,
+                "weights": self._pesos
+            }]
+        }
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        temporal = self.directorio / f".{self.id}.tmp"
+        temporal.write_text(json.dumps(documento), encoding="utf-8")
+        os.replace(temporal, self.directorio / f"{self.id}{SUFIJO_PERFIL}")
+        for antiguo in _por_antiguedad(self.directorio)[:-self.max_archivos]:
+            antiguo.unlink(missing_ok=True)
+
+
+def _por_antiguedad(directorio: Path) -> list[Path]:
+    rutas = []
+    for ruta in directorio.glob(f"*{SUFIJO_PERFIL}"):
+        try:
+            rutas.append((ruta.stat().st_mtime_ns, ruta))
+        except OSError:
+            continue
+    return [ruta for _, ruta in sorted(rutas)]
+
+
+def listar_perfiles(directorio: str) -> list[dict]:
+    """
+    Saved profiles, newest first (blocking I/O: call it off the event loop).
+    
+    Only file metadata is read: the profiles themselves can be megabytes each.
+    """
+    perfiles = []
+    for ruta in reversed(_por_antiguedad(Path(directorio))):
+        try:
+            info = ruta.stat()
+        except OSError:
+            # Pruned meanwhile
+            continue
+        perfiles.append({
+            "id": ruta.name[:-len(SUFIJO_PERFIL)],
+            "bytes": info.st_size,
+            "creado": datetime.utcfromtimestamp(info.st_mtime)
+        })
+    return perfiles
+
+
+def ruta_perfil(directorio: str, perfil_id: str) -> Optional[Path]:
+    """File of a saved profile, or None (also for ids that are not profile ids)."""
+    if not _ID_VALIDO.match(perfil_id):
+        return None
+    ruta = Path(directorio) / f"{perfil_id}{SUFIJO_PERFIL}"
+    return ruta if ruta.is_file() else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it (see the module docstring)."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        settings = get_settings()
+        if scope["type"] != "http" or not settings.profiling_enabled:
+            await self.app(scope, receive, send)
+            return
+        
+        nombre_cabecera = HEADER_PROFILE.lower().encode()
+        valor = next((v.decode("latin-1") for n, v in scope["headers"] if n == nombre_cabecera), None)
+        if not token_valido(valor, settings) or not _en_curso.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        
+        perfil = PerfilPeticion(
+            f"{scope['method']} {scope['path']}",
+            settings.profiling_dir,
+            settings.profiling_intervalo_ms / 1000,
+            settings.profiling_max_archivos,
+            settings.profiling_max_muestras
+        )
+        
+        async def send_con_id(message):
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (HEADER_PROFILE_ID.lower().encode(), perfil.id.encode())]
+                }
+            await send(message)
+        
+        coro = self.app(scope, receive, send_con_id)
+        try:
+            perfil.iniciar(coro)
+        except Exception:
+            coro.close()
+            _en_curso.release()
+            raise
+        try:
+            await coro
+        finally:
+            perfil.detener()
@@ -1,5 +1,33 @@
 """Database configuration and session management."""
 
-from app.db.database import engine, async_session, init_db, get_session
+from app.db.database import (
+    engine,
+    read_engine,
+    async_session,
+    async_read_session,
+    async_lectura_session,
+    init_db,
+    monthly_partitions_enabled,
+    maintain_partitions,
+    get_session,
+    get_read_session,
+    get_session_factory,
+    get_read_session_factory
+)
+from app.db.statement_timeout import es_statement_timeout
 
-__all__ = ["engine", "async_session", "init_db", "get_session"]
+__all__ = [
+    "engine",
+    "read_engine",
+    "async_session",
+    "async_read_session",
+    "async_lectura_session",
+    "init_db",
+    "monthly_partitions_enabled",
+    "maintain_partitions",
+    "get_session",
+    "get_read_session",
+    "get_session_factory",
+    "get_read_session_factory",
+    "es_statement_timeout"
+]
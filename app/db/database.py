@@ -1,17 +1,50 @@
+from datetime import datetime
+from fastapi import Request
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 
 from app.core.config import get_settings
+from app.db.partitioning import (
+    create_hash_partitioned_registros,
+    create_range_partitioned_registros,
+    ensure_monthly_partitions,
+    maintain_monthly_partitions
+)
+from app.db.lectura import SesionLectura, crear_fabrica_lectura, registrar_tiempo_conexion
+from app.db.migraciones import migrar_paciente_id
+from app.db.sqlite import create_sqlite_engines, sqlite_file_url
+from app.db.statement_timeout import configure_statement_timeout
+from app.db.trigramas import create_trigram_index
 
 settings = get_settings()
 
-# Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True
-)
+if sqlite_file_url(settings.database_url):
+    # Embedded single-node mode: one writer connection, concurrent WAL readers
+    engine, read_engine = create_sqlite_engines(settings)
+else:
+    # Create async engine
+    engine = create_async_engine(
+        settings.database_url,
+        echo=False,
+        future=True
+    )
+    
+    # Read replica engine (falls back to the primary when no replica is configured)
+    read_engine = (
+        create_async_engine(
+            settings.database_replica_url,
+            echo=False,
+            future=True
+        )
+        if settings.database_replica_url
+        else engine
+    )
+    
+    if engine.dialect.name == "postgresql":
+        configure_statement_timeout(engine)
+        if read_engine is not engine:
+            configure_statement_timeout(read_engine)
 
 # Create async session factory
 async_session = sessionmaker(
@@ -20,11 +53,49 @@ async_session = sessionmaker(
     expire_on_commit=False
 )
 
+# Session factory for read-only traffic
+async_read_session = sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
+# Read-only routes: autocommit, a connection only while each query runs
+async_lectura_session = crear_fabrica_lectura(read_engine)
+
 
 async def init_db():
-    """Initialize database tables."""
+    """Initialize database tables, upgrading those created by earlier versions."""
     async with engine.begin() as conn:
+        await conn.run_sync(migrar_paciente_id, settings.default_paciente_id)
+        if engine.dialect.name == "postgresql":
+            if settings.registros_monthly_partitions:
+                await conn.run_sync(create_range_partitioned_registros, settings.registros_hash_partitions)
+                await conn.run_sync(
+                    ensure_monthly_partitions,
+                    datetime.utcnow().date(),
+                    settings.registros_partitions_ahead + 1,
+                    settings.registros_hash_partitions
+                )
+            elif settings.registros_hash_partitions > 0:
+                await conn.run_sync(create_hash_partitioned_registros, settings.registros_hash_partitions)
         await conn.run_sync(SQLModel.metadata.create_all)
+        if engine.dialect.name == "postgresql":
+            await conn.run_sync(create_trigram_index)
+
+
+def monthly_partitions_enabled() -> bool:
+    """Whether registros is range-partitioned by month on this deployment."""
+    return engine.dialect.name == "postgresql" and settings.registros_monthly_partitions
+
+
+async def maintain_partitions() -> None:
+    """Background task creating upcoming monthly registros partitions."""
+    await maintain_monthly_partitions(
+        engine,
+        settings.registros_partitions_ahead,
+        settings.registros_hash_partitions
+    )
 
 
 async def get_session() -> AsyncSession:
@@ -38,3 +109,37 @@ async def get_session() -> AsyncSession:
             raise
         finally:
             await session.close()
+
+
+async def get_read_session(request: Request) -> SesionLectura:
+    """
+    Get read-only database session dependency for FastAPI.
+    
+    Routed to the read replica when ``database_replica_url`` is set. Replicas
+    may lag behind the primary, so flows that read their own writes must
+    keep using ``get_session``. Statements run in autocommit mode and hold
+    a pooled connection only until their rows are buffered (see
+    ``app.db.lectura``); the time connections were held is reported per
+    route in ``/metrics``.
+    """
+    async with async_lectura_session() as session:
+        try:
+            yield session
+        finally:
+            ruta = request.scope.get("route")
+            registrar_tiempo_conexion(session, getattr(ruta, "path", request.url.path))
+
+
+def get_session_factory() -> sessionmaker:
+    """
+    Get the session factory dependency for FastAPI.
+    
+    Used by streaming responses, whose body is produced after the
+    request-scoped ``get_session`` dependency has already been closed.
+    """
+    return async_session
+
+
+def get_read_session_factory() -> sessionmaker:
+    """Get the read-only (replica) session factory dependency for FastAPI."""
+    return async_read_session
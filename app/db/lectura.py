@@ -0,0 +1,114 @@
+"""Sessions for read-only routes.
+
+A regular session checks a connection out of the pool on its first query
+and keeps it, inside a transaction, until the request-scoped dependency
+commits after the response is built. GET routes only read, so
+``SesionLectura`` instead:
+
+- runs on an ``AUTOCOMMIT`` view of the engine: no ``BEGIN``/``COMMIT``
+  round trips, each statement sees the latest committed data (SQLite
+  already runs reads in autocommit mode unless the embedded mode's
+  ``BEGIN`` listener opens a transaction, which it skips for these
+  sessions);
+- checks the connection out lazily on the first statement of each call and
+  returns it to the pool as soon as the rows are buffered (AsyncSession
+  always buffers them), so the connection is free while the route
+  computes and the response is serialised;
+- adds up how long it held connections in ``tiempo_conexion``, reported by
+  ``get_read_session`` per route in ``physiotrainer_db_connection_hold_seconds``.
+
+Loaded objects stay usable after the connection is released
+(``expire_on_commit=False``), but unloaded lazy relationships cannot be
+fetched afterwards, as with any async session. ``stream()`` keeps the
+connection until the session closes; exports use a transactional session.
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.metrics import metricas
+
+METRICA_CONEXION = "physiotrainer_db_connection_hold_seconds"
+# Execution option marking the connections of read-only sessions
+OPCION_LECTURA = "physiotrainer_lectura"
+
+metricas.describir(METRICA_CONEXION, "Time read-only requests held a database connection, by route.")
+
+
+class _SesionLecturaSync(Session):
+    """Sync side of ``SesionLectura``; stamps when it gets a connection."""
+
+
+@event.listens_for(_SesionLecturaSync, "after_begin")
+def _conexion_obtenida(session, transaction, connection):
+    session.info["conexion_desde"] = time.perf_counter()
+
+
+class SesionLectura(AsyncSession):
+    """AsyncSession holding a pooled connection only while a query runs (see the module docstring)."""
+    
+    sync_session_class = _SesionLecturaSync
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tiempo_conexion = 0.0
+    
+    async def liberar(self, error: bool = False) -> None:
+        """Return the connection to the pool, keeping the loaded objects."""
+        if not self.sync_session.in_transaction():
+            return
+        desde = self.sync_session.info.pop("conexion_desde", None)
+        # Nothing is sent to the server in autocommit mode
+        await (self.rollback() if error else self.commit())
+        if desde is not None:
+            self.tiempo_conexion += time.perf_counter() - desde
+    
+    async def _consulta(self, metodo, *args, **kwargs):
+        try:
+            resultado = await metodo(*args, **kwargs)
+        except BaseException:
+            await self.liberar(error=True)
+            raise
+        await self.liberar()
+        return resultado
+    
+    async def execute(self, *args, **kwargs):
+        # Also covers scalars(), which goes through execute()
+        return await self._consulta(super().execute, *args, **kwargs)
+    
+    async def scalar(self, *args, **kwargs):
+        return await self._consulta(super().scalar, *args, **kwargs)
+    
+    async def get(self, *args, **kwargs):
+        return await self._consulta(super().get, *args, **kwargs)
+    
+    async def close(self) -> None:
+        await self.liberar(error=True)
+        await super().close()
+
+
+def es_lectura(conn) -> bool:
+    """Whether ``conn`` (a Connection) belongs to a ``SesionLectura``."""
+    return bool(conn.get_execution_options().get(OPCION_LECTURA))
+
+
+def crear_fabrica_lectura(engine: AsyncEngine) -> sessionmaker:
+    """``SesionLectura`` factory on an autocommit view of ``engine`` (same pool)."""
+    opciones = {OPCION_LECTURA: True}
+    if engine.dialect.name != "sqlite":
+        opciones["isolation_level"] = "AUTOCOMMIT"
+    # pysqlite never opens a transaction for a SELECT by itself, and switching the
+    # isolation level would cost a PRAGMA on every checkout and checkin
+    return sessionmaker(
+        engine.execution_options(**opciones),
+        class_=SesionLectura,
+        expire_on_commit=False
+    )
+
+
+def registrar_tiempo_conexion(session: SesionLectura, ruta: str) -> None:
+    """Report the connection time of a finished read-only request."""
+    metricas.observar(METRICA_CONEXION, session.tiempo_conexion, ruta=ruta)
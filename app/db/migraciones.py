@@ -0,0 +1,59 @@
+"""In-place upgrades of tables created by earlier versions.
+
+``create_all`` only creates missing tables, so columns added to existing
+ones have to be added here, before it runs (see ``init_db``).
+"""
+
+import logging
+
+from sqlalchemy import inspect, literal, text
+from sqlalchemy.engine import Connection
+
+from app.models import Ejercicio, Registro
+
+logger = logging.getLogger(__name__)
+
+
+def migrar_paciente_id(conn: Connection, paciente_id: str) -> list[str]:
+    """
+    Add ``paciente_id`` to ``ejercicios`` and ``registros`` created before patients existed.
+    
+    Existing rows are assigned to ``paciente_id`` (the default patient, which
+    requests without ``X-Paciente-Id`` use). The global unique index on
+    exercise names is replaced by the per-patient one, and the
+    patient-leading registros indexes are created.
+    
+    Args:
+        conn: Connection inside a transaction (``run_sync`` target)
+        paciente_id: Patient the existing rows belong to
+    
+    Returns:
+        The tables that were migrated
+    """
+    inspector = inspect(conn)
+    valor = literal(paciente_id).compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    migradas = []
+    for tabla in (Ejercicio.__table__, Registro.__table__):
+        if not inspector.has_table(tabla.name):
+            continue
+        if "paciente_id" in {columna["name"] for columna in inspector.get_columns(tabla.name)}:
+            continue
+        # The default fills the existing rows in the same statement
+        conn.execute(text(f"ALTER TABLE {tabla.name} ADD COLUMN paciente_id VARCHAR(64) NOT NULL DEFAULT {valor}"))
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE {tabla.name} ALTER COLUMN paciente_id DROP DEFAULT"))
+        migradas.append(tabla.name)
+    
+    if Ejercicio.__tablename__ in migradas:
+        # Names were unique across the whole table; now per patient
+        conn.execute(text("DROP INDEX IF EXISTS ix_ejercicios_nombre"))
+        conn.execute(text(
+            f"CREATE UNIQUE INDEX uq_ejercicios_paciente_nombre ON {Ejercicio.__tablename__} (paciente_id, nombre)"
+        ))
+    if Registro.__tablename__ in migradas:
+        for indice in Registro.__table__.indexes:
+            indice.create(conn, checkfirst=True)
+    
+    if migradas:
+        logger.info("Added paciente_id to %s; existing rows belong to patient %s", migradas, paciente_id)
+    return migradas
@@ -0,0 +1,176 @@
+"""PostgreSQL declarative partitioning for the registros table.
+
+``create_all`` cannot express partitioned tables, so when partitioning is
+enabled the ``registros`` table is created here first, from a copy of the
+model's table definition, and ``create_all`` then skips it. Partition keys
+must be part of the primary key, so the copy's primary key is widened to
+include them. ``id`` stays globally unique because it comes from a single
+sequence.
+
+Two layouts are supported:
+
+- hash by ``paciente_id`` (``registros_hash_partitions``)
+- range by month on ``fecha`` (``registros_monthly_partitions``), optionally
+  sub-partitioned by hash of ``paciente_id``
+
+Existing unpartitioned tables are left untouched: converting them requires
+a data migration.
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import MetaData, PrimaryKeyConstraint, Table, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models import Ejercicio, Registro
+
+logger = logging.getLogger(__name__)
+
+
+def _partitioned_copy(partition_by: str, key_columns: list[str]) -> Table:
+    """Copy of the registros table partitioned by ``partition_by``."""
+    metadata = MetaData()
+    Ejercicio.__table__.to_metadata(metadata)
+    tabla = Registro.__table__.to_metadata(metadata)
+    for nombre in key_columns:
+        tabla.c[nombre].primary_key = True
+    tabla.append_constraint(PrimaryKeyConstraint("id", *key_columns))
+    tabla.c.id.autoincrement = True
+    tabla.dialect_options["postgresql"]["partition_by"] = partition_by
+    return tabla
+
+
+def _create_hash_partitions(conn: Connection, parent: str, partitions: int) -> None:
+    for remainder in range(partitions):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {parent}_p{remainder} PARTITION OF {parent} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        ))
+
+
+def create_hash_partitioned_registros(conn: Connection, partitions: int) -> bool:
+    """
+    Create ``registros`` hash-partitioned by ``paciente_id``.
+    
+    Args:
+        conn: Connection inside a transaction (``run_sync`` target)
+        partitions: Number of hash partitions (modulus)
+        
+    Returns:
+        True if the table was created, False if it already existed
+    """
+    if inspect(conn).has_table(Registro.__tablename__):
+        return False
+    
+    Ejercicio.__table__.create(conn, checkfirst=True)
+    tabla = _partitioned_copy("HASH (paciente_id)", ["paciente_id"])
+    tabla.create(conn)
+    _create_hash_partitions(conn, tabla.name, partitions)
+    logger.info("Created registros with %s hash partitions by paciente_id", partitions)
+    return True
+
+
+def create_range_partitioned_registros(conn: Connection, hash_partitions: int = 0) -> bool:
+    """
+    Create ``registros`` range-partitioned by month on ``fecha``.
+    
+    A DEFAULT partition catches rows outside the monthly partitions created
+    so far (e.g. back-dated imports); it should stay empty in normal use.
+    
+    Args:
+        conn: Connection inside a transaction (``run_sync`` target)
+        hash_partitions: If > 0, sub-partition every month by hash of paciente_id
+        
+    Returns:
+        True if the table was created, False if it already existed
+    """
+    if inspect(conn).has_table(Registro.__tablename__):
+        return False
+    
+    Ejercicio.__table__.create(conn, checkfirst=True)
+    claves = ["fecha", "paciente_id"] if hash_partitions > 0 else ["fecha"]
+    tabla = _partitioned_copy("RANGE (fecha)", claves)
+    tabla.create(conn)
+    conn.execute(text(f"CREATE TABLE {tabla.name}_default PARTITION OF {tabla.name} DEFAULT"))
+    logger.info("Created registros range-partitioned by month on fecha")
+    return True
+
+
+def _add_months(mes: date, n: int) -> date:
+    indice = mes.year * 12 + mes.month - 1 + n
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def monthly_partition_name(mes: date) -> str:
+    """Name of the partition holding the month of ``mes``."""
+    return f"{Registro.__tablename__}_y{mes.year:04d}m{mes.month:02d}"
+
+
+def ensure_monthly_partitions(
+    conn: Connection,
+    desde: date,
+    meses: int,
+    hash_partitions: int = 0
+) -> list[str]:
+    """
+    Create any missing monthly partitions from ``desde``'s month onwards.
+    
+    Args:
+        conn: Connection inside a transaction (``run_sync`` target)
+        desde: Any day in the first month to cover
+        meses: Number of consecutive months to cover
+        hash_partitions: Sub-partitions per month (must match the table layout)
+        
+    Returns:
+        Names of the partitions that were created
+    """
+    existentes = set(inspect(conn).get_table_names())
+    padre = Registro.__tablename__
+    creadas = []
+    primero = date(desde.year, desde.month, 1)
+    for n in range(meses):
+        inicio = _add_months(primero, n)
+        nombre = monthly_partition_name(inicio)
+        if nombre in existentes:
+            continue
+        sub = " PARTITION BY HASH (paciente_id)" if hash_partitions > 0 else ""
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {nombre} PARTITION OF {padre} "
+            f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{_add_months(inicio, 1).isoformat()}'){sub}"
+        ))
+        if hash_partitions > 0:
+            _create_hash_partitions(conn, nombre, hash_partitions)
+        creadas.append(nombre)
+    if creadas:
+        logger.info("Created monthly registros partitions: %s", ", ".join(creadas))
+    return creadas
+
+
+async def maintain_monthly_partitions(
+    engine: AsyncEngine,
+    meses_adelante: int,
+    hash_partitions: int = 0,
+    intervalo: float = 6 * 3600,
+    ahora: Optional[datetime] = None
+) -> None:
+    """
+    Background task: keep the current and next ``meses_adelante`` months partitioned.
+    
+    Runs until cancelled (from the application lifespan).
+    """
+    while True:
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(
+                    ensure_monthly_partitions,
+                    (ahora or datetime.utcnow()).date(),
+                    meses_adelante + 1,
+                    hash_partitions
+                )
+        except Exception as e:
+            logger.error("Failed to create monthly registros partitions: %s", e, exc_info=True)
+        await asyncio.sleep(intervalo)
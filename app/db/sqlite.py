@@ -0,0 +1,109 @@
+"""Embedded SQLite mode for single-node deployments.
+
+A file-backed ``sqlite+aiosqlite`` database gets two engines on the same
+file:
+
+- a writer engine with a single pooled connection. Write sessions queue
+  for it in the pool (asynchronously), so concurrent requests never race
+  for SQLite's write lock inside one process. Its transactions start with
+  ``BEGIN IMMEDIATE``, so writers in other processes wait in
+  ``busy_timeout`` instead of failing with "database is locked" when a
+  read transaction is upgraded to a write.
+- a read engine with several ``query_only`` connections. In WAL mode
+  readers run concurrently with the writer on their own snapshot (per
+  statement for the autocommit sessions of ``app.db.lectura``).
+
+In-memory databases (tests) are left untouched.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import Settings
+from app.db.lectura import es_lectura
+
+
+def sqlite_file_url(database_url: str) -> bool:
+    """Whether ``database_url`` points at an on-disk SQLite database."""
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _pragmas(settings: Settings, query_only: bool) -> list[str]:
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        # WAL + NORMAL: durable against application crashes, fsync only at checkpoints
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}",
+        "PRAGMA temp_store=MEMORY"
+    ]
+    if query_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def configure_sqlite_engine(engine: AsyncEngine, settings: Settings, writer: bool) -> None:
+    """
+    Apply the tuned pragmas to every new connection of ``engine``.
+    
+    Args:
+        engine: Engine on an aiosqlite file database
+        settings: Application settings with the ``sqlite_*`` tuning values
+        writer: Start transactions with ``BEGIN IMMEDIATE`` (otherwise the
+            connections are made read-only)
+    """
+    pragmas = _pragmas(settings, query_only=not writer)
+    
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself (see the "begin" listener)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    
+    @event.listens_for(engine.sync_engine, "begin")
+    def _on_begin(conn):
+        if writer:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        elif not es_lectura(conn):
+            # Read-only sessions run each statement on its own
+            conn.exec_driver_sql("BEGIN")
+
+
+def create_sqlite_engines(settings: Settings) -> tuple[AsyncEngine, AsyncEngine]:
+    """
+    Writer and reader engines for ``settings.database_url``.
+    
+    Returns:
+        ``(engine, read_engine)``
+    """
+    engine = create_async_engine(
+        settings.database_url,
+        echo=False,
+        future=True,
+        # aiosqlite defaults to NullPool: a fresh connection (and pragmas) per session
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        # Seconds a write session may wait for the writer connection
+        pool_timeout=settings.sqlite_write_wait
+    )
+    configure_sqlite_engine(engine, settings, writer=True)
+    
+    read_engine = create_async_engine(
+        settings.database_url,
+        echo=False,
+        future=True,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.sqlite_read_connections,
+        max_overflow=0
+    )
+    configure_sqlite_engine(read_engine, settings, writer=False)
+    return engine, read_engine
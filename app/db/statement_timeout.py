@@ -0,0 +1,60 @@
+"""Request deadlines as PostgreSQL statement timeouts.
+
+Every transaction opened while serving a request starts with
+``SET LOCAL statement_timeout`` set to the time left before the request
+deadline, so a slow query is cancelled by the server instead of holding
+the connection past the point where the client gave up. Transactions
+outside requests (jobs, maintenance) keep the server default.
+
+Autocommit statements (``app.db.lectura``) have no transaction for
+``SET LOCAL``: the timeout is set on the connection instead (and only
+re-set when the value left there would cut the request short or exceed
+its deadline by more than ``_HOLGURA_MS``, so back-to-back requests with
+the same deadline pay no extra round trip). It is reset by the next
+transaction without a deadline that gets that connection.
+
+SQLite has no statement timeout; there the request is only bounded by the
+cancellation in ``DeadlineMiddleware``.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.deadline import tiempo_restante
+from app.db.lectura import es_lectura
+
+# SQLSTATE query_canceled, raised when statement_timeout fires
+_QUERY_CANCELED = "57014"
+# Connection info key: session-level statement_timeout (ms) set on the connection
+_TIMEOUT_SESION = "statement_timeout_sesion"
+# A session-level timeout up to this much longer than the time left is kept as is
+_HOLGURA_MS = 1000
+
+
+def configure_statement_timeout(engine: AsyncEngine) -> None:
+    """Bound the transactions of ``engine`` (PostgreSQL) by the current request deadline."""
+    
+    @event.listens_for(engine.sync_engine, "begin")
+    def _on_begin(conn):
+        restante = tiempo_restante()
+        if restante is not None:
+            # At least 1ms: 0 would disable the timeout
+            milisegundos = max(1, int(restante * 1000))
+            if es_lectura(conn):
+                actual = conn.info.get(_TIMEOUT_SESION)
+                # Reuse what a previous request left if it does not cut this one short
+                if actual is None or not milisegundos <= actual <= milisegundos + _HOLGURA_MS:
+                    conn.exec_driver_sql(f"SET statement_timeout = {milisegundos}")
+                    conn.info[_TIMEOUT_SESION] = milisegundos
+            else:
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {milisegundos}")
+        elif conn.info.pop(_TIMEOUT_SESION, None) is not None:
+            # Left on the pooled connection by a read-only request
+            conn.exec_driver_sql("RESET statement_timeout")
+
+
+def es_statement_timeout(error: DBAPIError) -> bool:
+    """Whether ``error`` is a query cancelled by ``statement_timeout``."""
+    orig = error.orig
+    return (getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)) == _QUERY_CANCELED
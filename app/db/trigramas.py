@@ -0,0 +1,57 @@
+"""PostgreSQL trigram index for fuzzy ejercicio name lookups.
+
+The GIN index is built on the normalised name expression used by
+``EjercicioRepository``, so ``%`` / ``similarity()`` queries on it are
+index-assisted. Creating the ``pg_trgm`` extension needs sufficient
+privileges; when it is unavailable the repository falls back to its
+in-memory trigram index.
+"""
+
+import logging
+
+from sqlalchemy import column, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from app.models import Ejercicio
+from app.services.nombres_service import nombre_normalizado_sql
+
+logger = logging.getLogger(__name__)
+
+_pg_trgm_disponible = False
+
+
+def pg_trgm_disponible() -> bool:
+    """Whether the trigram index was set up on this process's database."""
+    return _pg_trgm_disponible
+
+
+def create_trigram_index(conn: Connection) -> bool:
+    """
+    Enable ``pg_trgm`` and index the normalised ejercicio names.
+    
+    Args:
+        conn: PostgreSQL connection inside a transaction (``run_sync`` target)
+        
+    Returns:
+        Whether trigram queries can be used
+    """
+    global _pg_trgm_disponible
+    # Raw DDL: an Index object would attach to the shared table metadata
+    # and create_all would then try to build it on other backends too
+    expresion = nombre_normalizado_sql(column("nombre")).compile(
+        dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+    )
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_ejercicios_nombre_trgm "
+                f"ON {Ejercicio.__tablename__} USING gin ({expresion} gin_trgm_ops)"
+            ))
+    except DBAPIError as e:
+        logger.warning("pg_trgm unavailable, ejercicio names matched in memory: %s", e)
+        _pg_trgm_disponible = False
+        return False
+    _pg_trgm_disponible = True
+    return True
@@ -0,0 +1,23 @@
+"""Background job queue for long-running AI work."""
+
+from app.jobs.queue import (
+    HANDLERS,
+    JobContext,
+    JobPermanentError,
+    JobWorkerPool,
+    enqueue,
+    job_handler,
+    purgar_jobs_terminados
+)
+# Registers the handlers
+from app.jobs import handlers
+
+__all__ = [
+    "HANDLERS",
+    "JobContext",
+    "JobPermanentError",
+    "JobWorkerPool",
+    "enqueue",
+    "job_handler",
+    "purgar_jobs_terminados"
+]
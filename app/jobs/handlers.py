@@ -0,0 +1,47 @@
+"""Handlers for the work that runs as background jobs."""
+
+from app.jobs.queue import JobContext, JobPermanentError, job_handler
+from app.repositories import PrescripcionRepository, RegistroRepository
+from app.schemas import InformeMensual
+from app.services import preparar_informe_mensual
+
+
+@job_handler("informe_mensual")
+async def informe_mensual(contexto: JobContext, payload: dict) -> dict:
+    """Monthly report with AI summary; payload ``{"year": int, "month": int}``."""
+    year, month = payload["year"], payload["month"]
+    async with contexto.read_session_factory() as session:
+        registros = await RegistroRepository(session, contexto.paciente_id).get_monthly_data(year, month)
+        datos_para_ia, tendencias, ejercicios_analizados = preparar_informe_mensual(registros)
+    
+    if not registros:
+        raise JobPermanentError("No hay registros para el período seleccionado")
+    
+    periodo = f"{month:02d}/{year}"
+    resumen = await contexto.bedrock.generar_informe_mensual(datos_para_ia, periodo)
+    return InformeMensual(
+        periodo=periodo,
+        ejercicios_analizados=ejercicios_analizados,
+        total_sesiones=len(registros),
+        resumen=resumen,
+        tendencias=tendencias
+    ).model_dump(mode="json")
+
+
+@job_handler("recomendacion")
+async def recomendacion(contexto: JobContext, payload: dict) -> dict:
+    """Session recommendation; payload ``{"entradas": [...]}`` as for ``generar_recomendacion_sesion``."""
+    return {"recomendacion": await contexto.bedrock.generar_recomendacion_sesion(payload["entradas"])}
+
+
+@job_handler("siguiente_sesion")
+async def siguiente_sesion(contexto: JobContext, payload: dict) -> dict:
+    """Recompute the next-session prescriptions; payload ``{"ejercicio_ids": [...]}``."""
+    async with contexto.session_factory() as session:
+        repo = PrescripcionRepository(session, contexto.paciente_id)
+        recalculadas = [
+            ejercicio_id for ejercicio_id in payload["ejercicio_ids"]
+            if await repo.recalcular(ejercicio_id) is not None
+        ]
+        await session.commit()
+    return {"ejercicio_ids": recalculadas}
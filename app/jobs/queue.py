@@ -0,0 +1,234 @@
+"""DB-backed background job queue.
+
+Jobs are rows of the ``jobs`` table, so they survive restarts and are
+shared by every API process. Workers started from the app lifespan claim
+them with a visibility timeout: a job whose worker dies is claimed again
+once the timeout passes. Failed attempts are retried with exponential
+backoff up to ``max_intentos``. Completed and failed jobs are deleted
+``jobs_retencion`` seconds after they finish (``purgar_jobs_terminados``).
+
+Handlers receive a ``JobContext`` and the job payload and return a
+JSON-serialisable result. They open their own short-lived sessions, so no
+database connection is held while waiting on Bedrock.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.models import Job
+from app.repositories import JobRepository
+from app.services import BedrockService, get_bedrock_service
+
+logger = logging.getLogger(__name__)
+
+
+class JobPermanentError(Exception):
+    """Raised by a handler when retrying the job cannot succeed."""
+
+
+@dataclass
+class JobContext:
+    """Resources available to a job handler."""
+    session_factory: sessionmaker
+    read_session_factory: sessionmaker
+    bedrock: BedrockService
+    paciente_id: str
+
+
+Handler = Callable[[JobContext, dict], Awaitable[Any]]
+
+# Registered handlers by job type
+HANDLERS: dict[str, Handler] = {}
+
+
+def job_handler(tipo: str) -> Callable[[Handler], Handler]:
+    """Register the decorated coroutine as the handler of ``tipo`` jobs."""
+    def decorator(func: Handler) -> Handler:
+        HANDLERS[tipo] = func
+        return func
+    return decorator
+
+
+async def enqueue(session: AsyncSession, paciente_id: str, tipo: str, payload: dict) -> Job:
+    """
+    Queue a job in the caller's transaction.
+    
+    Local workers are woken when that transaction commits; workers in
+    other processes pick the job up on their next poll.
+    
+    Args:
+        session: Session whose transaction the job is created in
+        paciente_id: Patient the job belongs to
+        tipo: Registered handler name
+        payload: JSON-serialisable handler arguments
+    
+    Returns:
+        The queued job
+    """
+    if tipo not in HANDLERS:
+        raise ValueError(f"Unknown job type: {tipo}")
+    job = await JobRepository(session, paciente_id).create(
+        tipo, payload, max_intentos=get_settings().jobs_max_intentos
+    )
+    pool = _pool
+    if pool is not None:
+        event.listen(session.sync_session, "after_commit", lambda _: pool.despertar(), once=True)
+    return job
+
+
+class JobWorkerPool:
+    """Asyncio workers that claim and run queued jobs."""
+    
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        read_session_factory: Optional[sessionmaker] = None,
+        workers: int = 2,
+        visibility_timeout: float = 120.0,
+        visibility_margin: float = 10.0,
+        poll_interval: float = 1.0,
+        retry_backoff: float = 5.0,
+        bedrock_factory: Callable[[], BedrockService] = get_bedrock_service
+    ):
+        """
+        Args:
+            session_factory: Factory for the primary database
+            read_session_factory: Factory handlers read through (default: primary)
+            workers: Number of concurrent workers
+            visibility_timeout: Seconds a claim lasts; handlers are cancelled
+                before it expires so a job never runs twice at once
+            visibility_margin: Seconds before the claim expires at which the
+                handler is cancelled, left to record its outcome
+            poll_interval: Seconds between polls when the queue is empty
+            retry_backoff: Delay before the first retry, doubled on each attempt
+            bedrock_factory: Returns the Bedrock service given to handlers
+        """
+        if not 0 <= visibility_margin < visibility_timeout:
+            raise ValueError("visibility_margin must be shorter than visibility_timeout")
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory or session_factory
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.visibility_margin = visibility_margin
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.bedrock_factory = bedrock_factory
+        self._tasks: list[asyncio.Task] = []
+        self._nuevo_trabajo = asyncio.Event()
+    
+    def despertar(self) -> None:
+        """Wake idle workers (a job was just queued)."""
+        self._nuevo_trabajo.set()
+    
+    async def start(self) -> None:
+        """Start the workers and make this the pool woken by ``enqueue``."""
+        global _pool
+        _pool = self
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        logger.info("Started %s job workers", self.workers)
+    
+    async def stop(self) -> None:
+        """Cancel the workers; jobs in flight are retried after their visibility timeout."""
+        global _pool
+        if _pool is self:
+            _pool = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+    
+    async def _run(self) -> None:
+        while True:
+            self._nuevo_trabajo.clear()
+            try:
+                if await self.procesar_siguiente():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Job worker error, retrying after poll interval: %s", e)
+            try:
+                await asyncio.wait_for(self._nuevo_trabajo.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def procesar_siguiente(self) -> bool:
+        """
+        Claim and run one job.
+        
+        Returns:
+            Whether a job was available
+        """
+        loop = asyncio.get_running_loop()
+        # The claim lasts from (at the latest) here, not from when the handler starts
+        reclamado = loop.time()
+        async with self.session_factory() as session:
+            job = await JobRepository(session).claim_next(self.visibility_timeout)
+            await session.commit()
+        if job is None:
+            return False
+        
+        resultado, error, reintentar_en = None, None, None
+        try:
+            handler = HANDLERS.get(job.tipo)
+            if handler is None:
+                raise JobPermanentError(f"Tipo de trabajo desconocido: {job.tipo}")
+            if job.intentos > job.max_intentos:
+                # Claimed again after its workers kept dying past the visibility timeout
+                raise JobPermanentError("Se superó el número máximo de intentos")
+            contexto = JobContext(
+                session_factory=self.session_factory,
+                read_session_factory=self.read_session_factory,
+                bedrock=self.bedrock_factory(),
+                paciente_id=job.paciente_id
+            )
+            plazo = self.visibility_timeout - self.visibility_margin - (loop.time() - reclamado)
+            resultado = await asyncio.wait_for(handler(contexto, job.payload), timeout=max(0.0, plazo))
+        except JobPermanentError as e:
+            error = str(e)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if job.intentos < job.max_intentos:
+                reintentar_en = self.retry_backoff * 2 ** (job.intentos - 1)
+            logger.warning("Job %s (%s) attempt %s failed: %s", job.id, job.tipo, job.intentos, error)
+        
+        async with self.session_factory() as session:
+            repo = JobRepository(session)
+            if error is None:
+                registrado = await repo.complete(job, resultado)
+            else:
+                registrado = await repo.fail(job, error, retry_in=reintentar_en)
+            await session.commit()
+        if not registrado:
+            logger.warning("Job %s outcome discarded: its claim expired and it was claimed again", job.id)
+        return True
+
+
+# Pool started by the lifespan, woken by ``enqueue``
+_pool: Optional[JobWorkerPool] = None
+
+
+async def purgar_jobs_terminados(session_factory: sessionmaker, retencion: float, intervalo: float = 3600) -> None:
+    """
+    Background task: every ``intervalo`` seconds, delete the jobs that
+    completed or failed more than ``retencion`` seconds ago.
+    
+    Runs until cancelled (from the application lifespan).
+    """
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            async with session_factory() as session:
+                borrados = await JobRepository(session).purgar(retencion)
+                await session.commit()
+            if borrados:
+                logger.info("Purged %s finished jobs", borrados)
+        except Exception as e:
+            logger.error("Failed to purge finished jobs: %s", e, exc_info=True)
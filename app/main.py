@@ -1,42 +1,105 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import DBAPIError
+import asyncio
 import logging
-import sys
 
 from app.api import api_router
-from app.db import init_db
+from app.api.idempotencia import purgar_claves_caducadas
+from app.db import (
+    async_read_session,
+    async_session,
+    es_statement_timeout,
+    init_db,
+    monthly_partitions_enabled,
+    maintain_partitions
+)
+from app.core.admission import AdmissionMiddleware
 from app.core.config import get_settings
+from app.core.deadline import DeadlineMiddleware, registrar_plazo_agotado
+from app.core.logs import RequestIdMiddleware, configurar_logging
+from app.core.metrics import metricas
+from app.core.profiling import ProfilingMiddleware
+from app.jobs import JobWorkerPool, purgar_jobs_terminados
+from app.services import get_bedrock_service
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=sys.stdout
-)
+# Formatting and stdout writes happen on a background thread
+configurar_logging()
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan handler - initialize DB on startup."""
-    # Startup
-    logger.info("Starting application...")
+async def _init_database(app: FastAPI) -> None:
+    """Create tables, recording the outcome in ``app.state.startup``."""
     try:
-        logger.info(f"Initializing database connection...")
-        # Add a timeout or just try
+        logger.info("Initializing database connection...")
         await init_db()
+        app.state.startup["database"] = "ready"
         logger.info("Database initialized successfully.")
     except Exception as e:
-        logger.error(f"Failed to initialize database: {str(e)}", exc_info=True)
+        app.state.startup["database"] = "error"
+        logger.error("Failed to initialize database: %s", e, exc_info=True)
         logger.warning("Application starting without database connection. DB-dependent endpoints will fail.")
         # We don't raise here to allow the container to start and logs to be flushed
+
+
+async def _warm_up_bedrock(app: FastAPI) -> None:
+    """Import boto3, build the Bedrock client and resolve credentials off the event loop."""
+    try:
+        service = await asyncio.to_thread(get_bedrock_service)
+        await asyncio.to_thread(service.warm_up)
+        app.state.startup["bedrock"] = "ready"
+        logger.info("Bedrock client warmed up.")
+    except Exception as e:
+        app.state.startup["bedrock"] = "error"
+        logger.warning("Bedrock warm-up failed, client will be created on first use: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan handler - initialize DB on startup."""
+    # Startup
+    logger.info("Starting application...")
+    app.state.startup = {"database": "pending", "bedrock": "pending"}
+    background = []
+    
+    if settings.fast_startup:
+        # Serve /health right away; DB and Bedrock become ready in the background
+        background = [
+            asyncio.create_task(_init_database(app)),
+            asyncio.create_task(_warm_up_bedrock(app))
+        ]
+    else:
+        await _init_database(app)
+    
+    if monthly_partitions_enabled():
+        background.append(asyncio.create_task(maintain_partitions()))
+    background.append(asyncio.create_task(purgar_claves_caducadas(async_session)))
+    background.append(asyncio.create_task(purgar_jobs_terminados(async_session, settings.jobs_retencion)))
+    
+    workers = None
+    if settings.jobs_workers > 0:
+        workers = JobWorkerPool(
+            async_session,
+            async_read_session,
+            workers=settings.jobs_workers,
+            visibility_timeout=settings.jobs_visibility_timeout,
+            visibility_margin=settings.jobs_visibility_margen,
+            poll_interval=settings.jobs_poll_interval,
+            retry_backoff=settings.jobs_retry_backoff
+        )
+        await workers.start()
     
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    if workers is not None:
+        await workers.stop()
+    for task in background:
+        task.cancel()
 
 
 def create_app() -> FastAPI:
@@ -50,6 +113,13 @@ def create_app() -> FastAPI:
         redoc_url="/redoc"
     )
     
+    # Innermost: profiles cover routing, validation, the handler and serialisation
+    app.add_middleware(ProfilingMiddleware)
+    # Request deadlines and load shedding; added before CORS so its headers also reach their 504/429 responses
+    app.add_middleware(DeadlineMiddleware)
+    # Outside the deadline: rejected requests never start one
+    app.add_middleware(AdmissionMiddleware)
+    
     # CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -58,14 +128,35 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Outermost: every log record of the request, including rejections, carries its id
+    app.add_middleware(RequestIdMiddleware)
+    
+    @app.exception_handler(DBAPIError)
+    async def db_error_handler(request: Request, exc: DBAPIError):
+        if es_statement_timeout(exc):
+            # statement_timeout was set from the request deadline
+            registrar_plazo_agotado("db")
+            return JSONResponse(
+                status_code=504,
+                content={"detail": "La consulta superó el plazo de la petición"}
+            )
+        raise exc
     
     # Include API routes
     app.include_router(api_router, prefix="/api/v1")
     
     # Health check endpoint
     @app.get("/health")
-    async def health_check():
-        return {"status": "healthy", "version": "1.0.0"}
+    async def health_check(request: Request):
+        return {
+            "status": "healthy",
+            "version": "1.0.0",
+            "startup": getattr(request.app.state, "startup", {})
+        }
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
     
     @app.get("/")
     async def root():
@@ -1,5 +1,17 @@
 """Database models for PhysioTrainer."""
 
-from app.models.models import Ejercicio, Registro
+from app.models.models import (
+    Cambio,
+    ClaveIdempotencia,
+    ContadorCambios,
+    Ejercicio,
+    EstadoEjercicio,
+    EstadoIdempotencia,
+    EstadoJob,
+    Job,
+    Prescripcion,
+    Registro
+)
 
-__all__ = ["Ejercicio", "Registro"]
+__all__ = ["Cambio", "ClaveIdempotencia", "ContadorCambios", "Ejercicio", "EstadoEjercicio", "EstadoIdempotencia",
+           "EstadoJob", "Job", "Prescripcion", "Registro"]
@@ -1,6 +1,8 @@
 from sqlmodel import SQLModel, Field, Relationship
-from typing import List, Optional
+from sqlalchemy import JSON, Column, Index, UniqueConstraint, text
+from typing import Any, List, Optional
 from datetime import datetime
+from enum import Enum
 import uuid
 
 
@@ -13,9 +15,14 @@ class Ejercicio(SQLModel, table=True):
     """Exercise model for tracking different rehabilitation exercises."""
     
     __tablename__ = "ejercicios"
+    __table_args__ = (
+        # Exercise names are unique per patient; also serves patient-scoped lookups
+        UniqueConstraint("paciente_id", "nombre", name="uq_ejercicios_paciente_nombre"),
+    )
     
     id: Optional[str] = Field(default_factory=generate_uuid, primary_key=True)
-    nombre: str = Field(index=True, unique=True, description="Nombre único del ejercicio")
+    paciente_id: str = Field(max_length=64, description="Paciente propietario del ejercicio")
+    nombre: str = Field(description="Nombre del ejercicio (único por paciente)")
     categoria: str = Field(description="Categoría del ejercicio (ej: fuerza, movilidad)")
     umbral_dolor_max: int = Field(default=4, description="Umbral máximo de dolor aceptable (0-10)")
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -38,8 +45,21 @@ class Registro(SQLModel, table=True):
     """Training session record with pain tracking."""
     
     __tablename__ = "registros"
+    __table_args__ = (
+        # Patient-leading indexes: every query is scoped to one patient
+        Index("ix_registros_paciente_ejercicio_fecha", "paciente_id", "ejercicio_id", "fecha"),
+        Index("ix_registros_paciente_fecha", "paciente_id", "fecha"),
+        Index(
+            "ix_registros_paciente_pendientes",
+            "paciente_id",
+            "fecha",
+            postgresql_where=text("dolor_24h IS NULL"),
+            sqlite_where=text("dolor_24h IS NULL")
+        ),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
+    paciente_id: str = Field(max_length=64, description="Paciente propietario del registro")
     fecha: datetime = Field(default_factory=datetime.utcnow, description="Fecha y hora del registro")
     series: int = Field(ge=1, description="Número de series realizadas")
     reps: int = Field(ge=1, description="Número de repeticiones por serie")
@@ -70,3 +90,149 @@ class Registro(SQLModel, table=True):
                 "notas": "Buena sesión, sin molestias"
             }
         }
+
+
+class EstadoEjercicio(SQLModel, table=True):
+    """Rolling pain state of one ejercicio, kept up to date on every write.
+    
+    Holds what the chat recommendation (recent pain values) and the
+    next-session prescription (latest session and 24h response) read, by
+    primary key instead of re-scanning recent registros.
+    """
+    
+    __tablename__ = "estado_ejercicios"
+    
+    ejercicio_id: str = Field(foreign_key="ejercicios.id", primary_key=True)
+    paciente_id: str = Field(max_length=64, description="Paciente propietario del ejercicio")
+    dolores_recientes: List[int] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False),
+        description="Últimos valores de dolor intra, del más reciente al más antiguo"
+    )
+    total_sesiones: int = Field(default=0)
+    ultimo_registro_id: Optional[int] = Field(default=None)
+    ultimo_dolor_24h: Optional[int] = Field(default=None, description="Última respuesta de dolor a las 24h")
+    ultimo_dolor_24h_registro_id: Optional[int] = Field(default=None)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Prescripcion(SQLModel, table=True):
+    """Suggested next session of one ejercicio.
+    
+    Recomputed by a background job after every registro or dolor_24h write,
+    so ``GET /ejercicios/{id}/siguiente-sesion`` is a primary-key read.
+    """
+    
+    __tablename__ = "prescripciones"
+    
+    ejercicio_id: str = Field(foreign_key="ejercicios.id", primary_key=True)
+    paciente_id: str = Field(max_length=64, description="Paciente propietario del ejercicio")
+    registro_id: int = Field(description="Última sesión en la que se basa")
+    series: int
+    reps: int
+    peso: float = Field(description="Peso sugerido en kg")
+    volumen: float = Field(description="Volumen sugerido (series x reps x peso)")
+    cambio_porcentual: Optional[float] = Field(default=None)
+    estado: str = Field(max_length=16, description="Semáforo aplicado: verde, amarillo o rojo")
+    recomendacion: str
+    respuesta_24h: Optional[str] = Field(
+        default=None, max_length=32, description="Interpretación de la última respuesta de dolor a las 24h"
+    )
+    pendiente_24h: bool = Field(default=True, description="Si la última sesión aún no tiene dolor a las 24h")
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class EstadoJob(str, Enum):
+    """Lifecycle of a background job."""
+    PENDIENTE = "pendiente"
+    EN_CURSO = "en_curso"
+    COMPLETADO = "completado"
+    FALLIDO = "fallido"
+
+
+class Job(SQLModel, table=True):
+    """Long-running (AI) work queued by the API and processed by the lifespan workers."""
+    
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest available job
+        Index("ix_jobs_estado_disponible", "estado", "disponible_en"),
+    )
+    
+    id: Optional[str] = Field(default_factory=generate_uuid, primary_key=True)
+    paciente_id: str = Field(max_length=64, description="Paciente que encoló el trabajo")
+    tipo: str = Field(max_length=64, description="Tipo de trabajo (nombre del handler)")
+    estado: str = Field(default=EstadoJob.PENDIENTE.value, max_length=16)
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    resultado: Optional[Any] = Field(default=None, sa_column=Column(JSON))
+    error: Optional[str] = Field(default=None)
+    intentos: int = Field(default=0, description="Intentos iniciados")
+    max_intentos: int = Field(default=3)
+    disponible_en: datetime = Field(
+        default_factory=datetime.utcnow,
+        description="Cuándo puede reclamarse (reintento o fin del visibility timeout)"
+    )
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ContadorCambios(SQLModel, table=True):
+    """Last change sequence number handed out to a patient.
+    
+    Writers lock this row to take the next numbers, so one patient's
+    changes commit in sequence order and a sync token never skips a change
+    that was still uncommitted when it was issued.
+    """
+    
+    __tablename__ = "contadores_cambios"
+    
+    paciente_id: str = Field(primary_key=True, max_length=64)
+    seq: int = Field(default=0)
+
+
+class Cambio(SQLModel, table=True):
+    """Change log entry: an ejercicio or registro inserted or updated."""
+    
+    __tablename__ = "cambios"
+    
+    # (paciente_id, seq) also serves the "changes since" scan of /sync
+    paciente_id: str = Field(primary_key=True, max_length=64)
+    seq: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    entidad: str = Field(max_length=16, description="ejercicio o registro")
+    entidad_id: str = Field(max_length=64)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class EstadoIdempotencia(str, Enum):
+    """Lifecycle of an idempotency key."""
+    EN_CURSO = "en_curso"
+    COMPLETADA = "completada"
+
+
+class ClaveIdempotencia(SQLModel, table=True):
+    """A POST sent with an ``Idempotency-Key`` header and, once done, its response.
+    
+    Retries with the same key wait while it is ``en_curso`` and get the
+    stored response back once it is ``completada``, until ``expira_en``.
+    """
+    
+    __tablename__ = "claves_idempotencia"
+    __table_args__ = (
+        # Expired keys are purged in the background
+        Index("ix_claves_idempotencia_expira_en", "expira_en"),
+    )
+    
+    paciente_id: str = Field(primary_key=True, max_length=64)
+    clave: str = Field(primary_key=True, max_length=255)
+    huella: str = Field(max_length=64, description="SHA-256 del método, la ruta y el cuerpo de la petición")
+    intento: str = Field(
+        default_factory=generate_uuid, max_length=36, description="Petición que tiene la clave reservada"
+    )
+    estado: str = Field(default=EstadoIdempotencia.EN_CURSO.value, max_length=16)
+    status_code: Optional[int] = Field(default=None)
+    respuesta: Optional[Any] = Field(default=None, sa_column=Column(JSON))
+    cabeceras: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    bloqueada_hasta: datetime = Field(description="Hasta cuándo es válida la reserva de una clave en curso")
+    expira_en: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
@@ -1,5 +1,29 @@
 """Repository classes for database operations."""
 
-from app.repositories.repositories import EjercicioRepository, RegistroRepository
+from app.repositories.repositories import (
+    ENTIDAD_EJERCICIO,
+    ENTIDAD_REGISTRO,
+    CambioRepository,
+    EjercicioRepository,
+    EstadoEjercicioRepository,
+    IdempotenciaRepository,
+    IndicesNombres,
+    JobRepository,
+    PrescripcionRepository,
+    RegistroRepository,
+    get_indices_nombres
+)
 
-__all__ = ["EjercicioRepository", "RegistroRepository"]
+__all__ = [
+    "ENTIDAD_EJERCICIO",
+    "ENTIDAD_REGISTRO",
+    "CambioRepository",
+    "EjercicioRepository",
+    "EstadoEjercicioRepository",
+    "IdempotenciaRepository",
+    "IndicesNombres",
+    "JobRepository",
+    "PrescripcionRepository",
+    "RegistroRepository",
+    "get_indices_nombres"
+]
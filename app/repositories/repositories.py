@@ -1,79 +1,586 @@
-from typing import Optional
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
 from datetime import datetime, timedelta
 from sqlmodel import select
+from sqlalchemy import Row, delete, event, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Ejercicio, Registro
+from app.core.config import get_settings
+from app.db.trigramas import pg_trgm_disponible
+from app.models import (
+    Cambio,
+    ClaveIdempotencia,
+    ContadorCambios,
+    Ejercicio,
+    EstadoEjercicio,
+    EstadoIdempotencia,
+    EstadoJob,
+    Job,
+    Prescripcion,
+    Registro
+)
 from app.schemas import EjercicioCreate, RegistroCreate
+from app.services.nombres_service import (
+    IndiceTrigramas,
+    nombre_normalizado_sql,
+    normalizar_nombre,
+    numeros,
+    similitud
+)
+from app.services.progresion_service import calcular_siguiente_sesion, evaluar_dolor_24h
+from app.services.series_service import get_series
+
+
+class IndicesNombres:
+    """
+    Trigram indexes of each patient's ejercicio names, shared by the repositories of a process.
+    
+    An index is reused while the patient's change log shows no ejercicio
+    written since it was built (``CambioRepository`` records every create),
+    so resolving a name costs one counter read instead of reading and
+    indexing the whole catalog. Least recently used patients are dropped
+    past ``max_pacientes``.
+    """
+    
+    def __init__(self, max_pacientes: int = 1000):
+        self.max_pacientes = max_pacientes
+        self._indices: OrderedDict[str, tuple[int, IndiceTrigramas[str]]] = OrderedDict()
+    
+    def reset(self) -> None:
+        """Forget every index (benchmarks, tests)."""
+        self._indices.clear()
+    
+    async def obtener(self, session: AsyncSession, paciente_id: str) -> IndiceTrigramas[str]:
+        """Ejercicio names of a patient as ``session`` sees them, rebuilt if any changed since last time."""
+        # Uncommitted ejercicios of this session must not leak into the shared index
+        pendientes = session.sync_session.info.get("cambios_pendientes", ())
+        compartido = not any(p == paciente_id and e == ENTIDAD_EJERCICIO for p, e, _ in pendientes)
+        # Token first: ejercicios committed in between are picked up by the next check
+        token = await CambioRepository(session, paciente_id).ultimo()
+        guardado = self._indices.get(paciente_id)
+        if compartido and guardado is not None:
+            visto, indice = guardado
+            if token == visto or (token > visto and not await self._ejercicios_cambiados(session, paciente_id, visto, token)):
+                self._indices[paciente_id] = (token, indice)
+                self._indices.move_to_end(paciente_id)
+                return indice
+        
+        result = await session.execute(
+            select(Ejercicio.id, Ejercicio.nombre).where(Ejercicio.paciente_id == paciente_id)
+        )
+        indice = IndiceTrigramas()
+        for ejercicio_id, nombre in result.all():
+            indice.add(ejercicio_id, nombre)
+        if not compartido:
+            return indice
+        self._indices[paciente_id] = (token, indice)
+        self._indices.move_to_end(paciente_id)
+        while len(self._indices) > self.max_pacientes:
+            self._indices.popitem(last=False)
+        return indice
+    
+    async def _ejercicios_cambiados(self, session: AsyncSession, paciente_id: str, desde: int, hasta: int) -> bool:
+        result = await session.execute(
+            select(Cambio.seq)
+            .where(Cambio.paciente_id == paciente_id)
+            .where(Cambio.seq > desde)
+            .where(Cambio.seq <= hasta)
+            .where(Cambio.entidad == ENTIDAD_EJERCICIO)
+            .limit(1)
+        )
+        return result.first() is not None
+
+
+_indices: Optional[IndicesNombres] = None
+
+
+def get_indices_nombres() -> IndicesNombres:
+    """Get the process-wide name indexes (lazy initialization)."""
+    global _indices
+    if _indices is None:
+        _indices = IndicesNombres()
+    return _indices
 
 
 class EjercicioRepository:
-    """Repository for Ejercicio CRUD operations."""
+    """Repository for Ejercicio CRUD operations, scoped to one patient."""
     
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, paciente_id: Optional[str] = None):
         self.session = session
+        self.paciente_id = paciente_id or get_settings().default_paciente_id
+        self._indice: Optional[IndiceTrigramas[str]] = None
+        # Ejercicios created through this repository after it got its index
+        self._nuevos: IndiceTrigramas[str] = IndiceTrigramas()
     
     async def get_by_id(self, ejercicio_id: str) -> Optional[Ejercicio]:
         """Get ejercicio by ID."""
         result = await self.session.execute(
-            select(Ejercicio).where(Ejercicio.id == ejercicio_id)
+            select(Ejercicio)
+            .where(Ejercicio.paciente_id == self.paciente_id)
+            .where(Ejercicio.id == ejercicio_id)
         )
         return result.scalar_one_or_none()
     
     async def get_by_nombre(self, nombre: str) -> Optional[Ejercicio]:
         """Get ejercicio by name (case-insensitive)."""
         result = await self.session.execute(
-            select(Ejercicio).where(Ejercicio.nombre.ilike(nombre))
+            select(Ejercicio)
+            .where(Ejercicio.paciente_id == self.paciente_id)
+            .where(Ejercicio.nombre.ilike(nombre))
         )
         return result.scalar_one_or_none()
     
     async def get_all(self) -> list[Ejercicio]:
         """Get all ejercicios."""
-        result = await self.session.execute(select(Ejercicio))
+        result = await self.session.execute(
+            select(Ejercicio).where(Ejercicio.paciente_id == self.paciente_id)
+        )
         return result.scalars().all()
     
     async def create(self, data: EjercicioCreate) -> Ejercicio:
         """Create new ejercicio."""
-        ejercicio = Ejercicio(**data.model_dump())
+        ejercicio = Ejercicio(**data.model_dump(), paciente_id=self.paciente_id)
         self.session.add(ejercicio)
         await self.session.flush()
         await self.session.refresh(ejercicio)
+        await CambioRepository(self.session, self.paciente_id).registrar(ENTIDAD_EJERCICIO, [ejercicio.id])
+        self._nuevos.add(ejercicio.id, ejercicio.nombre)
         return ejercicio
     
+    async def buscar_similar(self, nombre: str) -> Optional[Ejercicio]:
+        """
+        Most similar existing ejercicio to ``nombre``.
+        
+        Names are compared without case or accents by trigram similarity
+        (``pg_trgm`` on PostgreSQL, an in-memory trigram index elsewhere);
+        matches below ``ejercicio_similitud_minima`` or with different
+        numbers in the name are ignored.
+        """
+        umbral = get_settings().ejercicio_similitud_minima
+        if pg_trgm_disponible() and self.session.bind.dialect.name == "postgresql":
+            normalizado = nombre_normalizado_sql(Ejercicio.nombre)
+            consulta = normalizar_nombre(nombre)
+            puntuacion = func.similarity(normalizado, consulta)
+            # "%" is the index-assisted form of similarity() >= pg_trgm.similarity_threshold
+            await self.session.execute(
+                select(func.set_config("pg_trgm.similarity_threshold", str(umbral), True))
+            )
+            result = await self.session.execute(
+                select(Ejercicio)
+                .where(Ejercicio.paciente_id == self.paciente_id)
+                .where(normalizado.op("%")(consulta))
+                .order_by(puntuacion.desc())
+                .limit(5)
+            )
+            numeros_nombre = numeros(nombre)
+            return next((e for e in result.scalars() if numeros(e.nombre) == numeros_nombre), None)
+        
+        mejor = (await self._buscar_en_indice([nombre], umbral))[nombre]
+        return await self.get_by_id(mejor[0]) if mejor else None
+    
+    async def buscar_similares(self, nombres: list[str]) -> dict[str, Optional[Ejercicio]]:
+        """
+        ``buscar_similar`` for several names at once.
+        
+        On PostgreSQL the candidates of every name are fetched in one
+        ``pg_trgm`` query and ranked in memory; elsewhere the names are
+        looked up in the in-memory index and the matches fetched in one
+        query.
+        """
+        if not nombres:
+            return {}
+        umbral = get_settings().ejercicio_similitud_minima
+        if pg_trgm_disponible() and self.session.bind.dialect.name == "postgresql":
+            normalizado = nombre_normalizado_sql(Ejercicio.nombre)
+            await self.session.execute(
+                select(func.set_config("pg_trgm.similarity_threshold", str(umbral), True))
+            )
+            result = await self.session.execute(
+                select(Ejercicio)
+                .where(Ejercicio.paciente_id == self.paciente_id)
+                .where(or_(*(normalizado.op("%")(normalizar_nombre(nombre)) for nombre in set(nombres))))
+            )
+            por_id = {e.id: e for e in result.scalars().all()}
+            indice: IndiceTrigramas[str] = IndiceTrigramas()
+            for ejercicio in por_id.values():
+                indice.add(ejercicio.id, ejercicio.nombre)
+            mejores = {nombre: indice.buscar(nombre, umbral) for nombre in nombres}
+        else:
+            mejores = await self._buscar_en_indice(nombres, umbral)
+            por_id = {e.id: e for e in await self.get_by_ids([m[0] for m in mejores.values() if m])}
+        return {nombre: por_id[mejor[0]] if mejor else None for nombre, mejor in mejores.items()}
+    
+    async def _buscar_en_indice(self, nombres: list[str], umbral: float) -> dict[str, Optional[tuple[str, float]]]:
+        # Best match per name among the patient's catalog and this repository's own creations
+        if self._indice is None:
+            self._indice = await get_indices_nombres().obtener(self.session, self.paciente_id)
+        mejores = {}
+        for nombre in nombres:
+            candidatos = [m for m in (self._indice.buscar(nombre, umbral), self._nuevos.buscar(nombre, umbral)) if m]
+            mejores[nombre] = max(candidatos, key=lambda m: m[1]) if candidatos else None
+        return mejores
+    
     async def get_or_create(self, nombre: str, categoria: str = "General") -> Ejercicio:
-        """Get existing ejercicio or create new one."""
-        ejercicio = await self.get_by_nombre(nombre)
+        """Get existing ejercicio (exact or similar name) or create new one."""
+        ejercicio = await self.get_by_nombre(nombre) or await self.buscar_similar(nombre)
         if not ejercicio:
             ejercicio = await self.create(EjercicioCreate(
                 nombre=nombre,
                 categoria=categoria
             ))
         return ejercicio
+    
+    async def get_or_create_many(
+        self,
+        nombres: list[str],
+        categoria: str = "General"
+    ) -> dict[str, Ejercicio]:
+        """
+        Resolve several ejercicios by name, creating the missing ones.
+        
+        Exact (case-insensitive) names are resolved in one query; the rest
+        in one ``buscar_similares`` pass, and also against the ejercicios
+        created earlier in the same batch.
+        
+        Returns:
+            Mapping from each requested name to its ejercicio
+        """
+        claves = {nombre.lower() for nombre in nombres}
+        result = await self.session.execute(
+            select(Ejercicio)
+            .where(Ejercicio.paciente_id == self.paciente_id)
+            .where(func.lower(Ejercicio.nombre).in_(claves))
+        )
+        por_clave = {e.nombre.lower(): e for e in result.scalars().all()}
+        similares = await self.buscar_similares(
+            list(dict.fromkeys(nombre for nombre in nombres if nombre.lower() not in por_clave))
+        )
+        
+        nuevos: list[Ejercicio] = []
+        indice_nuevos: IndiceTrigramas[int] = IndiceTrigramas()
+        umbral = get_settings().ejercicio_similitud_minima
+        for nombre in nombres:
+            if nombre.lower() in por_clave:
+                continue
+            mejor_nuevo = indice_nuevos.buscar(nombre, umbral)
+            ejercicio = similares[nombre]
+            if mejor_nuevo and (ejercicio is None or similitud(nombre, ejercicio.nombre) < mejor_nuevo[1]):
+                ejercicio = nuevos[mejor_nuevo[0]]
+            if ejercicio is None:
+                ejercicio = Ejercicio(nombre=nombre, categoria=categoria, paciente_id=self.paciente_id)
+                indice_nuevos.add(len(nuevos), nombre)
+                nuevos.append(ejercicio)
+            por_clave[nombre.lower()] = ejercicio
+        if nuevos:
+            self.session.add_all(nuevos)
+            await self.session.flush()
+            await CambioRepository(self.session, self.paciente_id).registrar(
+                ENTIDAD_EJERCICIO, [e.id for e in nuevos]
+            )
+            for ejercicio in nuevos:
+                self._nuevos.add(ejercicio.id, ejercicio.nombre)
+        return {nombre: por_clave[nombre.lower()] for nombre in nombres}
+    
+    async def get_by_ids(self, ids: list[str]) -> list[Ejercicio]:
+        """Get several ejercicios by ID."""
+        if not ids:
+            return []
+        result = await self.session.execute(
+            select(Ejercicio)
+            .where(Ejercicio.paciente_id == self.paciente_id)
+            .where(Ejercicio.id.in_(ids))
+        )
+        return result.scalars().all()
+
+
+# Pain values kept in the rolling state of each ejercicio
+ESTADO_MAX_DOLORES = 10
+
+
+class EstadoEjercicioRepository:
+    """
+    Repository for the rolling per-ejercicio state, scoped to one patient.
+    
+    The state row is locked (``FOR UPDATE`` on PostgreSQL) and updated in the
+    same transaction as the registro write that changes it; writes touching
+    several ejercicios lock them in id order. A missing row is rebuilt from
+    the registros already stored for the ejercicio.
+    """
+    
+    def __init__(self, session: AsyncSession, paciente_id: Optional[str] = None):
+        self.session = session
+        self.paciente_id = paciente_id or get_settings().default_paciente_id
+    
+    async def get(self, ejercicio_id: str) -> Optional[EstadoEjercicio]:
+        """Get the state of an ejercicio by primary key."""
+        estado = await self.session.get(EstadoEjercicio, ejercicio_id)
+        if estado is None or estado.paciente_id != self.paciente_id:
+            return None
+        return estado
+    
+    async def registrar_sesion(self, registro: Registro) -> EstadoEjercicio:
+        """Fold a newly inserted registro into its ejercicio's state."""
+        return await self.registrar_sesiones([registro])
+    
+    async def registrar_sesiones(self, registros: list[Registro]) -> EstadoEjercicio:
+        """Fold newly inserted registros of one ejercicio, oldest first, into its state."""
+        estado, reconstruido = await self._bloquear(registros[0].ejercicio_id)
+        if not reconstruido:
+            for registro in registros:
+                estado.dolores_recientes = (
+                    [registro.dolor_intra] + list(estado.dolores_recientes)
+                )[:ESTADO_MAX_DOLORES]
+                estado.total_sesiones += 1
+                estado.ultimo_registro_id = registro.id
+            estado.updated_at = datetime.utcnow()
+            await self.session.flush()
+        return estado
+    
+    async def registrar_dolor_24h(self, registro: Registro) -> EstadoEjercicio:
+        """Record the 24h pain response of a registro in its ejercicio's state."""
+        estado, reconstruido = await self._bloquear(registro.ejercicio_id)
+        if not reconstruido and (
+            estado.ultimo_dolor_24h_registro_id is None
+            or registro.id >= estado.ultimo_dolor_24h_registro_id
+        ):
+            estado.ultimo_dolor_24h = registro.dolor_24h
+            estado.ultimo_dolor_24h_registro_id = registro.id
+            estado.updated_at = datetime.utcnow()
+            await self.session.flush()
+        return estado
+    
+    async def _bloquear(self, ejercicio_id: str) -> tuple[EstadoEjercicio, bool]:
+        """
+        Lock the state row, creating it from history if it does not exist.
+        
+        Returns:
+            The state and whether it was just rebuilt (and so already
+            reflects every registro flushed in this transaction)
+        """
+        estado = await self.session.get(
+            EstadoEjercicio, ejercicio_id, with_for_update=True, populate_existing=True
+        )
+        if estado is not None:
+            return estado, False
+        
+        estado = await self.reconstruir(ejercicio_id)
+        try:
+            async with self.session.begin_nested():
+                self.session.add(estado)
+        except IntegrityError:
+            # A concurrent writer created the row first; update theirs
+            estado = await self.session.get(
+                EstadoEjercicio, ejercicio_id, with_for_update=True, populate_existing=True
+            )
+            return estado, False
+        return estado, True
+    
+    async def reconstruir(self, ejercicio_id: str) -> EstadoEjercicio:
+        """Build (without saving) the state of an ejercicio from its stored registros."""
+        filtro = (
+            (Registro.paciente_id == self.paciente_id)
+            & (Registro.ejercicio_id == ejercicio_id)
+        )
+        recientes = (await self.session.execute(
+            select(Registro.id, Registro.dolor_intra)
+            .where(filtro)
+            .order_by(Registro.fecha.desc(), Registro.id.desc())
+            .limit(ESTADO_MAX_DOLORES)
+        )).all()
+        total = (await self.session.execute(
+            select(func.count()).select_from(Registro).where(filtro)
+        )).scalar_one()
+        respuesta_24h = (await self.session.execute(
+            select(Registro.id, Registro.dolor_24h)
+            .where(filtro)
+            .where(Registro.dolor_24h != None)
+            .order_by(Registro.fecha.desc(), Registro.id.desc())
+            .limit(1)
+        )).first()
+        
+        estado = EstadoEjercicio(
+            ejercicio_id=ejercicio_id,
+            paciente_id=self.paciente_id,
+            dolores_recientes=[fila.dolor_intra for fila in recientes],
+            total_sesiones=total
+        )
+        if recientes:
+            estado.ultimo_registro_id = recientes[0].id
+        if respuesta_24h:
+            estado.ultimo_dolor_24h_registro_id, estado.ultimo_dolor_24h = respuesta_24h
+        return estado
+
+
+class PrescripcionRepository:
+    """Repository for the suggested next session of each ejercicio, scoped to one patient."""
+    
+    def __init__(self, session: AsyncSession, paciente_id: Optional[str] = None):
+        self.session = session
+        self.paciente_id = paciente_id or get_settings().default_paciente_id
+    
+    async def get(self, ejercicio_id: str) -> Optional[Prescripcion]:
+        """Get the prescription of an ejercicio by primary key."""
+        prescripcion = await self.session.get(Prescripcion, ejercicio_id)
+        if prescripcion is None or prescripcion.paciente_id != self.paciente_id:
+            return None
+        return prescripcion
+    
+    async def recalcular(self, ejercicio_id: str) -> Optional[Prescripcion]:
+        """
+        Recompute and store the prescription of an ejercicio from its state.
+        
+        The state row is locked (``FOR UPDATE`` on PostgreSQL) as registro
+        writes do, so concurrent recomputations of one ejercicio run one
+        after the other and the last to commit saw the latest session.
+        
+        Returns:
+            The prescription, or None if the ejercicio has no sessions
+        """
+        estado = await self.session.get(
+            EstadoEjercicio, ejercicio_id, with_for_update=True, populate_existing=True
+        )
+        if estado is None or estado.paciente_id != self.paciente_id or estado.ultimo_registro_id is None:
+            return None
+        
+        ids = {estado.ultimo_registro_id, estado.ultimo_dolor_24h_registro_id} - {None}
+        result = await self.session.execute(
+            select(Registro)
+            .where(Registro.paciente_id == self.paciente_id)
+            .where(Registro.id.in_(ids))
+        )
+        registros = {registro.id: registro for registro in result.scalars().all()}
+        ultimo = registros.get(estado.ultimo_registro_id)
+        if ultimo is None:
+            return None
+        respuesta_24h = None
+        con_24h = registros.get(estado.ultimo_dolor_24h_registro_id)
+        if con_24h is not None and con_24h.dolor_24h is not None:
+            respuesta_24h = evaluar_dolor_24h(con_24h.dolor_intra, con_24h.dolor_24h)
+        
+        datos = calcular_siguiente_sesion(ultimo.series, ultimo.reps, ultimo.peso, ultimo.dolor_intra, respuesta_24h)
+        prescripcion = await self.session.get(Prescripcion, ejercicio_id)
+        if prescripcion is None:
+            prescripcion = Prescripcion(ejercicio_id=ejercicio_id, paciente_id=self.paciente_id)
+            self.session.add(prescripcion)
+        for campo, valor in datos.items():
+            setattr(prescripcion, campo, valor)
+        prescripcion.registro_id = ultimo.id
+        prescripcion.respuesta_24h = respuesta_24h["interpretacion"] if respuesta_24h else None
+        prescripcion.pendiente_24h = ultimo.dolor_24h is None
+        prescripcion.updated_at = datetime.utcnow()
+        await self.session.flush()
+        return prescripcion
 
 
 class RegistroRepository:
-    """Repository for Registro CRUD operations."""
+    """Repository for Registro CRUD operations, scoped to one patient."""
     
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, paciente_id: Optional[str] = None):
         self.session = session
+        self.paciente_id = paciente_id or get_settings().default_paciente_id
     
     async def get_by_id(self, registro_id: int) -> Optional[Registro]:
         """Get registro by ID."""
         result = await self.session.execute(
-            select(Registro).where(Registro.id == registro_id)
+            select(Registro)
+            .options(selectinload(Registro.ejercicio))
+            .where(Registro.paciente_id == self.paciente_id)
+            .where(Registro.id == registro_id)
         )
         return result.scalar_one_or_none()
     
-    async def get_all(self, limit: int = 100, offset: int = 0) -> list[Registro]:
-        """Get all registros with pagination."""
-        result = await self.session.execute(
-            select(Registro)
+    def _select_registros(self):
+        return select(Registro).options(selectinload(Registro.ejercicio))
+    
+    def _select_filas(self):
+        """Columns of ``RegistroResponse``, computed in SQL, for row-tuple reads."""
+        return (
+            select(
+                Registro.id,
+                Registro.fecha,
+                Registro.series,
+                Registro.reps,
+                Registro.peso,
+                Registro.dolor_intra,
+                Registro.dolor_24h,
+                Registro.notas,
+                Ejercicio.nombre.label("ejercicio_nombre"),
+                (Registro.series * Registro.reps * Registro.peso).label("volumen_total")
+            )
+            .join(Ejercicio, Registro.ejercicio_id == Ejercicio.id)
+        )
+    
+    def _query_all(self, stmt, limit: int, offset: int):
+        return (
+            stmt.where(Registro.paciente_id == self.paciente_id)
             .order_by(Registro.fecha.desc())
             .offset(offset)
             .limit(limit)
         )
+    
+    def _query_by_ejercicio(self, stmt, ejercicio_id: str, limit: int):
+        return (
+            stmt.where(Registro.paciente_id == self.paciente_id)
+            .where(Registro.ejercicio_id == ejercicio_id)
+            .order_by(Registro.fecha.desc())
+            .limit(limit)
+        )
+    
+    def _query_pending_dolor_24h(self, stmt):
+        # Served by the partial index ix_registros_paciente_pendientes (dolor_24h IS NULL)
+        now = datetime.utcnow()
+        cutoff = now - timedelta(hours=24)
+        stmt = (
+            stmt.where(Registro.paciente_id == self.paciente_id)
+            .where(Registro.dolor_24h == None)
+            .where(Registro.fecha < cutoff)
+        )
+        max_dias = get_settings().pendientes_max_dias
+        if max_dias:
+            # Lets PostgreSQL prune old monthly partitions
+            stmt = stmt.where(Registro.fecha >= now - timedelta(days=max_dias))
+        return stmt.order_by(Registro.fecha.desc())
+    
+    async def get_all(self, limit: int = 100, offset: int = 0) -> list[Registro]:
+        """Get all registros with pagination."""
+        result = await self.session.execute(
+            self._query_all(self._select_registros(), limit, offset)
+        )
         return result.scalars().all()
     
+    async def get_filas_by_ids(self, ids: list[int]) -> list[Row]:
+        """Get several registros by ID as row tuples (``RegistroResponse`` columns)."""
+        if not ids:
+            return []
+        result = await self.session.execute(
+            self._select_filas()
+            .where(Registro.paciente_id == self.paciente_id)
+            .where(Registro.id.in_(ids))
+            .order_by(Registro.id)
+        )
+        return result.all()
+    
+    async def get_filas_tras_id(self, despues_de: int, limit: int) -> list[Row]:
+        """Get up to ``limit`` registros with ID above ``despues_de`` as row tuples, by ID (keyset paging)."""
+        result = await self.session.execute(
+            self._select_filas()
+            .where(Registro.paciente_id == self.paciente_id)
+            .where(Registro.id > despues_de)
+            .order_by(Registro.id)
+            .limit(limit)
+        )
+        return result.all()
+    
+    async def get_all_filas(self, limit: int = 100, offset: int = 0) -> list[Row]:
+        """Same as ``get_all`` as ``RegistroResponse``-shaped row tuples."""
+        result = await self.session.execute(
+            self._query_all(self._select_filas(), limit, offset)
+        )
+        return result.all()
+    
     async def get_by_ejercicio(
         self, 
         ejercicio_id: str, 
@@ -81,24 +588,35 @@ class RegistroRepository:
     ) -> list[Registro]:
         """Get registros for a specific ejercicio."""
         result = await self.session.execute(
-            select(Registro)
-            .where(Registro.ejercicio_id == ejercicio_id)
-            .order_by(Registro.fecha.desc())
-            .limit(limit)
+            self._query_by_ejercicio(self._select_registros(), ejercicio_id, limit)
         )
         return result.scalars().all()
     
+    async def get_by_ejercicio_filas(self, ejercicio_id: str, limit: int = 50) -> list[Row]:
+        """Same as ``get_by_ejercicio`` as ``RegistroResponse``-shaped row tuples."""
+        result = await self.session.execute(
+            self._query_by_ejercicio(self._select_filas(), ejercicio_id, limit)
+        )
+        return result.all()
+    
     async def get_pending_dolor_24h(self) -> list[Registro]:
-        """Get registros where dolor_24h is null and more than 24h old."""
-        cutoff = datetime.utcnow() - timedelta(hours=24)
+        """
+        Get registros where dolor_24h is null and more than 24h old.
+        
+        If ``pendientes_max_dias`` is set, only the last that many days are considered.
+        """
         result = await self.session.execute(
-            select(Registro)
-            .where(Registro.dolor_24h == None)
-            .where(Registro.fecha < cutoff)
-            .order_by(Registro.fecha.desc())
+            self._query_pending_dolor_24h(self._select_registros())
         )
         return result.scalars().all()
     
+    async def get_pending_dolor_24h_filas(self) -> list[Row]:
+        """Same as ``get_pending_dolor_24h`` as ``RegistroResponse``-shaped row tuples."""
+        result = await self.session.execute(
+            self._query_pending_dolor_24h(self._select_filas())
+        )
+        return result.all()
+    
     async def get_recent_dolor(
         self, 
         ejercicio_id: str, 
@@ -108,6 +626,7 @@ class RegistroRepository:
         cutoff = datetime.utcnow() - timedelta(days=days)
         result = await self.session.execute(
             select(Registro.dolor_intra)
+            .where(Registro.paciente_id == self.paciente_id)
             .where(Registro.ejercicio_id == ejercicio_id)
             .where(Registro.fecha > cutoff)
             .order_by(Registro.fecha.desc())
@@ -126,13 +645,55 @@ class RegistroRepository:
             peso=data.peso,
             dolor_intra=data.dolor_intra,
             notas=data.notas,
-            ejercicio_id=ejercicio_id
+            ejercicio_id=ejercicio_id,
+            paciente_id=self.paciente_id
         )
         self.session.add(registro)
         await self.session.flush()
         await self.session.refresh(registro)
+        await EstadoEjercicioRepository(self.session, self.paciente_id).registrar_sesion(registro)
+        await CambioRepository(self.session, self.paciente_id).registrar(ENTIDAD_REGISTRO, [registro.id])
+        get_series().programar(self.session, self.paciente_id, [registro])
         return registro
     
+    async def create_many(self, items: list[tuple[RegistroCreate, str]]) -> list[Registro]:
+        """
+        Create several registros with a single flush.
+        
+        Args:
+            items: ``(data, ejercicio_id)`` pairs
+        
+        Returns:
+            The new registros, in the same order
+        """
+        registros = [
+            Registro(
+                series=data.series,
+                reps=data.reps,
+                peso=data.peso,
+                dolor_intra=data.dolor_intra,
+                notas=data.notas,
+                ejercicio_id=ejercicio_id,
+                paciente_id=self.paciente_id
+            )
+            for data, ejercicio_id in items
+        ]
+        self.session.add_all(registros)
+        await self.session.flush()
+        
+        por_ejercicio: dict[str, list[Registro]] = {}
+        for registro in registros:
+            por_ejercicio.setdefault(registro.ejercicio_id, []).append(registro)
+        estados = EstadoEjercicioRepository(self.session, self.paciente_id)
+        # Locked in id order, as every write does (see ``CambioRepository``)
+        for ejercicio_id in sorted(por_ejercicio):
+            await estados.registrar_sesiones(por_ejercicio[ejercicio_id])
+        await CambioRepository(self.session, self.paciente_id).registrar(
+            ENTIDAD_REGISTRO, [r.id for r in registros]
+        )
+        get_series().programar(self.session, self.paciente_id, registros)
+        return registros
+    
     async def update_dolor_24h(
         self, 
         registro_id: int, 
@@ -144,8 +705,27 @@ class RegistroRepository:
             registro.dolor_24h = dolor_24h
             await self.session.flush()
             await self.session.refresh(registro)
+            await EstadoEjercicioRepository(self.session, self.paciente_id).registrar_dolor_24h(registro)
+            await CambioRepository(self.session, self.paciente_id).registrar(ENTIDAD_REGISTRO, [registro.id])
+            get_series().programar(self.session, self.paciente_id, [registro])
         return registro
     
+    async def get_carga_diaria(self, ejercicio_id: str) -> list[tuple]:
+        """Get (dia, sesiones, carga) per training day of an ejercicio, aggregated in SQL."""
+        dia = func.date(Registro.fecha)
+        result = await self.session.execute(
+            select(
+                dia.label("dia"),
+                func.count().label("sesiones"),
+                func.sum(Registro.series * Registro.reps * Registro.peso).label("carga")
+            )
+            .where(Registro.paciente_id == self.paciente_id)
+            .where(Registro.ejercicio_id == ejercicio_id)
+            .group_by(dia)
+            .order_by(dia)
+        )
+        return result.all()
+    
     async def get_monthly_data(
         self, 
         year: int, 
@@ -160,8 +740,419 @@ class RegistroRepository:
         
         result = await self.session.execute(
             select(Registro)
+            .options(selectinload(Registro.ejercicio))
+            .where(Registro.paciente_id == self.paciente_id)
             .where(Registro.fecha >= start_date)
             .where(Registro.fecha < end_date)
             .order_by(Registro.fecha)
         )
         return result.scalars().all()
+    
+    async def stream_for_export(
+        self,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        ejercicio_id: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[list]:
+        """
+        Stream registros joined with their ejercicio name, in batches of rows.
+        
+        Uses a server-side cursor (``yield_per``) so memory stays bounded by
+        ``batch_size`` regardless of how many rows are exported.
+        """
+        query = (
+            select(
+                Registro.id,
+                Registro.fecha,
+                Registro.ejercicio_id,
+                Ejercicio.nombre,
+                Registro.series,
+                Registro.reps,
+                Registro.peso,
+                Registro.dolor_intra,
+                Registro.dolor_24h,
+                Registro.notas
+            )
+            .join(Ejercicio, Ejercicio.id == Registro.ejercicio_id)
+            .where(Registro.paciente_id == self.paciente_id)
+            .order_by(Registro.fecha, Registro.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if desde is not None:
+            query = query.where(Registro.fecha >= desde)
+        if hasta is not None:
+            query = query.where(Registro.fecha < hasta)
+        if ejercicio_id is not None:
+            query = query.where(Registro.ejercicio_id == ejercicio_id)
+        
+        result = await self.session.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+# Entities recorded in the change log
+ENTIDAD_EJERCICIO = "ejercicio"
+ENTIDAD_REGISTRO = "registro"
+
+
+def _reservar_seq(sync_session: Session, paciente_id: str, n: int) -> int:
+    # Returns the last of n new sequence numbers of the patient
+    incrementar = (
+        update(ContadorCambios)
+        .where(ContadorCambios.paciente_id == paciente_id)
+        .values(seq=ContadorCambios.seq + n)
+        .execution_options(synchronize_session=False)
+    )
+    if sync_session.execute(incrementar).rowcount == 0:
+        try:
+            with sync_session.begin_nested():
+                sync_session.add(ContadorCambios(paciente_id=paciente_id, seq=n))
+            return n
+        except IntegrityError:
+            # Another transaction created the counter first
+            sync_session.execute(incrementar)
+    return sync_session.execute(
+        select(ContadorCambios.seq).where(ContadorCambios.paciente_id == paciente_id)
+    ).scalar_one()
+
+
+def _volcar_cambios(sync_session: Session) -> None:
+    # Savepoints fire before_commit too; only the transaction's own commit takes the numbers
+    if sync_session.in_nested_transaction():
+        return
+    pendientes = sync_session.info["cambios_pendientes"]
+    por_paciente: dict[str, list[tuple[str, str]]] = {}
+    for paciente_id, entidad, entidad_id in pendientes:
+        por_paciente.setdefault(paciente_id, []).append((entidad, entidad_id))
+    pendientes.clear()
+    for paciente_id in sorted(por_paciente):
+        cambios = por_paciente[paciente_id]
+        primero = _reservar_seq(sync_session, paciente_id, len(cambios)) - len(cambios) + 1
+        sync_session.add_all(
+            Cambio(paciente_id=paciente_id, seq=primero + i, entidad=entidad, entidad_id=entidad_id)
+            for i, (entidad, entidad_id) in enumerate(cambios)
+        )
+
+
+def _descartar_cambios(sync_session: Session, transaction) -> None:
+    if transaction.parent is None:
+        sync_session.info["cambios_pendientes"].clear()
+
+
+class CambioRepository:
+    """
+    Change log behind delta sync, scoped to one patient.
+    
+    ``registrar`` records changes in the transaction of the write that
+    makes them. Their sequence numbers are taken from the patient's counter
+    row when that transaction commits, once for all its changes. The row
+    stays locked until the commit ends, so a patient's changes commit in
+    sequence order: once a reader sees number N, every change up to N is
+    visible. A global sequence would not guarantee this (N+1 can commit
+    before N), and a client syncing in between would skip N for good.
+    
+    Taking the counter last means every write locks rows in the same
+    order (ejercicio states by id, see ``RegistroRepository.create_many``,
+    then the counter), so two writes of one patient cannot deadlock.
+    """
+    
+    def __init__(self, session: AsyncSession, paciente_id: Optional[str] = None):
+        self.session = session
+        self.paciente_id = paciente_id or get_settings().default_paciente_id
+    
+    async def registrar(self, entidad: str, ids: list) -> None:
+        """Record inserts/updates of ``entidad`` rows with the given IDs when the transaction commits."""
+        if not ids:
+            return
+        sync_session = self.session.sync_session
+        pendientes = sync_session.info.get("cambios_pendientes")
+        if pendientes is None:
+            pendientes = sync_session.info["cambios_pendientes"] = []
+            event.listen(sync_session, "before_commit", _volcar_cambios)
+            event.listen(sync_session, "after_transaction_end", _descartar_cambios)
+        pendientes.extend((self.paciente_id, entidad, str(entidad_id)) for entidad_id in ids)
+    
+    async def ultimo(self) -> int:
+        """Last sequence number handed out to the patient (0 if none)."""
+        result = await self.session.execute(
+            select(ContadorCambios.seq).where(ContadorCambios.paciente_id == self.paciente_id)
+        )
+        return result.scalar_one_or_none() or 0
+    
+    async def desde(self, since: int, limit: int) -> tuple[dict[str, list[str]], int, bool]:
+        """
+        Entities changed after sequence number ``since``.
+        
+        Args:
+            since: Token returned by a previous call
+            limit: Maximum change log entries to read
+        
+        Returns:
+            Changed IDs per entity (each ID once), the new token, and whether
+            more changes remain after it
+        """
+        hasta = await self.ultimo()
+        result = await self.session.execute(
+            select(Cambio.seq, Cambio.entidad, Cambio.entidad_id)
+            .where(Cambio.paciente_id == self.paciente_id)
+            .where(Cambio.seq > since)
+            .where(Cambio.seq <= hasta)
+            .order_by(Cambio.seq)
+            .limit(limit + 1)
+        )
+        filas = result.all()
+        hay_mas = len(filas) > limit
+        filas = filas[:limit]
+        
+        # dicts as ordered sets: an entity changed several times is returned once
+        ids: dict[str, dict[str, None]] = {ENTIDAD_EJERCICIO: {}, ENTIDAD_REGISTRO: {}}
+        for _, entidad, entidad_id in filas:
+            ids[entidad][entidad_id] = None
+        token = filas[-1].seq if hay_mas else hasta
+        return {entidad: list(vistos) for entidad, vistos in ids.items()}, token, hay_mas
+
+
+class JobRepository:
+    """
+    Repository for background jobs.
+    
+    ``create`` and ``get_by_id`` are scoped to one patient; the claim,
+    completion and purge methods are used by the workers and act on any job.
+    """
+    
+    def __init__(self, session: AsyncSession, paciente_id: Optional[str] = None):
+        self.session = session
+        self.paciente_id = paciente_id or get_settings().default_paciente_id
+    
+    async def create(self, tipo: str, payload: dict, max_intentos: int = 3) -> Job:
+        """Queue a new job."""
+        job = Job(paciente_id=self.paciente_id, tipo=tipo, payload=payload, max_intentos=max_intentos)
+        self.session.add(job)
+        await self.session.flush()
+        return job
+    
+    async def get_by_id(self, job_id: str) -> Optional[Job]:
+        """Get job by ID."""
+        result = await self.session.execute(
+            select(Job)
+            .where(Job.paciente_id == self.paciente_id)
+            .where(Job.id == job_id)
+        )
+        return result.scalar_one_or_none()
+    
+    async def claim_next(self, visibility_timeout: float) -> Optional[Job]:
+        """
+        Claim the oldest available job for ``visibility_timeout`` seconds.
+        
+        Available means pending and due, or in progress with an expired
+        claim (its worker died). The conditional UPDATE makes the claim
+        atomic on any backend; on PostgreSQL ``SKIP LOCKED`` also keeps
+        concurrent workers from queueing behind the same row.
+        """
+        ahora = datetime.utcnow()
+        disponible = (
+            Job.estado.in_([EstadoJob.PENDIENTE.value, EstadoJob.EN_CURSO.value])
+            & (Job.disponible_en <= ahora)
+        )
+        job_id = (await self.session.execute(
+            select(Job.id)
+            .where(disponible)
+            .order_by(Job.disponible_en)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )).scalar_one_or_none()
+        if job_id is None:
+            return None
+        
+        result = await self.session.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .where(disponible)
+            .values(
+                estado=EstadoJob.EN_CURSO.value,
+                intentos=Job.intentos + 1,
+                disponible_en=ahora + timedelta(seconds=visibility_timeout),
+                updated_at=ahora
+            )
+        )
+        if result.rowcount != 1:
+            return None  # Another worker claimed it first
+        return await self.session.get(Job, job_id, populate_existing=True)
+    
+    async def _finish(self, job: Job, **values) -> bool:
+        # Only the worker holding the current attempt may record its outcome
+        result = await self.session.execute(
+            update(Job)
+            .where(Job.id == job.id)
+            .where(Job.intentos == job.intentos)
+            .where(Job.estado == EstadoJob.EN_CURSO.value)
+            .values(updated_at=datetime.utcnow(), **values)
+        )
+        return result.rowcount == 1
+    
+    async def complete(self, job: Job, resultado) -> bool:
+        """Store the result of a claimed job."""
+        return await self._finish(job, estado=EstadoJob.COMPLETADO.value, resultado=resultado, error=None)
+    
+    async def fail(self, job: Job, error: str, retry_in: Optional[float] = None) -> bool:
+        """Record a failed attempt; retried after ``retry_in`` seconds, or failed for good if None."""
+        if retry_in is None:
+            return await self._finish(job, estado=EstadoJob.FALLIDO.value, error=error)
+        return await self._finish(
+            job,
+            estado=EstadoJob.PENDIENTE.value,
+            error=error,
+            disponible_en=datetime.utcnow() + timedelta(seconds=retry_in)
+        )
+    
+    async def purgar(self, retencion: float) -> int:
+        """Delete the jobs of every patient that finished more than ``retencion`` seconds ago; returns how many."""
+        result = await self.session.execute(
+            delete(Job)
+            .where(Job.estado.in_([EstadoJob.COMPLETADO.value, EstadoJob.FALLIDO.value]))
+            .where(Job.updated_at < datetime.utcnow() - timedelta(seconds=retencion))
+        )
+        return result.rowcount
+
+
+class IdempotenciaRepository:
+    """
+    Repository for idempotency keys (see ``app.api.idempotencia``).
+    
+    Keys are scoped to one patient; ``purgar`` acts on every patient.
+    """
+    
+    def __init__(self, session: AsyncSession, paciente_id: Optional[str] = None):
+        self.session = session
+        self.paciente_id = paciente_id or get_settings().default_paciente_id
+    
+    def _pk(self, clave: str):
+        return (ClaveIdempotencia.paciente_id == self.paciente_id) & (ClaveIdempotencia.clave == clave)
+    
+    async def get(self, clave: str) -> Optional[ClaveIdempotencia]:
+        """Get a key by primary key, as currently stored."""
+        return await self.session.get(ClaveIdempotencia, (self.paciente_id, clave), populate_existing=True)
+    
+    async def reservar(
+        self,
+        clave: str,
+        huella: str,
+        bloqueo: float,
+        ttl: float
+    ) -> tuple[ClaveIdempotencia, bool]:
+        """
+        Reserve ``clave`` for a new request for ``bloqueo`` seconds.
+        
+        Unknown and expired keys are taken, and so are keys in progress
+        whose reservation lapsed without any response stored (their request
+        died). The conditional UPDATE keeps two retries from taking over
+        the same key.
+        
+        Returns:
+            The reserved key and True, or the current key and False
+        """
+        ahora = datetime.utcnow()
+        valores = dict(
+            huella=huella,
+            intento=str(uuid.uuid4()),
+            estado=EstadoIdempotencia.EN_CURSO.value,
+            status_code=None,
+            respuesta=None,
+            cabeceras=None,
+            bloqueada_hasta=ahora + timedelta(seconds=bloqueo),
+            expira_en=ahora + timedelta(seconds=ttl),
+            created_at=ahora
+        )
+        fila = await self.get(clave)
+        if fila is None:
+            fila = ClaveIdempotencia(paciente_id=self.paciente_id, clave=clave, **valores)
+            try:
+                async with self.session.begin_nested():
+                    self.session.add(fila)
+                return fila, True
+            except IntegrityError:
+                # A concurrent retry reserved it first
+                fila = await self.get(clave)
+                if fila is None:
+                    return await self.reservar(clave, huella, bloqueo, ttl)
+        
+        abandonada = (
+            fila.estado == EstadoIdempotencia.EN_CURSO.value
+            and fila.status_code is None
+            and fila.bloqueada_hasta <= ahora
+        )
+        if fila.expira_en > ahora and not abandonada:
+            return fila, False
+        result = await self.session.execute(
+            update(ClaveIdempotencia)
+            .where(self._pk(clave))
+            .where(ClaveIdempotencia.intento == fila.intento)
+            .values(**valores)
+        )
+        return await self.get(clave), result.rowcount == 1
+    
+    async def guardar(
+        self,
+        clave: str,
+        intento: str,
+        status_code: int,
+        respuesta,
+        cabeceras: Optional[dict],
+        ttl: float,
+        provisional: bool = False
+    ) -> bool:
+        """
+        Store the response of the request holding the reservation ``intento``.
+        
+        A ``provisional`` response leaves the key in progress (retries keep
+        waiting) but is the one returned if the request dies before storing
+        its final response.
+        
+        Returns:
+            False if the reservation was lost (it lapsed and a retry took over)
+        """
+        estado = EstadoIdempotencia.EN_CURSO if provisional else EstadoIdempotencia.COMPLETADA
+        result = await self.session.execute(
+            update(ClaveIdempotencia)
+            .where(self._pk(clave))
+            .where(ClaveIdempotencia.intento == intento)
+            .where(ClaveIdempotencia.estado == EstadoIdempotencia.EN_CURSO.value)
+            .values(
+                estado=estado.value,
+                status_code=status_code,
+                respuesta=respuesta,
+                cabeceras=cabeceras,
+                expira_en=datetime.utcnow() + timedelta(seconds=ttl)
+            )
+        )
+        return result.rowcount == 1
+    
+    async def liberar(self, clave: str, intento: str) -> None:
+        """
+        Release the reservation of a request that ended without a final response.
+        
+        A key with a provisional response is completed with it (the writes
+        it describes were committed); otherwise it is deleted, so a retry
+        runs the request again.
+        """
+        reservada = (
+            self._pk(clave)
+            & (ClaveIdempotencia.intento == intento)
+            & (ClaveIdempotencia.estado == EstadoIdempotencia.EN_CURSO.value)
+        )
+        await self.session.execute(
+            update(ClaveIdempotencia)
+            .where(reservada)
+            .where(ClaveIdempotencia.status_code.is_not(None))
+            .values(estado=EstadoIdempotencia.COMPLETADA.value)
+        )
+        await self.session.execute(delete(ClaveIdempotencia).where(reservada))
+    
+    async def purgar(self) -> int:
+        """Delete the expired keys of every patient; returns how many."""
+        result = await self.session.execute(
+            delete(ClaveIdempotencia).where(ClaveIdempotencia.expira_en <= datetime.utcnow())
+        )
+        return result.rowcount
+
@@ -10,8 +10,14 @@ from app.schemas.schemas import (
     RegistroResponse,
     EjercicioCreate,
     EjercicioResponse,
+    SiguienteSesionResponse,
     TendenciaData,
-    InformeMensual
+    CargaSemanal,
+    InformeCarga,
+    InformeMensual,
+    JobResponse,
+    PerfilResponse,
+    SyncResponse
 )
 
 __all__ = [
@@ -24,6 +30,12 @@ __all__ = [
     "RegistroResponse",
     "EjercicioCreate",
     "EjercicioResponse",
+    "SiguienteSesionResponse",
     "TendenciaData",
-    "InformeMensual"
+    "CargaSemanal",
+    "InformeCarga",
+    "InformeMensual",
+    "JobResponse",
+    "PerfilResponse",
+    "SyncResponse"
 ]
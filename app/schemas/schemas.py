@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import datetime
+from typing import Any, Optional
+from datetime import date, datetime
 
 
 class EjercicioExtraido(BaseModel):
@@ -23,9 +23,13 @@ class ChatMessage(BaseModel):
 class ChatResponse(BaseModel):
     """Schema for chat response."""
     mensaje: str = Field(description="Respuesta del asistente")
-    datos_extraidos: Optional[EjercicioExtraido] = Field(default=None, description="Datos extraídos del mensaje")
-    registro_guardado: bool = Field(default=False, description="Si se guardó un registro")
+    datos_extraidos: Optional[EjercicioExtraido] = Field(default=None, description="Primer ejercicio extraído del mensaje")
+    ejercicios_extraidos: list[EjercicioExtraido] = Field(
+        default_factory=list, description="Todos los ejercicios extraídos del mensaje"
+    )
+    registro_guardado: bool = Field(default=False, description="Si se guardaron los registros")
     recomendacion: Optional[str] = Field(default=None, description="Recomendación basada en el dolor")
+    job_id: Optional[str] = Field(default=None, description="Trabajo que generará la recomendación (modo asíncrono)")
 
 
 class RecomendacionProgresion(BaseModel):
@@ -87,6 +91,27 @@ class EjercicioResponse(BaseModel):
         from_attributes = True
 
 
+class SiguienteSesionResponse(BaseModel):
+    """Schema for the suggested next session of an ejercicio."""
+    ejercicio_id: str
+    registro_id: int = Field(description="Última sesión en la que se basa la prescripción")
+    series: int
+    reps: int
+    peso: float = Field(description="Peso sugerido en kg")
+    volumen: float = Field(description="Volumen sugerido (series x reps x peso)")
+    cambio_porcentual: Optional[float] = Field(default=None, description="Cambio aplicado respecto a la última sesión")
+    estado: str = Field(description="Estado del semáforo: verde, amarillo, rojo")
+    recomendacion: str
+    respuesta_24h: Optional[str] = Field(
+        default=None, description="respuesta_optima, respuesta_aceptable o respuesta_excesiva"
+    )
+    pendiente_24h: bool = Field(description="Si la última sesión aún no tiene dolor a las 24h")
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 class TendenciaData(BaseModel):
     """Schema for trend data."""
     fecha: datetime
@@ -95,6 +120,28 @@ class TendenciaData(BaseModel):
     dolor_24h: Optional[int]
 
 
+class CargaSemanal(BaseModel):
+    """Schema for one week of training-load metrics."""
+    semana: date
+    sesiones: int
+    carga: float
+    monotonia: Optional[float]
+    strain: Optional[float]
+    acwr: Optional[float]
+
+
+class InformeCarga(BaseModel):
+    """Schema for the training-load report of an ejercicio."""
+    ejercicio_id: str
+    total_sesiones: int
+    primer_dia: date
+    ultimo_dia: date
+    carga_aguda: Optional[float]
+    carga_cronica: Optional[float]
+    acwr: Optional[float]
+    semanas: list[CargaSemanal]
+
+
 class InformeMensual(BaseModel):
     """Schema for monthly report."""
     periodo: str
@@ -102,3 +149,37 @@ class InformeMensual(BaseModel):
     total_sesiones: int
     resumen: str
     tendencias: list[TendenciaData]
+
+
+class JobResponse(BaseModel):
+    """Schema for the status of a background job."""
+    id: str
+    tipo: str
+    estado: str = Field(description="pendiente, en_curso, completado o fallido")
+    intentos: int
+    resultado: Optional[Any] = Field(default=None, description="Resultado cuando estado es completado")
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class PerfilResponse(BaseModel):
+    """Schema for a saved request profile."""
+    id: str
+    bytes: int
+    creado: datetime
+
+
+class SyncResponse(BaseModel):
+    """Schema for a delta sync: entities changed since the client's token."""
+    token: int = Field(description="Valor de since para la siguiente sincronización")
+    completo: bool = Field(description="Si es una instantánea completa (reemplaza los datos locales)")
+    hay_mas: bool = Field(description="Si quedan cambios: volver a llamar con el nuevo token")
+    cursor: Optional[int] = Field(
+        default=None, description="Instantánea por páginas: pasar como cursor (con el token) para la siguiente"
+    )
+    ejercicios: list[EjercicioResponse]
+    registros: list[RegistroResponse]
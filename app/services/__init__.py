@@ -7,8 +7,12 @@ from app.services.progresion_service import (
     calcular_estado_semaforo,
     generar_recomendacion_progresion,
     calcular_nueva_carga,
+    calcular_siguiente_sesion,
     evaluar_dolor_24h
 )
+from app.services.carga_service import calcular_metricas_carga
+from app.services.informe_service import preparar_informe_mensual
+from app.services.series_service import AlmacenSeries, SerieEjercicio, get_series
 
 __all__ = [
     "BedrockService", 
@@ -18,5 +22,11 @@ __all__ = [
     "calcular_estado_semaforo",
     "generar_recomendacion_progresion",
     "calcular_nueva_carga",
-    "evaluar_dolor_24h"
+    "calcular_siguiente_sesion",
+    "evaluar_dolor_24h",
+    "calcular_metricas_carga",
+    "preparar_informe_mensual",
+    "AlmacenSeries",
+    "SerieEjercicio",
+    "get_series"
 ]
@@ -0,0 +1,144 @@
+"""Hedged Bedrock calls across regions.
+
+A Bedrock call normally goes to the primary region only, so a regional
+latency spike lands straight on the chat's p99. ``PoolRegiones`` holds one
+``bedrock-runtime`` client per region (the primary first) and, for each
+call:
+
+- sends it to the primary region;
+- if it has not answered after the hedge delay (``bedrock_hedge_percentil``
+  of the recent latencies of that kind of call, e.g. p95: about one call in
+  twenty is hedged), or it failed, sends the same call to the next of the
+  other regions, in turn;
+- returns whichever answers first and cancels the other.
+
+Latencies are tracked per kind of call (extraction, recommendation, report
+take very different times), over the last ``_VENTANA`` calls;
+``bedrock_hedge_retraso_inicial`` is used until ``_MIN_MUESTRAS`` are in.
+When the hedge wins, the primary's time so far is recorded: its actual
+latency is unknown, but at least that.
+
+boto3 calls block, so each one runs in a worker thread. Cancelling the
+losing call frees the request at once, but its thread runs on until the
+response arrives or botocore's ``read_timeout``, and the call is billed.
+Hedges are counted in ``physiotrainer_bedrock_hedged_total`` by which
+region answered, and all calls in ``physiotrainer_bedrock_requests_total``.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.metrics import metricas
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+METRICA_LLAMADAS = "physiotrainer_bedrock_requests_total"
+METRICA_COBERTURAS = "physiotrainer_bedrock_hedged_total"
+# Latencies kept per kind of call, and needed before the percentile is trusted
+_VENTANA = 500
+_MIN_MUESTRAS = 20
+
+metricas.describir(METRICA_LLAMADAS, "Bedrock calls made by the application (hedges not included).")
+metricas.describir(METRICA_COBERTURAS, "Bedrock calls also sent to a second region, by the one that answered first.")
+
+
+class EstimadorRetraso:
+    """Hedge delay of one kind of call: a percentile of its recent latencies."""
+    
+    def __init__(self, percentil: float, inicial: float):
+        self.percentil = percentil
+        self.inicial = inicial
+        self._muestras: deque[float] = deque(maxlen=_VENTANA)
+    
+    def registrar(self, segundos: float) -> None:
+        self._muestras.append(segundos)
+    
+    def retraso(self) -> float:
+        """Seconds to wait for the primary region before hedging."""
+        if len(self._muestras) < _MIN_MUESTRAS:
+            return self.inicial
+        ordenadas = sorted(self._muestras)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * self.percentil / 100))]
+
+
+class PoolRegiones:
+    """One Bedrock client per region, with hedged calls (see the module docstring)."""
+    
+    def __init__(self, clientes: dict[str, Any], percentil: float = 95.0, retraso_inicial: float = 2.0):
+        """
+        Args:
+            clientes: ``bedrock-runtime`` clients (or stubs) by region, the
+                primary first; at least two
+            percentil: Latency percentile (0-100) after which a call is hedged
+            retraso_inicial: Hedge delay in seconds until latencies are known
+        """
+        if len(clientes) < 2:
+            raise ValueError("PoolRegiones needs at least two regions")
+        self.clientes = clientes
+        self.primaria, *secundarias = clientes
+        self.percentil = percentil
+        self.retraso_inicial = retraso_inicial
+        self._rotacion = itertools.cycle(secundarias)
+        self._estimadores: dict[str, EstimadorRetraso] = {}
+    
+    def estimador(self, tipo: str) -> EstimadorRetraso:
+        if tipo not in self._estimadores:
+            self._estimadores[tipo] = EstimadorRetraso(self.percentil, self.retraso_inicial)
+        return self._estimadores[tipo]
+    
+    def _lanzar(self, llamada: Callable[[Any], T], region: str) -> asyncio.Task:
+        return asyncio.create_task(asyncio.to_thread(llamada, self.clientes[region]))
+    
+    async def invocar(self, llamada: Callable[[Any], T], tipo: str = "") -> T:
+        """
+        Run ``llamada(cliente)`` in the primary region, hedged to another one.
+        
+        Args:
+            llamada: Blocking call taking the client of a region (run in a worker thread)
+            tipo: Kind of call, for its latency percentile
+        
+        Returns:
+            The result of the first region that answers
+        
+        Raises:
+            Exception: The error of the last region, if both failed
+        """
+        estimador = self.estimador(tipo)
+        metricas.incrementar(METRICA_LLAMADAS)
+        inicio = time.perf_counter()
+        pendientes = {self._lanzar(llamada, self.primaria): self.primaria}
+        cobertura: Optional[str] = None
+        error: Optional[BaseException] = None
+        try:
+            while pendientes:
+                espera = None
+                if cobertura is None:
+                    espera = max(0.0, inicio + estimador.retraso() - time.perf_counter())
+                hechas, _ = await asyncio.wait(pendientes, timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in hechas:
+                    region = pendientes.pop(tarea)
+                    if tarea.exception() is None:
+                        if region == self.primaria or self.primaria in pendientes.values():
+                            estimador.registrar(time.perf_counter() - inicio)
+                        if cobertura is not None:
+                            ganadora = "primaria" if region == self.primaria else "cobertura"
+                            metricas.incrementar(METRICA_COBERTURAS, ganadora=ganadora)
+                        return tarea.result()
+                    error = tarea.exception()
+                    logger.warning("Bedrock call in %s failed: %s", region, error)
+                if cobertura is None and (not hechas or not pendientes):
+                    # Slow or failed primary: send the same call to another region
+                    cobertura = next(self._rotacion)
+                    logger.debug("Hedging Bedrock call to %s", cobertura)
+                    pendientes[self._lanzar(llamada, cobertura)] = cobertura
+            metricas.incrementar(METRICA_COBERTURAS, ganadora="ninguna")
+            raise error
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
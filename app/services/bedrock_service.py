@@ -1,58 +1,175 @@
 """AWS Bedrock Service for AI-powered exercise analysis using Claude."""
 
+import asyncio
 import json
 import re
 import logging
+import threading
 from typing import Optional
-import boto3
-from botocore.config import Config
 
 from app.core.config import get_settings
+from app.core.deadline import PlazoAgotado, con_plazo, registrar_plazo_agotado
 from app.schemas import EjercicioExtraido
+from app.services.bedrock_regiones import PoolRegiones
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Static instructions go in the system block; only the per-message data is
+# sent as the user turn.
+PROMPT_SISTEMA_EXTRACCION = """Eres un asistente de rehabilitación funcional. Tu tarea es extraer información de entrenamiento del mensaje del usuario. Un mensaje puede describir uno o varios ejercicios de la misma sesión.
+
+Devuelve ÚNICAMENTE un array JSON estricto (sin markdown, sin explicaciones) con un objeto por ejercicio, en el orden del mensaje:
+[
+    {
+        "ejercicio": "nombre del ejercicio",
+        "series": número de series,
+        "reps": número de repeticiones,
+        "peso": peso en kg (número decimal),
+        "dolorIntra": nivel de dolor durante el ejercicio (0-10)
+    }
+]
+
+Si algún dato no está presente o no puedes extraerlo, usa estos valores por defecto:
+- series: 1
+- reps: 1
+- peso: 0.0
+- dolorIntra: 0
+
+Reglas:
+- "búlgaras" = "Sentadilla Búlgara"
+- "3x10" significa 3 series de 10 repeticiones
+- "3x30s" (ejercicios isométricos) significa 3 series de 30 segundos: reps = 30
+- "dolor 2" o "d2" significa dolorIntra = 2
+- El peso siempre en kg
+- Si el mensaje no describe ningún ejercicio, devuelve []
+
+Responde SOLO con el JSON, sin texto adicional."""
+
+PROMPT_SISTEMA_RECOMENDACION = """Eres un fisioterapeuta experto en rehabilitación funcional. Genera una recomendación breve y profesional basada en los datos de la sesión que envía el usuario.
+
+Usa la Regla del Semáforo:
+- VERDE (Dolor 0-3): Buena tolerancia. Sugiere incremento del 5-10% en volumen o intensidad.
+- AMARILLO (Dolor 4-5): Carga límite. Sugiere mantener carga para consolidar adaptación.
+- ROJO (Dolor > 5): Sobrecarga. Sugiere regresión inmediata (reducir peso/series o variante más sencilla).
+
+Responde en español, de forma concisa y motivadora (máximo 2-3 oraciones)."""
+
+PROMPT_SISTEMA_RECOMENDACION_SESION = """Eres un fisioterapeuta experto en rehabilitación funcional. El usuario envía los ejercicios de una misma sesión. Genera una recomendación breve y profesional para la sesión completa, mencionando los ejercicios que requieran un cambio de carga.
+
+Usa la Regla del Semáforo para cada ejercicio:
+- VERDE (Dolor 0-3): Buena tolerancia. Sugiere incremento del 5-10% en volumen o intensidad.
+- AMARILLO (Dolor 4-5): Carga límite. Sugiere mantener carga para consolidar adaptación.
+- ROJO (Dolor > 5): Sobrecarga. Sugiere regresión inmediata (reducir peso/series o variante más sencilla).
+
+Responde en español, de forma concisa y motivadora (máximo 4-5 oraciones)."""
+
+PROMPT_SISTEMA_INFORME = """Eres un fisioterapeuta experto. Genera un informe ejecutivo mensual de rehabilitación a partir del período y los datos de entrenamiento que envía el usuario.
+
+El informe debe incluir:
+1. Resumen general de progreso
+2. Análisis de tolerancia a la carga
+3. Patrones identificados (mejora/estancamiento)
+4. Recomendaciones para el próximo mes
+
+Escribe en español, de forma profesional pero accesible. Máximo 300 palabras."""
+
 
 class BedrockService:
     """Service for interacting with AWS Bedrock Claude model."""
     
-    def __init__(self):
-        """Initialize AWS Bedrock client."""
+    def __init__(self, client=None, clientes: Optional[dict] = None):
+        """
+        Initialize AWS Bedrock client.
+        
+        Args:
+            client: Optional pre-built bedrock-runtime client (e.g. a local stub
+                for benchmarks). When omitted a boto3 client is created.
+            clientes: Optional pre-built clients by region, the primary first;
+                with more than one, calls are hedged across them (see
+                ``app.services.bedrock_regiones``)
+        """
+        self.model_id = settings.bedrock_model_id
+        self._boto_session = None
+        self.pool: Optional[PoolRegiones] = None
+        
+        if clientes is not None:
+            self.client = next(iter(clientes.values()))
+            self._crear_pool(clientes)
+            return
+        if client is not None:
+            self.client = client
+            return
+        
+        # boto3/botocore add ~250ms to import time; load them on first use only
+        import boto3
+        from botocore.config import Config
+        
         # Use bedrock_region (defaults to us-east-1 where Claude is available)
         bedrock_region = settings.bedrock_region or settings.aws_region
-        logger.info(f"Initializing Bedrock client in region: {bedrock_region}, model: {settings.bedrock_model_id}")
-        
-        boto_config = Config(
-            region_name=bedrock_region,
-            retries={'max_attempts': 3, 'mode': 'standard'}
-        )
+        regiones = list(dict.fromkeys([bedrock_region, *settings.bedrock_hedge_regiones]))
+        logger.info("Initializing Bedrock client in regions: %s, model: %s", regiones, settings.bedrock_model_id)
         
         # Create Bedrock Runtime client
         if settings.aws_access_key_id and settings.aws_secret_access_key:
-            self.client = boto3.client(
-                'bedrock-runtime',
-                config=boto_config,
+            self._boto_session = boto3.session.Session(
                 aws_access_key_id=settings.aws_access_key_id,
                 aws_secret_access_key=settings.aws_secret_access_key
             )
         else:
             # Use IAM role credentials (for ECS/Lambda)
-            self.client = boto3.client('bedrock-runtime', config=boto_config)
+            self._boto_session = boto3.session.Session()
+        clientes = {
+            region: self._boto_session.client('bedrock-runtime', config=Config(
+                region_name=region,
+                retries={'max_attempts': 3, 'mode': 'standard'},
+                connect_timeout=settings.bedrock_connect_timeout,
+                read_timeout=settings.bedrock_read_timeout
+            ))
+            for region in regiones
+        }
+        self.client = clientes[bedrock_region]
+        self._crear_pool(clientes)
+    
+    def _crear_pool(self, clientes: dict) -> None:
+        if len(clientes) > 1:
+            self.pool = PoolRegiones(
+                clientes,
+                percentil=settings.bedrock_hedge_percentil,
+                retraso_inicial=settings.bedrock_hedge_retraso_inicial
+            )
+    
+    def warm_up(self) -> None:
+        """
+        Resolve AWS credentials ahead of the first request.
         
-        self.model_id = settings.bedrock_model_id
+        On ECS the credential chain fetches role credentials over HTTP,
+        which otherwise lands on the first chat message.
+        """
+        if self._boto_session is None:
+            return
+        credentials = self._boto_session.get_credentials()
+        if credentials is not None:
+            credentials.get_frozen_credentials()
         
-    def _invoke_claude(self, prompt: str, max_tokens: int = 500, temperature: float = 0.1) -> str:
+    def build_body(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        max_tokens: int = 500,
+        temperature: float = 0.1
+    ) -> dict:
         """
-        Invoke Claude model via Bedrock.
+        Build the Anthropic Messages request body for Bedrock.
         
         Args:
-            prompt: The prompt to send to Claude
+            prompt: Per-request user message
+            system: Static instructions shared by every request of a kind
             max_tokens: Maximum tokens in response
             temperature: Temperature for generation
             
         Returns:
-            Response text from Claude
+            Request body ready to be JSON-encoded
         """
         body = {
             "anthropic_version": "bedrock-2023-05-31",
@@ -65,8 +182,34 @@ class BedrockService:
                 }
             ]
         }
+        if system:
+            body["system"] = system
+        return body
+        
+    def _invoke_claude(
+        self,
+        prompt: str,
+        max_tokens: int = 500,
+        temperature: float = 0.1,
+        system: Optional[str] = None,
+        client=None
+    ) -> str:
+        """
+        Invoke Claude model via Bedrock.
         
-        response = self.client.invoke_model(
+        Args:
+            prompt: The prompt to send to Claude
+            max_tokens: Maximum tokens in response
+            temperature: Temperature for generation
+            system: Static system instructions
+            client: Client of the region to call (default: the primary one)
+            
+        Returns:
+            Response text from Claude
+        """
+        body = self.build_body(prompt, system=system, max_tokens=max_tokens, temperature=temperature)
+        
+        response = (client or self.client).invoke_model(
             modelId=self.model_id,
             body=json.dumps(body),
             contentType="application/json",
@@ -74,47 +217,58 @@ class BedrockService:
         )
         
         response_body = json.loads(response['body'].read())
+        usage = response_body.get('usage', {})
+        logger.debug(
+            "Bedrock usage: input=%s output=%s",
+            usage.get('input_tokens'),
+            usage.get('output_tokens')
+        )
         return response_body['content'][0]['text']
         
-    async def extraer_datos_ejercicio(self, mensaje: str) -> Optional[EjercicioExtraido]:
+    async def _ainvoke_claude(self, prompt: str, **kwargs) -> str:
         """
-        Extract exercise data from natural language input.
+        Run the blocking boto3 call in a worker thread so the event loop keeps serving.
+        
+        With several regions the call is hedged across them. Within a request
+        the call is abandoned ``request_deadline_reserva`` seconds before the
+        request deadline (the thread itself runs on until botocore's
+        ``read_timeout``).
+        
+        Raises:
+            PlazoAgotado: The request deadline left no time for the call
+        """
+        try:
+            if self.pool is None:
+                trabajo = asyncio.to_thread(self._invoke_claude, prompt, **kwargs)
+            else:
+                trabajo = self.pool.invocar(
+                    lambda cliente: self._invoke_claude(prompt, client=cliente, **kwargs),
+                    tipo=kwargs.get("system") or ""
+                )
+            return await con_plazo(trabajo, reserva=settings.request_deadline_reserva)
+        except PlazoAgotado:
+            registrar_plazo_agotado("bedrock")
+            raise
+        
+    async def extraer_ejercicios(self, mensaje: str) -> list[EjercicioExtraido]:
+        """
+        Extract every exercise described in a natural language message.
         
         Args:
             mensaje: Natural language message from user
             
         Returns:
-            Extracted exercise data or None if extraction fails
+            Extracted exercises in message order (empty if extraction fails)
+            
+        Raises:
+            PlazoAgotado: The request deadline expired before Claude answered
         """
-        prompt = f"""Eres un asistente de rehabilitación funcional. Tu tarea es extraer información de entrenamiento del siguiente mensaje del usuario.
-
-Mensaje del usuario: "{mensaje}"
-
-Extrae los siguientes datos y devuélvelos ÚNICAMENTE en formato JSON estricto (sin markdown, sin explicaciones):
-{{
-    "ejercicio": "nombre del ejercicio",
-    "series": número de series,
-    "reps": número de repeticiones,
-    "peso": peso en kg (número decimal),
-    "dolorIntra": nivel de dolor durante el ejercicio (0-10)
-}}
-
-Si algún dato no está presente o no puedes extraerlo, usa estos valores por defecto:
-- series: 1
-- reps: 1  
-- peso: 0.0
-- dolorIntra: 0
-
-Reglas:
-- "búlgaras" = "Sentadilla Búlgara"
-- "3x10" significa 3 series de 10 repeticiones
-- "dolor 2" o "d2" significa dolorIntra = 2
-- El peso siempre en kg
-
-Responde SOLO con el JSON, sin texto adicional."""
+        prompt = f'Mensaje del usuario: "{mensaje}"'
 
         try:
-            response_text = self._invoke_claude(prompt, max_tokens=500, temperature=0.1)
+            response_text = await self._ainvoke_claude(
+                prompt, max_tokens=1000, temperature=0.1, system=PROMPT_SISTEMA_EXTRACCION
+            )
             
             # Parse JSON response
             json_text = response_text.strip()
@@ -123,11 +277,30 @@ Responde SOLO con el JSON, sin texto adicional."""
             json_text = re.sub(r'\s*```$', '', json_text)
             
             data = json.loads(json_text)
-            return EjercicioExtraido(**data)
+            # Accept a bare object as a single exercise
+            if isinstance(data, dict):
+                data = [data]
+            return [EjercicioExtraido(**item) for item in data]
             
+        except PlazoAgotado:
+            # Not a parsing failure: let the route tell the user to retry
+            raise
         except Exception as e:
-            logger.error(f"Error extracting exercise data: {e}", exc_info=True)
-            return None
+            logger.error("Error extracting exercise data: %s", e, exc_info=True)
+            return []
+    
+    async def extraer_datos_ejercicio(self, mensaje: str) -> Optional[EjercicioExtraido]:
+        """
+        Extract exercise data from natural language input.
+        
+        Args:
+            mensaje: Natural language message from user
+            
+        Returns:
+            First extracted exercise or None if extraction fails
+        """
+        ejercicios = await self.extraer_ejercicios(mensaje)
+        return ejercicios[0] if ejercicios else None
     
     async def generar_recomendacion(
         self, 
@@ -150,26 +323,55 @@ Responde SOLO con el JSON, sin texto adicional."""
         """
         dolor_promedio = sum(historial_dolor) / len(historial_dolor) if historial_dolor else dolor_actual
         
-        prompt = f"""Eres un fisioterapeuta experto en rehabilitación funcional. Genera una recomendación breve y profesional basada en:
-
-Ejercicio: {ejercicio}
+        prompt = f"""Ejercicio: {ejercicio}
 Dolor actual (0-10): {dolor_actual}
 Dolor promedio reciente: {dolor_promedio:.1f}
-Volumen actual: {volumen_actual}
-
-Usa la Regla del Semáforo:
-- VERDE (Dolor 0-3): Buena tolerancia. Sugiere incremento del 5-10% en volumen o intensidad.
-- AMARILLO (Dolor 4-5): Carga límite. Sugiere mantener carga para consolidar adaptación.
-- ROJO (Dolor > 5): Sobrecarga. Sugiere regresión inmediata (reducir peso/series o variante más sencilla).
-
-Responde en español, de forma concisa y motivadora (máximo 2-3 oraciones)."""
+Volumen actual: {volumen_actual}"""
 
         try:
-            return self._invoke_claude(prompt, max_tokens=200, temperature=0.7)
+            return await self._ainvoke_claude(
+                prompt, max_tokens=200, temperature=0.7, system=PROMPT_SISTEMA_RECOMENDACION
+            )
         except Exception as e:
-            logger.error(f"Error generating recommendation: {e}", exc_info=True)
+            logger.error("Error generating recommendation: %s", e, exc_info=True)
             return self._recomendacion_fallback(dolor_actual)
     
+    async def generar_recomendacion_sesion(self, ejercicios: list[dict]) -> str:
+        """
+        Generate one recommendation for several exercises of the same session.
+        
+        Args:
+            ejercicios: One dict per exercise with ``ejercicio``, ``dolor_actual``,
+                ``historial_dolor`` and ``volumen_actual`` (the arguments of
+                ``generar_recomendacion``)
+            
+        Returns:
+            Recommendation message
+        """
+        if len(ejercicios) == 1:
+            return await self.generar_recomendacion(**ejercicios[0])
+        
+        lineas = []
+        for datos in ejercicios:
+            historial = datos["historial_dolor"]
+            dolor_promedio = sum(historial) / len(historial) if historial else datos["dolor_actual"]
+            lineas.append(
+                f"- {datos['ejercicio']}: dolor actual {datos['dolor_actual']}/10, "
+                f"dolor promedio reciente {dolor_promedio:.1f}, volumen {datos['volumen_actual']}"
+            )
+        prompt = "Ejercicios de la sesión:\n" + "\n".join(lineas)
+        
+        try:
+            return await self._ainvoke_claude(
+                prompt, max_tokens=400, temperature=0.7, system=PROMPT_SISTEMA_RECOMENDACION_SESION
+            )
+        except Exception as e:
+            logger.error("Error generating session recommendation: %s", e, exc_info=True)
+            return "\n".join(
+                f"{datos['ejercicio']}: {self._recomendacion_fallback(datos['dolor_actual'])}"
+                for datos in ejercicios
+            )
+    
     def _recomendacion_fallback(self, dolor: int) -> str:
         """Fallback recommendation when AI is unavailable."""
         if dolor <= 3:
@@ -196,34 +398,30 @@ Responde en español, de forma concisa y motivadora (máximo 2-3 oraciones)."""
         """
         datos_str = json.dumps(datos_ejercicios, indent=2, ensure_ascii=False, default=str)
         
-        prompt = f"""Eres un fisioterapeuta experto. Genera un informe ejecutivo mensual de rehabilitación.
-
-Período: {periodo}
+        prompt = f"""Período: {periodo}
 Datos de entrenamiento:
-{datos_str}
-
-El informe debe incluir:
-1. Resumen general de progreso
-2. Análisis de tolerancia a la carga
-3. Patrones identificados (mejora/estancamiento)
-4. Recomendaciones para el próximo mes
-
-Escribe en español, de forma profesional pero accesible. Máximo 300 palabras."""
+{datos_str}"""
 
         try:
-            return self._invoke_claude(prompt, max_tokens=800, temperature=0.5)
+            return await self._ainvoke_claude(
+                prompt, max_tokens=800, temperature=0.5, system=PROMPT_SISTEMA_INFORME
+            )
         except Exception as e:
-            logger.error(f"Error generating monthly report: {e}", exc_info=True)
+            logger.error("Error generating monthly report: %s", e, exc_info=True)
             return "No se pudo generar el informe automático. Por favor, revisa los datos manualmente."
 
 
 # Singleton instance - lazy initialization to avoid errors at import time
 _bedrock_service: Optional[BedrockService] = None
+# The singleton may be built from the startup warm-up thread and a request concurrently
+_bedrock_service_lock = threading.Lock()
 
 
 def get_bedrock_service() -> BedrockService:
     """Get Bedrock service instance (lazy initialization)."""
     global _bedrock_service
     if _bedrock_service is None:
-        _bedrock_service = BedrockService()
+        with _bedrock_service_lock:
+            if _bedrock_service is None:
+                _bedrock_service = BedrockService()
     return _bedrock_service
@@ -0,0 +1,94 @@
+"""Training-load metrics: acute:chronic workload ratio, monotony and strain.
+
+Load is the session volume (``series * reps * peso``). Daily loads are
+aggregated in SQL; the rolling windows are computed here with vectorised
+pandas so the cost is linear in the number of days of history.
+"""
+
+from datetime import date
+from typing import Iterable, Optional
+
+# Rolling windows in days
+VENTANA_AGUDA = 7
+VENTANA_CRONICA = 28
+
+
+def calcular_metricas_carga(
+    cargas_diarias: Iterable[tuple],
+    hasta: Optional[date] = None,
+    semanas: Optional[int] = None
+) -> Optional[dict]:
+    """
+    Compute ACWR, weekly monotony and strain from daily training loads.
+    
+    Days without sessions count as zero load. The acute load is the sum
+    of the last 7 days; the chronic load is the mean of the last 28 days
+    scaled to a week, so ACWR = acute / chronic. Monotony (Foster) is the
+    mean daily load of a Monday-Sunday week divided by its standard
+    deviation, and strain is the weekly load times monotony. Ratios that
+    are undefined (not enough history, zero load or zero variation) are
+    returned as None.
+    
+    Args:
+        cargas_diarias: ``(dia, sesiones, carga)`` rows, one per training day
+        hasta: Last day of the series (default today)
+        semanas: Return only the most recent N weeks (default all)
+        
+    Returns:
+        Dictionary with the current acute/chronic loads and ACWR, and a
+        per-week breakdown; empty history gives ``None``
+    """
+    import numpy as np
+    import pandas as pd
+    
+    df = pd.DataFrame(list(cargas_diarias), columns=["dia", "sesiones", "carga"])
+    if df.empty:
+        return None
+    
+    df["dia"] = pd.to_datetime(df["dia"]).dt.normalize()
+    diario = df.groupby("dia")[["sesiones", "carga"]].sum().astype(float)
+    # Start on a Monday so the first week is complete
+    inicio = diario.index.min() - pd.Timedelta(days=diario.index.min().weekday())
+    fin = max(pd.Timestamp(hasta or date.today()), diario.index.max())
+    diario = diario.reindex(pd.date_range(inicio, fin, freq="D"), fill_value=0.0)
+    carga = diario["carga"]
+    
+    aguda = carga.rolling(VENTANA_AGUDA, min_periods=1).sum()
+    cronica = carga.rolling(VENTANA_CRONICA, min_periods=VENTANA_CRONICA).mean() * VENTANA_AGUDA
+    acwr = aguda / cronica.where(cronica > 0)
+    
+    # The series starts on a Monday, so week k is rows [7k, 7k + 7)
+    dias = len(carga)
+    por_semana = carga.groupby(np.arange(dias) // 7)
+    carga_semanal = por_semana.sum().to_numpy()
+    desviacion = por_semana.std(ddof=0).to_numpy()
+    monotonia = np.divide(
+        por_semana.mean().to_numpy(), desviacion,
+        out=np.full(len(desviacion), np.nan), where=desviacion > 0
+    )
+    tabla = pd.DataFrame({
+        "semana": diario.index[::7].date,
+        "sesiones": diario["sesiones"].groupby(np.arange(dias) // 7).sum().to_numpy().astype(int),
+        "carga": carga_semanal,
+        "monotonia": monotonia,
+        "strain": carga_semanal * monotonia,
+        "acwr": acwr.to_numpy()[np.minimum(np.arange(0, dias, 7) + 6, dias - 1)]
+    })
+    if semanas:
+        tabla = tabla.tail(semanas)
+    tabla = tabla.round(3).astype(object)
+    tabla = tabla.where(tabla.notna(), None)
+    
+    def _valor(serie):
+        ultimo = serie.iloc[-1]
+        return None if pd.isna(ultimo) else round(float(ultimo), 3)
+    
+    return {
+        "total_sesiones": int(df["sesiones"].sum()),
+        "primer_dia": df["dia"].min().date(),
+        "ultimo_dia": fin.date(),
+        "carga_aguda": _valor(aguda),
+        "carga_cronica": _valor(cronica),
+        "acwr": _valor(acwr),
+        "semanas": tabla.to_dict("records")
+    }
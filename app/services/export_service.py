@@ -0,0 +1,136 @@
+"""Streaming serializers for registro exports (CSV, NDJSON, Parquet)."""
+
+import csv
+import importlib.util
+import io
+import json
+from typing import AsyncIterator
+
+EXPORT_COLUMNS = [
+    "id",
+    "fecha",
+    "ejercicio_id",
+    "ejercicio_nombre",
+    "series",
+    "reps",
+    "peso",
+    "volumen_total",
+    "dolor_intra",
+    "dolor_24h",
+    "notas"
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+
+def parquet_disponible() -> bool:
+    """Whether the optional pyarrow dependency needed for Parquet is installed."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _fila(row) -> tuple:
+    """Map a repository export row to the EXPORT_COLUMNS order."""
+    id_, fecha, ejercicio_id, nombre, series, reps, peso, dolor_intra, dolor_24h, notas = row
+    return (
+        id_, fecha, ejercicio_id, nombre, series, reps, peso,
+        series * reps * peso, dolor_intra, dolor_24h, notas
+    )
+
+
+async def exportar_csv(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    """Encode batches of rows as CSV, one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in batches:
+        writer.writerows(
+            (fila[0], fila[1].isoformat(), *fila[2:])
+            for fila in map(_fila, batch)
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def exportar_ndjson(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    """Encode batches of rows as newline-delimited JSON, one chunk per batch."""
+    async for batch in batches:
+        lineas = [
+            json.dumps(dict(zip(EXPORT_COLUMNS, _fila(row))), ensure_ascii=False, default=str)
+            for row in batch
+        ]
+        yield ("\n".join(lineas) + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only sink that hands out what has been written so far."""
+    
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def exportar_parquet(batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    """Encode batches of rows as a Parquet file, one row group per batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("fecha", pa.timestamp("us")),
+        ("ejercicio_id", pa.string()),
+        ("ejercicio_nombre", pa.string()),
+        ("series", pa.int32()),
+        ("reps", pa.int32()),
+        ("peso", pa.float64()),
+        ("volumen_total", pa.float64()),
+        ("dolor_intra", pa.int8()),
+        ("dolor_24h", pa.int8()),
+        ("notas", pa.string())
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for batch in batches:
+            columnas = list(zip(*(_fila(row) for row in batch)))
+            if not columnas:
+                continue
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columnas, schema)],
+                schema=schema
+            ))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORTERS = {
+    "csv": exportar_csv,
+    "ndjson": exportar_ndjson,
+    "parquet": exportar_parquet
+}
@@ -0,0 +1,41 @@
+"""Monthly report assembly shared by the API and the background jobs."""
+
+from app.models import Registro
+from app.schemas import TendenciaData
+
+
+def preparar_informe_mensual(registros: list[Registro]) -> tuple[list[dict], list[TendenciaData], int]:
+    """
+    Turn a month of registros into the report inputs.
+    
+    Args:
+        registros: Registros of the month with their ejercicio loaded
+        
+    Returns:
+        Data for the AI summary, chart points and number of distinct ejercicios
+    """
+    ejercicios_set = set()
+    datos_para_ia = []
+    tendencias = []
+    
+    for r in registros:
+        ejercicios_set.add(r.ejercicio.nombre)
+        volumen = r.series * r.reps * r.peso
+        
+        datos_para_ia.append({
+            "fecha": r.fecha.isoformat(),
+            "ejercicio": r.ejercicio.nombre,
+            "volumen": volumen,
+            "dolor_intra": r.dolor_intra,
+            "dolor_24h": r.dolor_24h
+        })
+        
+        tendencias.append(TendenciaData(
+            fecha=r.fecha,
+            volumen_total=volumen,
+            dolor_intra=r.dolor_intra,
+            dolor_24h=r.dolor_24h
+        ))
+    
+    return datos_para_ia, tendencias, len(ejercicios_set)
+
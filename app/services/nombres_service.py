@@ -0,0 +1,126 @@
+"""Fuzzy exercise name matching with trigram similarity.
+
+Names are compared after lowercasing and removing accents, using the
+trigram model of PostgreSQL's ``pg_trgm``: every word is padded with two
+spaces before and one after, split into three-character windows, and the
+similarity of two names is the Jaccard index of their trigram sets. The
+in-memory index below and the SQL expression used with ``pg_trgm`` give
+the same scores, so both backends resolve a name to the same ejercicio.
+"""
+
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Generic, Hashable, Optional, TypeVar
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.sql.elements import ColumnElement
+
+# Mirrored by the SQL translate() in nombre_normalizado_sql
+_CON_ACENTO = "áàâäãéèêëíìîïóòôöõúùûüñç"
+_SIN_ACENTO = "aaaaaeeeeiiiiooooouuuunc"
+_QUITAR_ACENTOS = str.maketrans(_CON_ACENTO, _SIN_ACENTO)
+_PALABRA_RE = re.compile(r"[a-z0-9]+")
+_NUMERO_RE = re.compile(r"[0-9]+")
+
+Clave = TypeVar("Clave", bound=Hashable)
+
+
+def normalizar_nombre(nombre: str) -> str:
+    """Lowercase ``nombre`` and strip its accents (``"Búlgaras"`` -> ``"bulgaras"``)."""
+    return nombre.lower().translate(_QUITAR_ACENTOS)
+
+
+def nombre_normalizado_sql(columna: ColumnElement) -> ColumnElement:
+    """
+    SQL equivalent of ``normalizar_nombre``.
+    
+    Immutable, so it can be indexed; the translation tables are inlined
+    rather than bound so queries match the index expression exactly.
+    """
+    return func.translate(
+        func.lower(columna), literal_column(f"'{_CON_ACENTO}'"), literal_column(f"'{_SIN_ACENTO}'")
+    )
+
+
+def trigramas(nombre: str) -> frozenset[str]:
+    """Trigram set of a name, as computed by ``pg_trgm``."""
+    resultado = set()
+    for palabra in _PALABRA_RE.findall(normalizar_nombre(nombre)):
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return frozenset(resultado)
+
+
+def numeros(nombre: str) -> frozenset[str]:
+    """
+    Numbers in a name.
+    
+    Names that differ only in a number ("Nivel 1", "Nivel 2") score high
+    on trigrams but are different exercises, so matches must agree on them.
+    """
+    return frozenset(_NUMERO_RE.findall(nombre))
+
+
+def similitud(a: str, b: str) -> float:
+    """Trigram similarity of two names in [0, 1] (``pg_trgm``'s ``similarity``)."""
+    ta, tb = trigramas(a), trigramas(b)
+    if not ta or not tb:
+        return 0.0
+    comunes = len(ta & tb)
+    return comunes / (len(ta) + len(tb) - comunes)
+
+
+class IndiceTrigramas(Generic[Clave]):
+    """
+    Inverted trigram index over a set of names.
+    
+    Only names sharing at least one trigram with the query are scored, so a
+    lookup costs a few set operations per candidate rather than a scan of
+    the whole catalog. Names with different ``numeros`` never match.
+    """
+    
+    def __init__(self):
+        self._trigramas: dict[Clave, frozenset[str]] = {}
+        self._numeros: dict[Clave, frozenset[str]] = {}
+        self._indice: dict[str, set[Clave]] = defaultdict(set)
+    
+    def __len__(self) -> int:
+        return len(self._trigramas)
+    
+    def add(self, clave: Clave, nombre: str) -> None:
+        """Index ``nombre`` under ``clave``."""
+        conjunto = trigramas(nombre)
+        self._trigramas[clave] = conjunto
+        self._numeros[clave] = numeros(nombre)
+        for trigrama in conjunto:
+            self._indice[trigrama].add(clave)
+    
+    def buscar(self, nombre: str, umbral: float) -> Optional[tuple[Clave, float]]:
+        """
+        Best match for ``nombre``.
+        
+        Args:
+            nombre: Name to resolve
+            umbral: Minimum similarity to accept a match
+        
+        Returns:
+            ``(clave, similitud)`` of the most similar name, or None if none
+            reaches ``umbral``
+        """
+        consulta = trigramas(nombre)
+        if not consulta:
+            return None
+        comunes = Counter(chain.from_iterable(self._indice.get(t, ()) for t in consulta))
+        numeros_consulta = numeros(nombre)
+        
+        mejor = None
+        for clave, n in comunes.items():
+            puntuacion = n / (len(consulta) + len(self._trigramas[clave]) - n)
+            if (
+                puntuacion >= umbral
+                and (mejor is None or puntuacion > mejor[1])
+                and self._numeros[clave] == numeros_consulta
+            ):
+                mejor = (clave, puntuacion)
+        return mejor
@@ -144,6 +144,55 @@ def calcular_nueva_carga(
     }
 
 
+def calcular_siguiente_sesion(
+    series: int,
+    reps: int,
+    peso: float,
+    dolor_intra: int,
+    respuesta_24h: Optional[dict] = None
+) -> dict:
+    """
+    Prescribe the next session of an ejercicio from the last one.
+    
+    The traffic light of the last session's pain sets the change. A 24h
+    response that does not allow progressing caps it: an acceptable
+    response holds the load and an excessive one reduces it.
+    
+    Args:
+        series: Sets of the last session
+        reps: Reps of the last session
+        peso: Weight of the last session; 0 for bodyweight exercises,
+            which progress in reps instead
+        dolor_intra: Pain during the last session
+        respuesta_24h: Result of ``evaluar_dolor_24h`` for the latest
+            session with a 24h pain value, if any
+    
+    Returns:
+        Dictionary with the prescribed series, reps, peso and volume
+    """
+    dolor = dolor_intra
+    if respuesta_24h is not None and not respuesta_24h["puede_progresar"]:
+        # Lowest pain of the yellow/red band, so the traffic light holds or reduces
+        dolor = max(dolor, 6 if respuesta_24h["interpretacion"] == "respuesta_excesiva" else 4)
+    
+    if peso > 0:
+        carga = calcular_nueva_carga(peso, dolor, es_peso=True)
+        peso = carga["carga_sugerida"]
+    else:
+        carga = calcular_nueva_carga(reps, dolor, es_peso=False)
+        reps = max(1, carga["carga_sugerida"])
+    
+    return {
+        "series": series,
+        "reps": reps,
+        "peso": peso,
+        "volumen": series * reps * peso,
+        "cambio_porcentual": carga["cambio_porcentual"],
+        "estado": carga["estado"],
+        "recomendacion": carga["recomendacion"]
+    }
+
+
 def evaluar_dolor_24h(dolor_intra: int, dolor_24h: int) -> dict:
     """
     Evaluate the 24h pain response compared to intra-exercise pain.
@@ -151,7 +200,7 @@ def evaluar_dolor_24h(dolor_intra: int, dolor_24h: int) -> dict:
     Args:
         dolor_intra: Pain during exercise
         dolor_24h: Pain 24 hours after
-        
+    
     Returns:
         Evaluation with interpretation
     """
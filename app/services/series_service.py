@@ -0,0 +1,368 @@
+"""Columnar in-memory history of each patient's sessions.
+
+Trend charts, statistics and training-load reports only read the date,
+volume and pain of each registro, yet re-querying and materialising
+``Registro`` rows costs far more than the numbers themselves. This store
+keeps them per ejercicio in parallel NumPy arrays sorted by fecha
+(``datetime64[us]`` dates, ``float32`` volume, ``int8`` pain and
+``int64`` IDs, 22 bytes per session) and answers those reads with
+vectorised operations:
+
+- A patient is loaded on first use with one query, least recently used
+  patients are dropped past ``series_max_pacientes``.
+- Registros written through ``RegistroRepository`` are upserted once
+  their transaction commits, so this process reads its own writes
+  without going back to the database.
+- Writes from other processes are caught up from the change log (see
+  ``CambioRepository``): at most every ``series_refresco`` seconds the
+  patient's counter is read and, if it moved, only the changed registros
+  are fetched.
+"""
+
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.config import get_settings
+from app.models import Cambio, ContadorCambios, Registro
+
+# Change-log entity of registros (app.repositories.ENTIDAD_REGISTRO; not imported to avoid a cycle)
+ENTIDAD_REGISTRO = "registro"
+# int8 stand-in for a missing dolor_24h
+SIN_DOLOR = -1
+# Larger change-log gaps reload the patient instead of fetching registros by ID
+_MAX_DELTA = 5000
+
+# (id, ejercicio_id, fecha, volumen, dolor_intra, dolor_24h)
+Fila = tuple[int, str, datetime, float, int, Optional[int]]
+
+_COLUMNAS = (
+    ("ids", np.int64),
+    ("fechas", "datetime64[us]"),
+    ("volumen", np.float32),
+    ("dolor_intra", np.int8),
+    ("dolor_24h", np.int8)
+)
+
+
+def _select_filas():
+    return select(
+        Registro.id,
+        Registro.ejercicio_id,
+        Registro.fecha,
+        (Registro.series * Registro.reps * Registro.peso).label("volumen"),
+        Registro.dolor_intra,
+        Registro.dolor_24h
+    )
+
+
+class SerieEjercicio:
+    """
+    Sessions of one ejercicio as parallel arrays sorted by fecha.
+    
+    Arrays are over-allocated and grow by doubling, so appending a
+    session is amortised O(1); only the first ``n`` entries are valid.
+    """
+    
+    def __init__(self, capacidad: int = 16):
+        self.n = 0
+        for nombre, dtype in _COLUMNAS:
+            setattr(self, nombre, np.empty(capacidad, dtype=dtype))
+    
+    @classmethod
+    def desde_columnas(cls, ids, fechas, volumen, dolor_intra, dolor_24h) -> "SerieEjercicio":
+        """Build a serie from columns already sorted by fecha."""
+        serie = cls(capacidad=0)
+        serie.n = len(ids)
+        serie.ids = np.asarray(ids, dtype=np.int64)
+        serie.fechas = np.asarray(fechas, dtype="datetime64[us]")
+        serie.volumen = np.asarray(volumen, dtype=np.float32)
+        serie.dolor_intra = np.asarray(dolor_intra, dtype=np.int8)
+        serie.dolor_24h = np.asarray(dolor_24h, dtype=np.int8)
+        return serie
+    
+    def __len__(self) -> int:
+        return self.n
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the arrays (including spare capacity)."""
+        return sum(getattr(self, nombre).nbytes for nombre, _ in _COLUMNAS)
+    
+    def _crecer(self) -> None:
+        capacidad = max(16, 2 * len(self.ids))
+        for nombre, dtype in _COLUMNAS:
+            nuevo = np.empty(capacidad, dtype=dtype)
+            nuevo[:self.n] = getattr(self, nombre)[:self.n]
+            setattr(self, nombre, nuevo)
+    
+    def upsert(self, registro_id: int, fecha: datetime, volumen: float, dolor_intra: int,
+               dolor_24h: Optional[int]) -> None:
+        """Insert a session, or update it if ``registro_id`` is already present."""
+        dolor_24h = SIN_DOLOR if dolor_24h is None else dolor_24h
+        existentes = np.flatnonzero(self.ids[:self.n] == registro_id)
+        if existentes.size:
+            i = existentes[0]
+            self.volumen[i] = volumen
+            self.dolor_intra[i] = dolor_intra
+            self.dolor_24h[i] = dolor_24h
+            return
+        
+        if self.n == len(self.ids):
+            self._crecer()
+        fecha = np.datetime64(fecha, "us")
+        # New sessions are almost always the latest; older ones are shifted in
+        pos = self.n
+        if self.n and fecha < self.fechas[self.n - 1]:
+            pos = int(np.searchsorted(self.fechas[:self.n], fecha, side="right"))
+            for nombre, _ in _COLUMNAS:
+                columna = getattr(self, nombre)
+                columna[pos + 1:self.n + 1] = columna[pos:self.n]
+        self.ids[pos] = registro_id
+        self.fechas[pos] = fecha
+        self.volumen[pos] = volumen
+        self.dolor_intra[pos] = dolor_intra
+        self.dolor_24h[pos] = dolor_24h
+        self.n += 1
+    
+    def rango(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> slice:
+        """Slice of the sessions with ``desde <= fecha < hasta`` (binary search)."""
+        fechas = self.fechas[:self.n]
+        inicio = 0 if desde is None else int(np.searchsorted(fechas, np.datetime64(desde, "us")))
+        fin = self.n if hasta is None else int(np.searchsorted(fechas, np.datetime64(hasta, "us")))
+        return slice(inicio, max(inicio, fin))
+    
+    def tendencia(self, limit: int, desde: Optional[datetime] = None,
+                  hasta: Optional[datetime] = None) -> list[dict]:
+        """
+        The last ``limit`` sessions in ``[desde, hasta)``, oldest first.
+        
+        Volumes are rounded to 2 decimals (``float32`` keeps ~7 digits).
+        """
+        rango = self.rango(desde, hasta)
+        rango = slice(max(rango.start, rango.stop - limit), rango.stop)
+        return [
+            {
+                "fecha": fecha,
+                "volumen_total": volumen,
+                "dolor_intra": dolor_intra,
+                "dolor_24h": None if dolor_24h == SIN_DOLOR else dolor_24h
+            }
+            for fecha, volumen, dolor_intra, dolor_24h in zip(
+                self.fechas[rango].tolist(),
+                np.round(self.volumen[rango].astype(np.float64), 2).tolist(),
+                self.dolor_intra[rango].tolist(),
+                self.dolor_24h[rango].tolist()
+            )
+        ]
+    
+    def carga_diaria(self) -> list[tuple[date, int, float]]:
+        """``(dia, sesiones, carga)`` per training day (``get_carga_diaria`` without SQL)."""
+        if not self.n:
+            return []
+        dias, indice = np.unique(self.fechas[:self.n].astype("datetime64[D]"), return_inverse=True)
+        sesiones = np.bincount(indice)
+        carga = np.bincount(indice, weights=self.volumen[:self.n].astype(np.float64))
+        return list(zip(dias.tolist(), sesiones.tolist(), carga.tolist()))
+
+
+class SeriesPaciente:
+    """All series of one patient, with the change-log position they reflect."""
+    
+    def __init__(self, series: dict[str, SerieEjercicio], token: int):
+        self.series = series
+        self.token = token
+        self.verificado = time.monotonic()
+    
+    def ejercicio(self, ejercicio_id: str) -> Optional[SerieEjercicio]:
+        """Serie of an ejercicio, or None if it has no sessions."""
+        return self.series.get(ejercicio_id)
+    
+    @property
+    def total(self) -> int:
+        return sum(len(serie) for serie in self.series.values())
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(serie.nbytes for serie in self.series.values())
+    
+    def upsert(self, filas: Iterable[Fila]) -> None:
+        for registro_id, ejercicio_id, fecha, volumen, dolor_intra, dolor_24h in filas:
+            serie = self.series.get(ejercicio_id)
+            if serie is None:
+                serie = self.series[ejercicio_id] = SerieEjercicio()
+            serie.upsert(registro_id, fecha, volumen, dolor_intra, dolor_24h)
+    
+    def estadisticas(self, ventana: int = 1000) -> dict:
+        """
+        Totals of the ``/informes/estadisticas`` report.
+        
+        The mean intra-session pain is over the latest ``ventana``
+        sessions. Pending ``dolor_24h`` counts sessions older than 24h
+        (within the last ``pendientes_max_dias`` days, if set).
+        """
+        series = [serie for serie in self.series.values() if serie.n]
+        if not series:
+            return {
+                "total_registros": 0,
+                "pendientes_dolor_24h": 0,
+                "promedio_dolor_intra": 0,
+                "ultimo_registro": None
+            }
+        
+        ahora = np.datetime64(datetime.utcnow(), "us")
+        corte = ahora - np.timedelta64(24, "h")
+        max_dias = get_settings().pendientes_max_dias
+        desde = None if not max_dias else ahora - np.timedelta64(max_dias, "D")
+        pendientes = 0
+        for serie in series:
+            rango = slice(
+                0 if desde is None else int(np.searchsorted(serie.fechas[:serie.n], desde)),
+                int(np.searchsorted(serie.fechas[:serie.n], corte))
+            )
+            pendientes += int(np.count_nonzero(serie.dolor_24h[rango] == SIN_DOLOR))
+        
+        # Only the latest `ventana` sessions of each serie can be among the latest overall
+        fechas = np.concatenate([serie.fechas[max(0, serie.n - ventana):serie.n] for serie in series])
+        dolores = np.concatenate([serie.dolor_intra[max(0, serie.n - ventana):serie.n] for serie in series])
+        if len(fechas) > ventana:
+            ultimas = np.argpartition(fechas, len(fechas) - ventana)[-ventana:]
+            dolores = dolores[ultimas]
+        return {
+            "total_registros": self.total,
+            "pendientes_dolor_24h": pendientes,
+            "promedio_dolor_intra": round(float(dolores.mean(dtype=np.float64)), 2),
+            "ultimo_registro": max(serie.fechas[serie.n - 1] for serie in series).item().isoformat()
+        }
+
+
+class AlmacenSeries:
+    """Per-process store of ``SeriesPaciente`` (see the module docstring)."""
+    
+    def __init__(self, max_pacientes: int = 1000, refresco: float = 1.0):
+        self.max_pacientes = max_pacientes
+        self.refresco = refresco
+        self._pacientes: OrderedDict[str, SeriesPaciente] = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._pacientes)
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(paciente.nbytes for paciente in self._pacientes.values())
+    
+    def reset(self) -> None:
+        """Forget every patient (benchmarks, tests)."""
+        self._pacientes.clear()
+    
+    async def obtener(self, session: AsyncSession, paciente_id: str) -> SeriesPaciente:
+        """Series of a patient, loading or catching them up first if needed."""
+        paciente = self._pacientes.get(paciente_id)
+        if paciente is None:
+            return await self._cargar(session, paciente_id)
+        self._pacientes.move_to_end(paciente_id)
+        
+        if time.monotonic() - paciente.verificado >= self.refresco:
+            token = await self._token(session, paciente_id)
+            if token < paciente.token:
+                # The change log went backwards: not the database we loaded from
+                return await self._cargar(session, paciente_id)
+            if token > paciente.token:
+                ids = (await session.execute(
+                    select(Cambio.entidad_id)
+                    .where(Cambio.paciente_id == paciente_id)
+                    .where(Cambio.entidad == ENTIDAD_REGISTRO)
+                    .where(Cambio.seq > paciente.token)
+                    .where(Cambio.seq <= token)
+                    .limit(_MAX_DELTA + 1)
+                )).scalars().all()
+                if len(ids) > _MAX_DELTA:
+                    return await self._cargar(session, paciente_id)
+                if ids:
+                    result = await session.execute(
+                        _select_filas()
+                        .where(Registro.paciente_id == paciente_id)
+                        .where(Registro.id.in_({int(i) for i in ids}))
+                    )
+                    paciente.upsert(result.all())
+                paciente.token = token
+            paciente.verificado = time.monotonic()
+        return paciente
+    
+    async def _token(self, session: AsyncSession, paciente_id: str) -> int:
+        result = await session.execute(
+            select(ContadorCambios.seq).where(ContadorCambios.paciente_id == paciente_id)
+        )
+        return result.scalar_one_or_none() or 0
+    
+    async def _cargar(self, session: AsyncSession, paciente_id: str) -> SeriesPaciente:
+        # Token first: rows committed in between are fetched again by the next catch-up
+        token = await self._token(session, paciente_id)
+        result = await session.execute(
+            _select_filas()
+            .where(Registro.paciente_id == paciente_id)
+            .order_by(Registro.ejercicio_id, Registro.fecha, Registro.id)
+        )
+        filas = result.all()
+        
+        series = {}
+        if filas:
+            ids, ejercicios, fechas, volumen, dolor_intra, dolor_24h = zip(*filas)
+            ejercicios = np.array(ejercicios, dtype=object)
+            cortes = np.flatnonzero(ejercicios[1:] != ejercicios[:-1]) + 1
+            dolor_24h = [SIN_DOLOR if d is None else d for d in dolor_24h]
+            for inicio, fin in zip(np.r_[0, cortes], np.r_[cortes, len(filas)]):
+                series[ejercicios[inicio]] = SerieEjercicio.desde_columnas(
+                    ids[inicio:fin], fechas[inicio:fin], volumen[inicio:fin],
+                    dolor_intra[inicio:fin], dolor_24h[inicio:fin]
+                )
+        
+        paciente = self._pacientes[paciente_id] = SeriesPaciente(series, token)
+        self._pacientes.move_to_end(paciente_id)
+        while len(self._pacientes) > self.max_pacientes:
+            self._pacientes.popitem(last=False)
+        return paciente
+    
+    def programar(self, session: AsyncSession, paciente_id: str, registros: Iterable[Registro]) -> None:
+        """
+        Upsert ``registros`` into the patient's series when ``session`` commits.
+        
+        Nothing is applied if the transaction rolls back, or if the patient
+        is not loaded (it will be read from the database when needed).
+        """
+        sync_session = session.sync_session
+        pendientes = sync_session.info.get("series_pendientes")
+        if pendientes is None:
+            pendientes = sync_session.info["series_pendientes"] = []
+            event.listen(sync_session, "after_commit", self._aplicar)
+            event.listen(sync_session, "after_rollback", lambda s: s.info["series_pendientes"].clear())
+        pendientes.extend(
+            (paciente_id, (r.id, r.ejercicio_id, r.fecha, r.series * r.reps * r.peso, r.dolor_intra, r.dolor_24h))
+            for r in registros
+        )
+    
+    def _aplicar(self, sync_session) -> None:
+        pendientes = sync_session.info["series_pendientes"]
+        for paciente_id, fila in pendientes:
+            paciente = self._pacientes.get(paciente_id)
+            if paciente is not None:
+                paciente.upsert([fila])
+        pendientes.clear()
+
+
+_almacen: Optional[AlmacenSeries] = None
+
+
+def get_series() -> AlmacenSeries:
+    """Get the process-wide series store (lazy initialization)."""
+    global _almacen
+    if _almacen is None:
+        settings = get_settings()
+        _almacen = AlmacenSeries(settings.series_max_pacientes, settings.series_refresco)
+    return _almacen
@@ -0,0 +1,4 @@
+"""Benchmark and load-test suite for PhysioTrainer.
+
+Run ``python -m benchmarks.load_test --help`` for the end-to-end load test.
+"""
@@ -0,0 +1,237 @@
+"""Admission control under overload.
+
+Several well-behaved clients (each with its own address) issue paced cheap
+GETs while one misbehaving client fires ``POST /chat/`` at a fixed rate,
+whatever the responses, with up to ``--abusador-concurrencia`` requests
+in flight. Three phases run on the same seeded database:
+
+- ``base``: only the well-behaved clients
+- ``sobrecarga``: both, admission control off
+- ``sobrecarga_control``: both, admission control on
+
+Per phase the report gives p50/p95/p99 of the cheap requests, how many of
+them were shed, and how many of the misbehaving client's requests reached
+the app (and Bedrock) versus got ``429``.
+
+Example::
+    
+    python -m benchmarks.admision --registros 20000 --duracion 10 \\
+        --abusador-rps 200 --abusador-concurrencia 64 --clientes 8 --output admision_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+from sqlmodel import SQLModel
+
+from benchmarks.bedrock_stub import make_stub_service
+from benchmarks.load_test import install_overrides, percentile
+from benchmarks.seed import seed_database
+
+FASES = (
+    ("base", False, False),
+    ("sobrecarga", True, False),
+    ("sobrecarga_control", True, True)
+)
+
+
+def _rutas_ligeras(rng: random.Random, seeded) -> str:
+    return rng.choice([
+        "/api/v1/ejercicios/",
+        f"/api/v1/ejercicios/{rng.choice(seeded.ejercicio_ids)}",
+        "/api/v1/registros/?limit=50",
+        f"/api/v1/registros/ejercicio/{rng.choice(seeded.ejercicio_ids)}?limit=20",
+        "/api/v1/registros/pendientes"
+    ])
+
+
+async def _fase(app, seeded, duracion: float, clientes: int, intervalo: float,
+                abusador: bool, abusador_rps: float, abusador_concurrencia: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    fin = time.perf_counter() + duracion
+    latencias: list[float] = []
+    ligeras = Counter()
+    chat = Counter()
+    
+    async def cliente_ligero(client: httpx.AsyncClient):
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            response = await client.get(_rutas_ligeras(rng, seeded))
+            latencias.append(time.perf_counter() - inicio)
+            ligeras[str(response.status_code)] += 1
+            await asyncio.sleep(intervalo)
+    
+    async def chat_abusivo(client: httpx.AsyncClient):
+        response = await client.post("/api/v1/chat/", json={"mensaje": "búlgaras 3x10 12kg d2"})
+        chat[str(response.status_code)] += 1
+    
+    async def abusador_abierto(client: httpx.AsyncClient):
+        # Open loop: Retry-After and slow responses do not slow it down
+        en_curso: set[asyncio.Task] = set()
+        siguiente = time.perf_counter()
+        while time.perf_counter() < fin:
+            if len(en_curso) < abusador_concurrencia:
+                tarea = asyncio.create_task(chat_abusivo(client))
+                en_curso.add(tarea)
+                tarea.add_done_callback(en_curso.discard)
+            siguiente += 1 / abusador_rps
+            await asyncio.sleep(max(0.0, siguiente - time.perf_counter()))
+        await asyncio.gather(*en_curso)
+    
+    def cliente(ip: str) -> httpx.AsyncClient:
+        transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+        return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+    
+    normales = [cliente(f"10.0.1.{i + 1}") for i in range(clientes)]
+    abusivo = cliente("10.0.9.9")
+    tareas = [cliente_ligero(c) for c in normales]
+    if abusador:
+        tareas.append(abusador_abierto(abusivo))
+    try:
+        await asyncio.gather(*tareas)
+    finally:
+        for c in normales + [abusivo]:
+            await c.aclose()
+    
+    ordenadas = sorted(latencias)
+    return {
+        "ligeras": {
+            "requests": len(ordenadas),
+            "status_codes": dict(ligeras),
+            "p50_ms": round(percentile(ordenadas, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordenadas, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordenadas, 99) * 1000, 2)
+        },
+        "abusador": {
+            "requests": sum(chat.values()),
+            "status_codes": dict(chat),
+            "rps_admitidas": round(chat["200"] / duracion, 2)
+        }
+    }
+
+
+async def run(database_url: str, n_registros: int, n_ejercicios: int, duracion: float, clientes: int,
+              intervalo_ms: float, abusador_rps: float, abusador_concurrencia: int,
+              bedrock_latency_ms: float, seed: int = 42) -> dict:
+    from app.main import app
+    from app.core.admission import reset_control_admision
+    from app.core.config import get_settings
+    from app.db.sqlite import create_sqlite_engines, sqlite_file_url
+    
+    settings = get_settings()
+    read_engine = None
+    if sqlite_file_url(database_url):
+        engine, read_engine = create_sqlite_engines(
+            settings.model_copy(update={"database_url": database_url, "debug": False})
+        )
+    else:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        engine = create_async_engine(database_url, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    seeded = await seed_database(engine, n_registros=n_registros, n_ejercicios=n_ejercicios, seed=seed)
+    
+    stub = make_stub_service(
+        latency_ms=bedrock_latency_ms, jitter_ms=bedrock_latency_ms / 4,
+        ejercicios=seeded.ejercicio_nombres[:20], seed=seed
+    )
+    install_overrides(app, engine, stub, read_engine=read_engine)
+    
+    admission_previa = settings.admission_control
+    resultados = {}
+    try:
+        for nombre, abusador, control in FASES:
+            settings.admission_control = control
+            reset_control_admision()
+            llamadas = stub.client.calls
+            resultados[nombre] = await _fase(
+                app, seeded, duracion, clientes, intervalo_ms / 1000,
+                abusador, abusador_rps, abusador_concurrencia, seed
+            )
+            resultados[nombre]["bedrock_calls"] = stub.client.calls - llamadas
+    finally:
+        settings.admission_control = admission_previa
+        reset_control_admision()
+        app.dependency_overrides.clear()
+        await engine.dispose()
+        if read_engine is not None:
+            await read_engine.dispose()
+    
+    return {
+        "meta": {
+            "registros": n_registros,
+            "duracion_s": duracion,
+            "clientes": clientes,
+            "intervalo_ms": intervalo_ms,
+            "abusador_rps": abusador_rps,
+            "abusador_concurrencia": abusador_concurrencia,
+            "bedrock_latency_ms": bedrock_latency_ms,
+            "admission_tasa": settings.admission_tasa,
+            "admission_rafaga": settings.admission_rafaga,
+            "admission_coste_ia": settings.admission_coste_ia,
+            "admission_concurrencia": settings.admission_concurrencia,
+            "admission_concurrencia_ia": settings.admission_concurrencia_ia
+        },
+        "fases": resultados
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer admission control benchmark")
+    parser.add_argument("--database-url", default=None,
+                        help="Async SQLAlchemy URL of an EMPTY database (default: temporary SQLite file)")
+    parser.add_argument("--registros", type=int, default=20_000)
+    parser.add_argument("--ejercicios", type=int, default=100)
+    parser.add_argument("--duracion", type=float, default=10.0, help="Seconds per phase")
+    parser.add_argument("--clientes", type=int, default=8, help="Well-behaved clients")
+    parser.add_argument("--intervalo-ms", type=float, default=50.0, help="Pause between a client's requests")
+    parser.add_argument("--abusador-rps", type=float, default=200.0, help="Chat requests per second sent")
+    parser.add_argument("--abusador-concurrencia", type=int, default=64, help="Chat requests in flight at most")
+    parser.add_argument("--bedrock-latency-ms", type=float, default=300.0)
+    parser.add_argument("--output", default="admision_results.json")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app").setLevel(logging.WARNING)
+    
+    comunes = dict(
+        n_registros=args.registros,
+        n_ejercicios=args.ejercicios,
+        duracion=args.duracion,
+        clientes=args.clientes,
+        intervalo_ms=args.intervalo_ms,
+        abusador_rps=args.abusador_rps,
+        abusador_concurrencia=args.abusador_concurrencia,
+        bedrock_latency_ms=args.bedrock_latency_ms
+    )
+    if args.database_url:
+        report = asyncio.run(run(args.database_url, **comunes))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'admision.db')}"
+            report = asyncio.run(run(url, **comunes))
+    
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True, ensure_ascii=False)
+        fh.write("\n")
+    
+    print(f"{'fase':<22}{'ligeras p50/p99 ms':>22}{'ligeras 429':>13}{'chat 200':>10}{'chat 429':>10}")
+    for nombre, datos in report["fases"].items():
+        ligeras, abusador = datos["ligeras"], datos["abusador"]
+        print(
+            f"{nombre:<22}{ligeras['p50_ms']:>12.1f} / {ligeras['p99_ms']:<7.1f}"
+            f"{ligeras['status_codes'].get('429', 0):>13}"
+            f"{abusador['status_codes'].get('200', 0):>10}{abusador['status_codes'].get('429', 0):>10}"
+        )
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Local stand-in for the AWS Bedrock runtime client.
+
+The stub implements the subset of the ``bedrock-runtime`` client used by
+``BedrockService`` (``invoke_model``) with configurable latency, latency
+spikes and error rate, so the API can be exercised end to end without AWS
+credentials. One stub per region stands in for multi-region clients.
+"""
+
+import io
+import json
+import random
+import threading
+import time
+from typing import Optional, Sequence
+
+from botocore.exceptions import ClientError
+
+from app.services.bedrock_service import BedrockService
+
+
+class StubBedrockClient:
+    """Fake ``bedrock-runtime`` client with simulated latency and failures."""
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        error_rate: float = 0.0,
+        ejercicios: Optional[Sequence[str]] = None,
+        seed: Optional[int] = None,
+        ejercicios_por_mensaje: int = 1,
+        spike_rate: float = 0.0,
+        spike_ms: float = 0.0
+    ):
+        """
+        Args:
+            latency_ms: Mean simulated model latency in milliseconds
+            jitter_ms: Standard deviation of the latency (gaussian)
+            error_rate: Probability (0-1) of raising a throttling error
+            ejercicios: Exercise names returned by the extraction prompt
+            seed: Random seed for reproducible runs
+            ejercicios_por_mensaje: Exercises returned by each extraction
+            spike_rate: Probability (0-1) of a latency spike (a slow region)
+            spike_ms: Latency added by a spike in milliseconds
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.ejercicios = list(ejercicios or ["Sentadilla Búlgara"])
+        self.ejercicios_por_mensaje = ejercicios_por_mensaje
+        self.spike_rate = spike_rate
+        self.spike_ms = spike_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _draw(self) -> tuple[float, bool, list[str]]:
+        with self._lock:
+            self.calls += 1
+            latency = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            if self.spike_rate and self._rng.random() < self.spike_rate:
+                latency += self.spike_ms / 1000
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            n = min(self.ejercicios_por_mensaje, len(self.ejercicios))
+            ejercicios = self._rng.sample(self.ejercicios, n)
+        return latency, failed, ejercicios
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> dict:
+        """Simulate ``InvokeModel``; blocks like the real boto3 call does."""
+        latency, failed, ejercicios = self._draw()
+        time.sleep(latency)
+
+        if failed:
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded (stub)"}},
+                "InvokeModel"
+            )
+
+        if "dolorIntra" in body:
+            text = json.dumps([
+                {
+                    "ejercicio": ejercicio,
+                    "series": 3,
+                    "reps": 10,
+                    "peso": 12.5,
+                    "dolorIntra": 2
+                }
+                for ejercicio in ejercicios
+            ], ensure_ascii=False)
+        else:
+            text = "🟢 Buena tolerancia. Respuesta simulada del stub de Bedrock."
+
+        payload = {
+            "content": [{"type": "text", "text": text}],
+            "usage": {"input_tokens": len(body) // 4, "output_tokens": len(text) // 4}
+        }
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+
+def make_stub_service(**kwargs) -> BedrockService:
+    """Build a ``BedrockService`` backed by a ``StubBedrockClient``."""
+    return BedrockService(client=StubBedrockClient(**kwargs))
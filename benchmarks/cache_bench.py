@@ -0,0 +1,132 @@
+"""Cache serialization and backend benchmark.
+
+Measures encode/decode cost per serializer and get/set latency per backend
+(memory, SQLite file, Redis protocol via the local stand-in or a real
+server) for payloads shaped like the API's cached responses.
+
+Example::
+
+    python -m benchmarks.cache_bench --iterations 5000 --output cache_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.cache.cache import SERIALIZERS, MemoryCache, SQLiteCache, RedisCache
+from benchmarks.redis_standin import RedisStandIn
+
+
+def payloads() -> dict:
+    """Representative cached values, from a small dict to a 500-row page."""
+    ahora = datetime(2025, 1, 1)
+    fila = lambda i: {
+        "id": i,
+        "fecha": (ahora + timedelta(hours=i)).isoformat(),
+        "series": 3,
+        "reps": 10,
+        "peso": 12.5,
+        "dolor_intra": i % 10,
+        "dolor_24h": None,
+        "notas": None,
+        "ejercicio_nombre": "Sentadilla Búlgara",
+        "volumen_total": 375.0
+    }
+    return {
+        "estadisticas": {
+            "total_registros": 1000,
+            "pendientes_dolor_24h": 3,
+            "promedio_dolor_intra": 2.4,
+            "ultimo_registro": ahora.isoformat()
+        },
+        "tendencias_30": [fila(i) for i in range(30)],
+        "registros_500": [fila(i) for i in range(500)]
+    }
+
+
+def bench_serializers(iterations: int) -> dict:
+    resultados = {}
+    for nombre, cls in SERIALIZERS.items():
+        try:
+            serializer = cls()
+        except ImportError:
+            continue
+        for payload_name, value in payloads().items():
+            data = serializer.dumps(value)
+            t0 = time.perf_counter()
+            for _ in range(iterations):
+                serializer.dumps(value)
+            t1 = time.perf_counter()
+            for _ in range(iterations):
+                serializer.loads(data)
+            t2 = time.perf_counter()
+            resultados[f"{nombre}/{payload_name}"] = {
+                "bytes": len(data),
+                "dumps_us": round((t1 - t0) / iterations * 1e6, 2),
+                "loads_us": round((t2 - t1) / iterations * 1e6, 2)
+            }
+    return resultados
+
+
+async def bench_backend(backend, iterations: int) -> dict:
+    resultados = {}
+    for payload_name, value in payloads().items():
+        sets, gets = [], []
+        for i in range(iterations):
+            t0 = time.perf_counter()
+            await backend.set("bench", f"{payload_name}:{i % 100}", value)
+            t1 = time.perf_counter()
+            await backend.get("bench", f"{payload_name}:{i % 100}")
+            t2 = time.perf_counter()
+            sets.append(t1 - t0)
+            gets.append(t2 - t1)
+        resultados[payload_name] = {
+            "set_p50_us": round(statistics.median(sets) * 1e6, 1),
+            "get_p50_us": round(statistics.median(gets) * 1e6, 1)
+        }
+    return resultados
+
+
+async def run(iterations: int, redis_url: str = None) -> dict:
+    report = {"serializers": bench_serializers(iterations), "backends": {}}
+    tmpdir = tempfile.mkdtemp(prefix="physiotrainer-cache-")
+
+    report["backends"]["memory"] = await bench_backend(MemoryCache(), iterations)
+
+    sqlite = SQLiteCache(os.path.join(tmpdir, "cache.db"))
+    report["backends"]["sqlite"] = await bench_backend(sqlite, iterations)
+    await sqlite.close()
+
+    if redis_url:
+        redis = RedisCache(redis_url)
+        report["backends"]["redis"] = await bench_backend(redis, iterations)
+        await redis.close()
+    else:
+        async with RedisStandIn() as server:
+            redis = RedisCache(server.url)
+            report["backends"]["redis_standin"] = await bench_backend(redis, iterations)
+            await redis.close()
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer cache benchmark")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--redis-url", default=None, help="Real Redis server (default: local stand-in)")
+    parser.add_argument("--output", default="cache_results.json")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.iterations, args.redis_url))
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
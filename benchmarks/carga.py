@@ -0,0 +1,132 @@
+"""Training-load report (ACWR, monotony, strain) on a long history.
+
+Seeds one ejercicio with many sessions (100k by default, several per day
+over multiple years) and times the SQL daily aggregation, the vectorised
+pandas metrics, a plain Python loop over the same days for reference, and
+the ``/informes/carga/{ejercicio_id}`` endpoint end to end with the
+response cache disabled.
+
+Example::
+
+    python -m benchmarks.carga --sesiones 100000 --dias 1825 --output carga_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from app.repositories import RegistroRepository
+from app.services.carga_service import VENTANA_AGUDA, VENTANA_CRONICA, calcular_metricas_carga
+from benchmarks.bedrock_stub import make_stub_service
+from benchmarks.load_test import install_overrides, percentile
+from benchmarks.seed import seed_database
+
+
+def acwr_bucle(cargas_diarias: list[tuple]) -> dict:
+    """Reference ACWR per day computed with Python loops over a day dict."""
+    por_dia = {}
+    for dia, _, carga in cargas_diarias:
+        dia = date.fromisoformat(str(dia)[:10])
+        por_dia[dia] = por_dia.get(dia, 0.0) + carga
+    actual, fin = min(por_dia), date.today()
+    resultado = {}
+    while actual <= fin:
+        aguda = sum(por_dia.get(actual - timedelta(days=i), 0.0) for i in range(VENTANA_AGUDA))
+        cronica = sum(por_dia.get(actual - timedelta(days=i), 0.0) for i in range(VENTANA_CRONICA))
+        cronica = cronica / VENTANA_CRONICA * VENTANA_AGUDA
+        resultado[actual] = aguda / cronica if cronica else None
+        actual += timedelta(days=1)
+    return resultado
+
+
+def _resumen(tiempos: list[float]) -> dict:
+    ordenados = sorted(tiempos)
+    return {
+        "p50_ms": round(statistics.median(ordenados) * 1000, 3),
+        "p95_ms": round(percentile(ordenados, 95) * 1000, 3)
+    }
+
+
+async def run(database_url: str, sesiones: int, dias: int, repeticiones: int, seed: int) -> dict:
+    from app.cache import MemoryCache, get_cache
+    from app.main import app
+
+    engine = create_async_engine(database_url, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    seeded = await seed_database(engine, n_registros=sesiones, n_ejercicios=1, dias=dias, seed=seed)
+    ejercicio_id = seeded.ejercicio_ids[0]
+    paciente_id = seeded.paciente_ids[0]
+
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    # Import pandas outside the timed region
+    calcular_metricas_carga([(date.today(), 1, 1.0)])
+    tiempos = {"sql_carga_diaria": [], "pandas_metricas": [], "python_bucle": [], "endpoint": []}
+    for _ in range(repeticiones):
+        async with factory() as session:
+            t0 = time.perf_counter()
+            filas = await RegistroRepository(session, paciente_id).get_carga_diaria(ejercicio_id)
+            tiempos["sql_carga_diaria"].append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        calcular_metricas_carga(filas, semanas=520)
+        tiempos["pandas_metricas"].append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        acwr_bucle(filas)
+        tiempos["python_bucle"].append(time.perf_counter() - t0)
+
+    install_overrides(app, engine, make_stub_service(latency_ms=0))
+    # Entries are evicted as soon as they are stored: every request recomputes
+    app.dependency_overrides[get_cache] = lambda: MemoryCache(max_entries=0)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(repeticiones):
+                t0 = time.perf_counter()
+                response = await client.get(f"/api/v1/informes/carga/{ejercicio_id}", params={"semanas": 520})
+                tiempos["endpoint"].append(time.perf_counter() - t0)
+                response.raise_for_status()
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    return {
+        "meta": {"sesiones": sesiones, "dias": dias, "dias_con_sesion": len(filas), "repeticiones": repeticiones},
+        "resultados": {nombre: _resumen(valores) for nombre, valores in tiempos.items()}
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer training-load report benchmark")
+    parser.add_argument("--database-url", default=None, help="Default: temporary SQLite file")
+    parser.add_argument("--sesiones", type=int, default=100_000)
+    parser.add_argument("--dias", type=int, default=1825, help="Span of the history in days")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="carga_results.json")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'carga.db')}"
+        report = asyncio.run(run(database_url, args.sesiones, args.dias, args.repeticiones, args.seed))
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
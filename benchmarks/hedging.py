@@ -0,0 +1,177 @@
+"""Single-region Bedrock calls versus calls hedged across regions.
+
+Each region is a ``StubBedrockClient`` with the same latency distribution:
+gaussian latency plus occasional independent spikes (a regional slowdown).
+The same extraction calls run concurrently in two modes:
+
+- ``una_region``: every call goes to the primary region
+- ``cobertura``: ``PoolRegiones`` hedges calls still unanswered after the
+  ``--percentil`` latency to the other region (``app.services.bedrock_regiones``)
+
+The first ``--calentamiento`` calls of each mode fill the latency window and
+are not measured. Per mode the report gives latency p50/p95/p99/max and the
+calls sent to Bedrock; for ``cobertura`` also the hedge rate, which region
+answered the hedged calls and the extra calls paid, and the p99 gain over
+``una_region``.
+
+Example::
+
+    python -m benchmarks.hedging --llamadas 2000 --concurrencia 8 --latencia-ms 400 \\
+        --spike-rate 0.03 --spike-ms 3000 --percentil 95 --output hedging_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import get_settings
+from app.core.metrics import metricas
+from app.services import BedrockService
+from app.services.bedrock_regiones import METRICA_COBERTURAS, METRICA_LLAMADAS
+from benchmarks.bedrock_stub import StubBedrockClient
+from benchmarks.load_test import percentile
+
+MODOS = ("una_region", "cobertura")
+REGIONES = ("us-east-1", "us-west-2")
+GANADORAS = ("primaria", "cobertura", "ninguna")
+
+
+def _resumen_ms(valores: list[float]) -> dict:
+    ordenados = sorted(valores)
+    return {
+        "p50_ms": round(percentile(ordenados, 50), 1),
+        "p95_ms": round(percentile(ordenados, 95), 1),
+        "p99_ms": round(percentile(ordenados, 99), 1),
+        "max_ms": round(ordenados[-1], 1) if ordenados else 0.0
+    }
+
+
+async def _medir(service: BedrockService, llamadas: int, concurrencia: int, calentamiento: int) -> list[float]:
+    # Abandoned hedges keep their worker thread until the stub answers
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrencia * 4))
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias: list[float] = []
+
+    async def llamada(i: int):
+        async with semaforo:
+            inicio = time.perf_counter()
+            ejercicios = await service.extraer_ejercicios(f"búlgaras 3x10 con {i % 20}kg, dolor 2")
+            if not ejercicios:
+                raise RuntimeError("Extraction failed")
+            if i >= calentamiento:
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+    await asyncio.gather(*(llamada(i) for i in range(calentamiento + llamadas)))
+    return latencias
+
+
+def run(
+    llamadas: int,
+    concurrencia: int,
+    calentamiento: int,
+    latencia_ms: float,
+    jitter_ms: float,
+    spike_rate: float,
+    spike_ms: float,
+    percentil: float,
+    seed: int
+) -> dict:
+    settings = get_settings()
+    anteriores = (settings.bedrock_hedge_percentil, settings.bedrock_hedge_retraso_inicial)
+    settings.bedrock_hedge_percentil = percentil
+    # Until the window fills, hedge after twice the mean latency
+    settings.bedrock_hedge_retraso_inicial = 2 * latencia_ms / 1000
+    report = {
+        "config": {
+            "llamadas": llamadas,
+            "concurrencia": concurrencia,
+            "calentamiento": calentamiento,
+            "latencia_ms": latencia_ms,
+            "jitter_ms": jitter_ms,
+            "spike_rate": spike_rate,
+            "spike_ms": spike_ms,
+            "percentil": percentil,
+            "regiones": list(REGIONES)
+        },
+        "modos": {}
+    }
+
+    try:
+        for modo in MODOS:
+            stubs = {
+                region: StubBedrockClient(
+                    latency_ms=latencia_ms, jitter_ms=jitter_ms, seed=seed + i,
+                    spike_rate=spike_rate, spike_ms=spike_ms
+                )
+                for i, region in enumerate(REGIONES)
+            }
+            if modo == "una_region":
+                service = BedrockService(client=stubs[REGIONES[0]])
+            else:
+                service = BedrockService(clientes=stubs)
+
+            antes = {g: metricas.valor(METRICA_COBERTURAS, ganadora=g) for g in GANADORAS}
+            llamadas_antes = metricas.valor(METRICA_LLAMADAS)
+            latencias = asyncio.run(_medir(service, llamadas, concurrencia, calentamiento))
+            datos = {
+                "latencia": _resumen_ms(latencias),
+                "llamadas_bedrock": sum(stub.calls for stub in stubs.values())
+            }
+            if modo == "cobertura":
+                ganadoras = {g: int(metricas.valor(METRICA_COBERTURAS, ganadora=g) - antes[g]) for g in GANADORAS}
+                total = metricas.valor(METRICA_LLAMADAS) - llamadas_antes
+                datos["coberturas"] = ganadoras
+                datos["tasa_cobertura"] = round(sum(ganadoras.values()) / total, 4) if total else 0.0
+                datos["llamadas_extra"] = round(datos["llamadas_bedrock"] / total - 1, 4) if total else 0.0
+            report["modos"][modo] = datos
+    finally:
+        settings.bedrock_hedge_percentil, settings.bedrock_hedge_retraso_inicial = anteriores
+
+    base = report["modos"]["una_region"]["latencia"]
+    cubierta = report["modos"]["cobertura"]["latencia"]
+    report["mejora"] = {
+        clave: round(1 - cubierta[clave] / base[clave], 4) if base[clave] else 0.0
+        for clave in ("p50_ms", "p95_ms", "p99_ms")
+    }
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer hedged Bedrock calls benchmark")
+    parser.add_argument("--llamadas", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--calentamiento", type=int, default=100, help="Unmeasured calls that fill the latency window")
+    parser.add_argument("--latencia-ms", type=float, default=400.0)
+    parser.add_argument("--jitter-ms", type=float, default=60.0)
+    parser.add_argument("--spike-rate", type=float, default=0.03, help="Probability of a latency spike per region")
+    parser.add_argument("--spike-ms", type=float, default=3000.0)
+    parser.add_argument("--percentil", type=float, default=95.0, help="Latency percentile after which calls are hedged")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="hedging_results.json")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.llamadas, args.concurrencia, args.calentamiento, args.latencia_ms, args.jitter_ms,
+        args.spike_rate, args.spike_ms, args.percentil, args.seed
+    )
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True, ensure_ascii=False)
+        fh.write("\n")
+
+    print(f"{'modo':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'llamadas':>10}{'cobertura':>11}")
+    for nombre, datos in report["modos"].items():
+        lat = datos["latencia"]
+        tasa = f"{datos['tasa_cobertura']:.1%}" if "tasa_cobertura" in datos else "-"
+        print(
+            f"{nombre:<12}{lat['p50_ms']:>10.1f}{lat['p95_ms']:>10.1f}{lat['p99_ms']:>10.1f}{lat['max_ms']:>10.1f}"
+            f"{datos['llamadas_bedrock']:>10}{tasa:>11}"
+        )
+    print(f"p99 gain: {report['mejora']['p99_ms']:.1%}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
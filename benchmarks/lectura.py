@@ -0,0 +1,193 @@
+"""Connection hold time of GET routes: transactional versus autocommit sessions.
+
+Seeds a history, then fires concurrent GETs over the read-only routes with
+a small connection pool, twice:
+
+- ``transaccional``: what ``get_read_session`` did before, one session per
+  request that keeps its connection inside a transaction until the
+  dependency commits after the response is built
+- ``autocommit``: ``app.db.lectura.SesionLectura``, no BEGIN/COMMIT and the
+  connection back in the pool as soon as each query's rows are buffered
+
+Per mode the report gives p50/p95/p99 latency, requests per second, pool
+checkouts per request and how long connections were held per request
+(measured with pool checkout/checkin events, so both modes are measured
+the same way).
+
+Example::
+
+    python -m benchmarks.lectura --registros 20000 --requests 2000 --concurrency 64 --pool 4 \\
+        --output lectura_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import SQLModel
+
+from benchmarks.bedrock_stub import make_stub_service
+from benchmarks.load_test import install_overrides, percentile
+from benchmarks.seed import seed_database
+
+MODOS = ("transaccional", "autocommit")
+
+
+def _rutas(rng: random.Random, seeded) -> str:
+    return rng.choice([
+        "/api/v1/ejercicios/",
+        f"/api/v1/ejercicios/{rng.choice(seeded.ejercicio_ids)}",
+        "/api/v1/registros/?limit=50",
+        f"/api/v1/registros/ejercicio/{rng.choice(seeded.ejercicio_ids)}?limit=20",
+        "/api/v1/registros/pendientes",
+        "/api/v1/informes/estadisticas"
+    ])
+
+
+def _transaccional(engine):
+    fabrica = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def bench_get_read_session():
+        async with fabrica() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+    return bench_get_read_session
+
+
+async def _fase(app, seeded, requests: int, concurrency: int, seed: int) -> tuple[list[float], int]:
+    rng = random.Random(seed)
+    rutas = [_rutas(rng, seeded) for _ in range(requests)]
+    latencias: list[float] = []
+    errores = 0
+    semaforo = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 timeout=60) as client:
+        async def una(ruta: str):
+            nonlocal errores
+            async with semaforo:
+                t0 = time.perf_counter()
+                response = await client.get(ruta)
+                latencias.append(time.perf_counter() - t0)
+                errores += response.status_code >= 400
+
+        await asyncio.gather(*(una(ruta) for ruta in rutas))
+    return latencias, errores
+
+
+async def run(database_url: str, n_registros: int, n_ejercicios: int, requests: int,
+              concurrency: int, pool: int) -> dict:
+    from app.core.config import get_settings
+    from app.db import get_read_session
+    from app.main import app
+
+    # Every request comes from the same client: measure the sessions, not admission control
+    settings = get_settings()
+    admission_previa = settings.admission_control
+    settings.admission_control = False
+
+    engine = create_async_engine(
+        database_url, echo=False, future=True,
+        poolclass=AsyncAdaptedQueuePool, pool_size=pool, max_overflow=0, pool_timeout=60
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    seeded = await seed_database(engine, n_registros=n_registros, n_ejercicios=n_ejercicios, dias=365)
+
+    uso = {"checkouts": 0, "segundos": 0.0}
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _checkout(dbapi_connection, record, proxy):
+        record.info["checkout"] = time.perf_counter()
+        uso["checkouts"] += 1
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _checkin(dbapi_connection, record):
+        desde = record.info.pop("checkout", None)
+        if desde is not None:
+            uso["segundos"] += time.perf_counter() - desde
+
+    report = {"modos": {}}
+    try:
+        for modo in MODOS:
+            install_overrides(app, engine, make_stub_service(latency_ms=0))
+            if modo == "transaccional":
+                app.dependency_overrides[get_read_session] = _transaccional(engine)
+            # Warm-up: caches, series store, prepared statements
+            await _fase(app, seeded, min(requests, 200), concurrency, seed=1)
+
+            uso.update(checkouts=0, segundos=0.0)
+            inicio = time.perf_counter()
+            latencias, errores = await _fase(app, seeded, requests, concurrency, seed=2)
+            duracion = time.perf_counter() - inicio
+            ordenadas = sorted(latencias)
+            report["modos"][modo] = {
+                "p50_ms": round(percentile(ordenadas, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordenadas, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordenadas, 99) * 1000, 2),
+                "rps": round(requests / duracion, 1),
+                "errores": errores,
+                "checkouts_por_peticion": round(uso["checkouts"] / requests, 2),
+                "conexion_ms_por_peticion": round(uso["segundos"] * 1000 / requests, 3)
+            }
+    finally:
+        settings.admission_control = admission_previa
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer read-only session benchmark")
+    parser.add_argument("--database-url", default=None,
+                        help="Async SQLAlchemy URL of an EMPTY database (default: temporary SQLite file)")
+    parser.add_argument("--registros", type=int, default=20_000)
+    parser.add_argument("--ejercicios", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--pool", type=int, default=4, help="Connections in the pool")
+    parser.add_argument("--output", default="lectura_results.json")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    comunes = dict(
+        n_registros=args.registros,
+        n_ejercicios=args.ejercicios,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        pool=args.pool
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'lectura.db')}"
+        report = asyncio.run(run(url, **comunes))
+    report["meta"] = vars(args) | {"database_url": None}
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+    print(f"{'modo':<15}{'p50 ms':>9}{'p99 ms':>9}{'rps':>9}{'checkouts':>11}{'conexión ms':>13}")
+    for nombre, datos in report["modos"].items():
+        print(
+            f"{nombre:<15}{datos['p50_ms']:>9.1f}{datos['p99_ms']:>9.1f}{datos['rps']:>9.1f}"
+            f"{datos['checkouts_por_peticion']:>11.2f}{datos['conexion_ms_por_peticion']:>13.3f}"
+        )
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
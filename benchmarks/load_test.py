@@ -0,0 +1,366 @@
+"""End-to-end load test for the ``/api/v1`` endpoints.
+
+Seeds a database with a synthetic history, replaces Bedrock with a local
+stub and drives a shuffled mix of requests against every endpoint
+concurrently through the ASGI app (no network, no uvicorn). Latency
+percentiles and throughput per endpoint are written to a JSON report with
+sorted keys so two runs can be diffed directly.
+
+Example::
+
+    python -m benchmarks.load_test --registros 1000000 --ejercicios 500 \\
+        --requests 2000 --concurrency 32 --output bench_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from benchmarks.bedrock_stub import make_stub_service
+from benchmarks.seed import seed_database, SeedResult
+
+
+@dataclass
+class Scenario:
+    """A single endpoint exercised by the load test."""
+    name: str
+    method: str
+    build: Callable[[random.Random, SeedResult], tuple[str, Optional[dict]]]
+
+
+def _mes_aleatorio(rng: random.Random, seed: SeedResult) -> tuple[int, int]:
+    fecha = seed.fecha_min + (seed.fecha_max - seed.fecha_min) * rng.random()
+    return max(2020, min(2030, fecha.year)), fecha.month
+
+
+def _registro_id(rng: random.Random, seed: SeedResult) -> int:
+    return rng.randint(seed.registro_id_min, seed.registro_id_max)
+
+
+_nuevos = iter(range(10**9))
+
+SCENARIOS = [
+    Scenario("POST /chat/", "POST",
+             lambda rng, s: ("/api/v1/chat/", {"mensaje": "Hoy búlgaras 3x10 con 12kg, dolor 2"})),
+    Scenario("GET /ejercicios/", "GET",
+             lambda rng, s: ("/api/v1/ejercicios/", None)),
+    Scenario("GET /ejercicios/{id}", "GET",
+             lambda rng, s: (f"/api/v1/ejercicios/{rng.choice(s.ejercicio_ids)}", None)),
+    Scenario("POST /ejercicios/", "POST",
+             lambda rng, s: ("/api/v1/ejercicios/", {
+                 "nombre": f"Bench {next(_nuevos)} {rng.getrandbits(32):08x}",
+                 "categoria": "Fuerza"
+             })),
+    Scenario("GET /ejercicios/buscar/{nombre}", "GET",
+             lambda rng, s: (f"/api/v1/ejercicios/buscar/{rng.choice(s.ejercicio_nombres)}", None)),
+    Scenario("GET /registros/", "GET",
+             lambda rng, s: (f"/api/v1/registros/?limit=100&offset={rng.randint(0, 1000)}", None)),
+    Scenario("GET /registros/pendientes", "GET",
+             lambda rng, s: ("/api/v1/registros/pendientes", None)),
+    Scenario("GET /registros/ejercicio/{id}", "GET",
+             lambda rng, s: (f"/api/v1/registros/ejercicio/{rng.choice(s.ejercicio_ids)}?limit=50", None)),
+    Scenario("GET /registros/export", "GET",
+             lambda rng, s: (f"/api/v1/registros/export?format=ndjson&ejercicio_id={rng.choice(s.ejercicio_ids)}", None)),
+    Scenario("GET /registros/{id}", "GET",
+             lambda rng, s: (f"/api/v1/registros/{_registro_id(rng, s)}", None)),
+    Scenario("POST /registros/", "POST",
+             lambda rng, s: ("/api/v1/registros/", {
+                 "ejercicio_nombre": rng.choice(s.ejercicio_nombres),
+                 "series": 3, "reps": 10, "peso": 12.5, "dolor_intra": rng.randint(0, 10)
+             })),
+    Scenario("PATCH /registros/{id}/dolor-24h", "PATCH",
+             lambda rng, s: (f"/api/v1/registros/{_registro_id(rng, s)}/dolor-24h",
+                             {"dolor_24h": rng.randint(0, 10)})),
+    Scenario("GET /informes/tendencias/{id}", "GET",
+             lambda rng, s: (f"/api/v1/informes/tendencias/{rng.choice(s.ejercicio_ids)}?limit=30", None)),
+    Scenario("GET /informes/mensual/{year}/{month}", "GET",
+             lambda rng, s: ("/api/v1/informes/mensual/{}/{}".format(*_mes_aleatorio(rng, s)), None)),
+    Scenario("GET /informes/estadisticas", "GET",
+             lambda rng, s: ("/api/v1/informes/estadisticas", None)),
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+def summarise(latencies: list[float], errors: int, elapsed: float) -> dict:
+    """Build the per-endpoint statistics block (latencies in seconds)."""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 3),
+        "rps": round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def install_overrides(app, engine: AsyncEngine, bedrock, read_engine: Optional[AsyncEngine] = None) -> None:
+    """Point the app's dependencies at the benchmark engine(s) and Bedrock stub."""
+    from app.db import get_session, get_read_session, get_session_factory, get_read_session_factory
+    from app.db.lectura import crear_fabrica_lectura
+    from app.repositories import get_indices_nombres
+    from app.services import get_bedrock_service, get_series
+
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    read_factory = sessionmaker(read_engine or engine, class_=AsyncSession, expire_on_commit=False)
+    lectura = crear_fabrica_lectura(read_engine or engine)
+
+    def dependencia(fabrica: sessionmaker):
+        async def bench_get_session():
+            async with fabrica() as session:
+                try:
+                    yield session
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    raise
+        return bench_get_session
+
+    async def bench_get_read_session():
+        # Same autocommit, connection-per-query sessions as get_read_session
+        async with lectura() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = dependencia(factory)
+    app.dependency_overrides[get_read_session] = bench_get_read_session
+    app.dependency_overrides[get_session_factory] = lambda: factory
+    app.dependency_overrides[get_read_session_factory] = lambda: read_factory
+    app.dependency_overrides[get_bedrock_service] = lambda: bedrock
+    # The app logs every SQL statement with DEBUG on; keep that out of the measurements
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    # The series store and name indexes may hold patients of a previous database
+    get_series().reset()
+    get_indices_nombres().reset()
+
+
+async def run_load_test(
+    database_url: str,
+    n_registros: int = 100_000,
+    n_ejercicios: int = 500,
+    requests_per_endpoint: int = 200,
+    concurrency: int = 16,
+    bedrock_latency_ms: float = 300.0,
+    bedrock_jitter_ms: float = 100.0,
+    bedrock_error_rate: float = 0.0,
+    endpoints: Optional[list[str]] = None,
+    seed: int = 42,
+    sqlite_tuned: bool = False,
+    admission_control: bool = False
+) -> dict:
+    """
+    Seed the database and run the mixed workload.
+    
+    Args:
+        database_url: Async SQLAlchemy URL of an empty database
+        n_registros: Registros in the synthetic history
+        n_ejercicios: Ejercicios in the synthetic history
+        requests_per_endpoint: Requests issued against each endpoint
+        concurrency: Number of concurrent in-flight requests
+        bedrock_latency_ms: Mean latency of the Bedrock stub
+        bedrock_jitter_ms: Latency standard deviation of the Bedrock stub
+        bedrock_error_rate: Probability of a stubbed Bedrock throttling error
+        endpoints: Optional subset of scenario names to run
+        seed: Random seed for data and request generation
+        sqlite_tuned: For SQLite files, use the app's embedded mode (WAL,
+            tuned pragmas, single writer connection, separate readers)
+        admission_control: Keep the per-client rate limits on (all the
+            load comes from one client, so most requests are shed)
+        
+    Returns:
+        Report dictionary (also suitable for ``json.dump``)
+    """
+    from app.main import app
+    from app.core.admission import reset_control_admision
+    from app.core.config import get_settings
+    from app.db.sqlite import create_sqlite_engines, sqlite_file_url
+
+    read_engine = None
+    if sqlite_tuned and sqlite_file_url(database_url):
+        settings = get_settings().model_copy(update={"database_url": database_url, "debug": False})
+        engine, read_engine = create_sqlite_engines(settings)
+    else:
+        engine = create_async_engine(database_url, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    t0 = time.perf_counter()
+    seeded = await seed_database(engine, n_registros=n_registros, n_ejercicios=n_ejercicios, seed=seed)
+    seed_seconds = time.perf_counter() - t0
+
+    stub = make_stub_service(
+        latency_ms=bedrock_latency_ms,
+        jitter_ms=bedrock_jitter_ms,
+        error_rate=bedrock_error_rate,
+        ejercicios=seeded.ejercicio_nombres[:20],
+        seed=seed
+    )
+    install_overrides(app, engine, stub, read_engine=read_engine)
+
+    scenarios = [s for s in SCENARIOS if not endpoints or s.name in endpoints]
+    rng = random.Random(seed)
+    jobs = [s for s in scenarios for _ in range(requests_per_endpoint)]
+    rng.shuffle(jobs)
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    status_codes: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def worker(client: AsyncClient):
+        while True:
+            try:
+                scenario = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            url, body = scenario.build(rng, seeded)
+            start = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, url, json=body)
+                status = response.status_code
+            except Exception:
+                status = 599
+            latencies[scenario.name].append(time.perf_counter() - start)
+            status_codes[scenario.name][str(status)] += 1
+            if status >= 500 or (status >= 400 and status != 404):
+                errors[scenario.name] += 1
+
+    app_settings = get_settings()
+    admission_previa = app_settings.admission_control
+    app_settings.admission_control = admission_control
+    reset_control_admision()
+    transport = ASGITransport(app=app)
+    try:
+        async with AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - t0
+    finally:
+        app_settings.admission_control = admission_previa
+        app.dependency_overrides.clear()
+        await engine.dispose()
+        if read_engine is not None:
+            await read_engine.dispose()
+
+    todas = [lat for lats in latencies.values() for lat in lats]
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "database": engine.url.get_backend_name(),
+            "sqlite_tuned": read_engine is not None,
+            "admission_control": admission_control,
+            "registros": n_registros,
+            "ejercicios": n_ejercicios,
+            "requests_per_endpoint": requests_per_endpoint,
+            "concurrency": concurrency,
+            "bedrock_latency_ms": bedrock_latency_ms,
+            "bedrock_jitter_ms": bedrock_jitter_ms,
+            "bedrock_error_rate": bedrock_error_rate,
+            "seed_seconds": round(seed_seconds, 2),
+            "elapsed_seconds": round(elapsed, 3)
+        },
+        "endpoints": {
+            name: {**summarise(latencies[name], errors[name], elapsed),
+                   "status_codes": dict(status_codes[name])}
+            for name in sorted(latencies)
+        },
+        "total": summarise(todas, sum(errors.values()), elapsed),
+        "bedrock_stub": {"calls": stub.client.calls, "errors": stub.client.errors}
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PhysioTrainer end-to-end load test")
+    parser.add_argument("--database-url", default=None,
+                        help="Async SQLAlchemy URL of an EMPTY database (default: temporary SQLite file)")
+    parser.add_argument("--registros", type=int, default=100_000)
+    parser.add_argument("--ejercicios", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bedrock-latency-ms", type=float, default=300.0)
+    parser.add_argument("--bedrock-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--bedrock-error-rate", type=float, default=0.0)
+    parser.add_argument("--endpoint", action="append", dest="endpoints",
+                        help="Only run this scenario (repeatable), e.g. 'GET /registros/'")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sqlite-tuned", action="store_true",
+                        help="SQLite files: use the embedded mode (WAL, pragmas, single writer)")
+    parser.add_argument("--output", default="bench_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    # One INFO line per request would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    database_url = args.database_url
+    if database_url is None:
+        tmpdir = tempfile.mkdtemp(prefix="physiotrainer-bench-")
+        database_url = f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    report = asyncio.run(run_load_test(
+        database_url=database_url,
+        n_registros=args.registros,
+        n_ejercicios=args.ejercicios,
+        requests_per_endpoint=args.requests,
+        concurrency=args.concurrency,
+        bedrock_latency_ms=args.bedrock_latency_ms,
+        bedrock_jitter_ms=args.bedrock_jitter_ms,
+        bedrock_error_rate=args.bedrock_error_rate,
+        endpoints=args.endpoints,
+        seed=args.seed,
+        sqlite_tuned=args.sqlite_tuned
+    ))
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True, ensure_ascii=False)
+        fh.write("\n")
+
+    print(f"{'endpoint':<40} {'req':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>8}")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<40} {stats['requests']:>6} {stats['errors']:>5} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['rps']:>8.1f}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
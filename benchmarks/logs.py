@@ -0,0 +1,203 @@
+"""Synchronous logging versus the queue-based pipeline (``app.core.logs``).
+
+Simulated requests run concurrently on one event loop, each logging a few
+application lines and one statement per query on ``sqlalchemy.engine`` (as
+with ``DEBUG`` on), while a 1 ms ticker task measures how late the loop
+wakes it up. Output goes to a stream whose writes block for
+``--latencia-escritura-us`` (a slow pipe or log collector). Two modes:
+
+- ``sincrono``: what the app did before, a ``StreamHandler`` on the root
+  logger, f-string messages and every SQL statement written
+- ``cola``: ``configurar_logging`` (JSON lines written by the listener
+  thread, ``%``-style messages, SQL statements sampled by ``log_muestreo``)
+
+Per mode the report gives the time spent inside log calls on the loop, the
+loop lag p50/p99/max, the requests per second and the records written and
+dropped.
+
+Example::
+    
+    python -m benchmarks.logs --peticiones 2000 --concurrencia 32 --latencia-escritura-us 200 \\
+        --output logs_results.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+
+from app.core.config import get_settings
+from app.core.logs import FORMATO_TEXTO, METRICA_DESCARTADOS, configurar_logging, detener_logging
+from app.core.metrics import metricas
+from benchmarks.load_test import percentile
+
+MODOS = ("sincrono", "cola")
+
+
+class SalidaLenta(io.TextIOBase):
+    """Text stream whose writes block for a fixed time and count lines."""
+    
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+        self.lineas = 0
+        self._lock = threading.Lock()
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, texto: str) -> int:
+        time.sleep(self.latencia)
+        with self._lock:
+            self.lineas += texto.count("\n")
+        return len(texto)
+
+
+def _resumen_ms(valores: list[float]) -> dict:
+    ordenados = sorted(valores)
+    return {
+        "p50_ms": round(percentile(ordenados, 50), 3),
+        "p99_ms": round(percentile(ordenados, 99), 3),
+        "max_ms": round(ordenados[-1], 3) if ordenados else 0.0
+    }
+
+
+async def _peticion(i: int, consultas: int, eager: bool, en_logs: list[float]) -> None:
+    app_logger = logging.getLogger("app.api.registros")
+    sql_logger = logging.getLogger("sqlalchemy.engine.Engine")
+    paciente, ruta = f"paciente-{i % 50}", "/api/v1/registros/"
+    
+    inicio = time.perf_counter()
+    if eager:
+        app_logger.info(f"GET {ruta} paciente={paciente}")
+    else:
+        app_logger.info("GET %s paciente=%s", ruta, paciente)
+    en_logs.append(time.perf_counter() - inicio)
+    
+    for q in range(consultas):
+        await asyncio.sleep(0)
+        inicio = time.perf_counter()
+        if eager:
+            sql_logger.info(f"SELECT registros.* FROM registros WHERE paciente_id = {paciente!r} LIMIT {q + 50}")
+        else:
+            sql_logger.info("SELECT registros.* FROM registros WHERE paciente_id = %r LIMIT %s", paciente, q + 50)
+        en_logs.append(time.perf_counter() - inicio)
+    
+    inicio = time.perf_counter()
+    if eager:
+        app_logger.info(f"200 {ruta} consultas={consultas}")
+    else:
+        app_logger.info("200 %s consultas=%s", ruta, consultas)
+    en_logs.append(time.perf_counter() - inicio)
+
+
+async def _medir(peticiones: int, concurrencia: int, consultas: int, eager: bool) -> dict:
+    en_logs: list[float] = []
+    retrasos: list[float] = []
+    parar = asyncio.Event()
+    
+    async def ticker():
+        while not parar.is_set():
+            antes = time.perf_counter()
+            await asyncio.sleep(0.001)
+            retrasos.append(max(0.0, (time.perf_counter() - antes - 0.001) * 1000))
+    
+    semaforo = asyncio.Semaphore(concurrencia)
+    
+    async def limitada(i: int):
+        async with semaforo:
+            await _peticion(i, consultas, eager, en_logs)
+    
+    tarea_ticker = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(limitada(i) for i in range(peticiones)))
+    duracion = time.perf_counter() - inicio
+    parar.set()
+    await tarea_ticker
+    
+    return {
+        "duracion_s": round(duracion, 3),
+        "peticiones_por_s": round(peticiones / duracion, 1),
+        "tiempo_en_logs_ms": round(sum(en_logs) * 1000, 1),
+        "llamada_log": _resumen_ms([t * 1000 for t in en_logs]),
+        "retraso_loop": _resumen_ms(retrasos)
+    }
+
+
+def run(peticiones: int, concurrencia: int, consultas: int, latencia_us: float, cola: int) -> dict:
+    raiz = logging.getLogger()
+    anteriores, nivel_anterior = raiz.handlers[:], raiz.level
+    settings = get_settings().model_copy(update={"debug": True, "log_cola": cola})
+    report = {
+        "config": {
+            "peticiones": peticiones,
+            "concurrencia": concurrencia,
+            "consultas_por_peticion": consultas,
+            "latencia_escritura_us": latencia_us,
+            "log_cola": cola,
+            "log_muestreo": settings.log_muestreo
+        },
+        "modos": {}
+    }
+    
+    detener_logging()
+    for modo in MODOS:
+        salida = SalidaLenta(latencia_us / 1_000_000)
+        for handler in raiz.handlers[:]:
+            raiz.removeHandler(handler)
+        if modo == "sincrono":
+            handler = logging.StreamHandler(salida)
+            handler.setFormatter(logging.Formatter(FORMATO_TEXTO))
+            raiz.addHandler(handler)
+            raiz.setLevel(logging.INFO)
+            logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+        else:
+            configurar_logging(settings, stream=salida)
+        
+        descartados = metricas.valor(METRICA_DESCARTADOS)
+        datos = asyncio.run(_medir(peticiones, concurrencia, consultas, eager=modo == "sincrono"))
+        # Wait for the listener to drain before counting what was written
+        detener_logging()
+        datos["registros_escritos"] = salida.lineas
+        datos["registros_descartados"] = int(metricas.valor(METRICA_DESCARTADOS) - descartados)
+        report["modos"][modo] = datos
+    
+    for handler in raiz.handlers[:]:
+        raiz.removeHandler(handler)
+    for handler in anteriores:
+        raiz.addHandler(handler)
+    raiz.setLevel(nivel_anterior)
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer logging pipeline benchmark")
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--consultas", type=int, default=5, help="SQL statements logged per request")
+    parser.add_argument("--latencia-escritura-us", type=float, default=200.0, help="Blocking time of each write")
+    parser.add_argument("--cola", type=int, default=10000, help="log_cola of the queue mode")
+    parser.add_argument("--output", default="logs_results.json")
+    args = parser.parse_args(argv)
+    
+    report = run(args.peticiones, args.concurrencia, args.consultas, args.latencia_escritura_us, args.cola)
+    
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True, ensure_ascii=False)
+        fh.write("\n")
+    
+    print(f"{'modo':<10}{'en logs ms':>12}{'lag p99/max ms':>20}{'pet/s':>10}{'escritos':>10}{'descartados':>13}")
+    for nombre, datos in report["modos"].items():
+        lag = datos["retraso_loop"]
+        print(
+            f"{nombre:<10}{datos['tiempo_en_logs_ms']:>12.1f}{lag['p99_ms']:>11.2f} / {lag['max_ms']:<6.2f}"
+            f"{datos['peticiones_por_s']:>10.1f}{datos['registros_escritos']:>10}{datos['registros_descartados']:>13}"
+        )
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
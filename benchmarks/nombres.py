@@ -0,0 +1,170 @@
+"""Fuzzy ejercicio name resolution.
+
+Builds a patient catalog of synthetic exercise names and resolves
+misspelt, accent-less and pluralised variants of them. It times three
+things:
+
+- the in-memory trigram index
+- a linear scan computing the similarity against every name, for
+  reference
+- ``EjercicioRepository.buscar_similar`` on a database (``pg_trgm`` when
+  given a PostgreSQL URL with the extension available)
+
+It also reports how many variants resolved to the intended ejercicio.
+
+Example::
+
+    python -m benchmarks.nombres --catalogo 500 --consultas 2000 --output nombres_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from app.core.config import get_settings
+from app.db.trigramas import create_trigram_index
+from app.models import Ejercicio
+from app.repositories import EjercicioRepository
+from app.services.nombres_service import IndiceTrigramas, similitud
+from benchmarks.load_test import percentile
+
+BASES = [
+    "Sentadilla", "Zancada", "Puente de Glúteo", "Press de Banca", "Remo", "Peso Muerto",
+    "Plancha", "Elevación de Talones", "Extensión de Cuádriceps", "Curl Femoral",
+    "Abducción de Cadera", "Rotación Externa", "Dominada", "Fondos", "Step Up"
+]
+VARIANTES = ["Búlgara", "con Barra", "con Mancuerna", "Unilateral", "en Polea", "Isométrica", "Excéntrica", "Lateral"]
+
+
+def catalogo(n: int, rng: random.Random) -> list[str]:
+    """``n`` distinct names combining base exercises, variants and a level."""
+    nombres = []
+    for base in BASES:
+        nombres.append(base)
+        for variante in VARIANTES:
+            nombres.append(f"{base} {variante}")
+    nivel = 1
+    while len(nombres) < n:
+        nombres.append(f"{rng.choice(BASES)} {rng.choice(VARIANTES)} Nivel {nivel}")
+        nivel += 1
+    return nombres[:n]
+
+
+def variante_escrita(nombre: str, rng: random.Random) -> str:
+    """How a patient might type ``nombre``: lowercase, no accents, a typo or a plural."""
+    texto = nombre.lower().translate(str.maketrans("áéíóú", "aeiou"))
+    cambio = rng.choice(["plural", "errata", "igual"])
+    if cambio == "plural":
+        return texto + "s"
+    if cambio == "errata" and len(texto) > 6:
+        i = rng.randrange(1, len(texto) - 1)
+        return texto[:i] + texto[i + 1:]
+    return texto
+
+
+def _resumen(tiempos: list[float]) -> dict:
+    ordenados = sorted(tiempos)
+    return {
+        "p50_us": round(statistics.median(ordenados) * 1e6, 1),
+        "p95_us": round(percentile(ordenados, 95) * 1e6, 1)
+    }
+
+
+def bench_memoria(nombres: list[str], consultas: list[tuple[int, str]], umbral: float) -> dict:
+    t0 = time.perf_counter()
+    indice = IndiceTrigramas()
+    for i, nombre in enumerate(nombres):
+        indice.add(i, nombre)
+    construccion_ms = (time.perf_counter() - t0) * 1000
+
+    tiempos, aciertos = [], 0
+    for esperado, consulta in consultas:
+        t0 = time.perf_counter()
+        mejor = indice.buscar(consulta, umbral)
+        tiempos.append(time.perf_counter() - t0)
+        aciertos += bool(mejor and mejor[0] == esperado)
+
+    lineal = []
+    for _, consulta in consultas[:200]:
+        t0 = time.perf_counter()
+        max(range(len(nombres)), key=lambda i: similitud(consulta, nombres[i]))
+        lineal.append(time.perf_counter() - t0)
+
+    return {
+        "construccion_ms": round(construccion_ms, 2),
+        "indice": _resumen(tiempos),
+        "busqueda_lineal": _resumen(lineal),
+        "aciertos": round(aciertos / len(consultas), 3)
+    }
+
+
+async def bench_repositorio(database_url: str, nombres: list[str], consultas: list[tuple[int, str]]) -> dict:
+    engine = create_async_engine(database_url, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+        pg_trgm = engine.dialect.name == "postgresql" and await conn.run_sync(create_trigram_index)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add_all(Ejercicio(nombre=n, categoria="General", paciente_id="bench") for n in nombres)
+        await session.commit()
+
+    tiempos, aciertos = [], 0
+    async with factory() as session:
+        repo = EjercicioRepository(session, "bench")
+        await repo.buscar_similar(nombres[0])  # Warm up (loads the in-memory index)
+        for esperado, consulta in consultas[:500]:
+            t0 = time.perf_counter()
+            ejercicio = await repo.buscar_similar(consulta)
+            tiempos.append(time.perf_counter() - t0)
+            aciertos += bool(ejercicio and ejercicio.nombre == nombres[esperado])
+    await engine.dispose()
+    return {
+        "backend": "pg_trgm" if pg_trgm else "memoria",
+        "buscar_similar": _resumen(tiempos),
+        "aciertos": round(aciertos / min(len(consultas), 500), 3)
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer fuzzy exercise name benchmark")
+    parser.add_argument("--catalogo", type=int, default=500, help="Ejercicios in the patient catalog")
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--database-url", default=None, help="Default: temporary SQLite file")
+    parser.add_argument("--output", default="nombres_results.json")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    nombres = catalogo(args.catalogo, rng)
+    consultas = []
+    for _ in range(args.consultas):
+        i = rng.randrange(len(nombres))
+        consultas.append((i, variante_escrita(nombres[i], rng)))
+    umbral = get_settings().ejercicio_similitud_minima
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'nombres.db')}"
+        report = {
+            "meta": {"catalogo": len(nombres), "consultas": len(consultas), "umbral": umbral},
+            "memoria": bench_memoria(nombres, consultas, umbral),
+            "repositorio": asyncio.run(bench_repositorio(database_url, nombres, consultas))
+        }
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
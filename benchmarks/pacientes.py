@@ -0,0 +1,152 @@
+"""Per-patient query cost at increasing clinic sizes.
+
+Seeds clinics of increasing size, keeping each patient's history the same
+size, and times the patient-scoped repository queries for a sample of
+patients. With patient-leading indexes (and optional hash partitioning on
+PostgreSQL) the latencies should stay flat as the clinic grows.
+
+Example::
+
+    python -m benchmarks.pacientes --pacientes 100 1000 10000 \\
+        --registros-por-paciente 100 --output pacientes_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from app.db.partitioning import create_hash_partitioned_registros
+from app.repositories import EjercicioRepository, EstadoEjercicioRepository, RegistroRepository
+from benchmarks.load_test import percentile
+from benchmarks.seed import seed_database
+
+QUERIES = {
+    "ejercicios.get_all": lambda s, p, e: EjercicioRepository(s, p).get_all(),
+    "registros.get_all": lambda s, p, e: RegistroRepository(s, p).get_all(limit=100),
+    "registros.get_recent_dolor": lambda s, p, e: RegistroRepository(s, p).get_recent_dolor(e),
+    "estado_ejercicios.get": lambda s, p, e: EstadoEjercicioRepository(s, p).get(e),
+    "registros.get_pending_dolor_24h": lambda s, p, e: RegistroRepository(s, p).get_pending_dolor_24h(),
+    "registros.get_monthly_data": lambda s, p, e: RegistroRepository(s, p).get_monthly_data(
+        datetime.utcnow().year, datetime.utcnow().month
+    ),
+}
+
+
+async def bench_scale(
+    database_url: str,
+    n_pacientes: int,
+    registros_por_paciente: int,
+    ejercicios_por_paciente: int,
+    muestra: int,
+    repeticiones: int,
+    hash_partitions: int,
+    seed: int
+) -> dict:
+    engine = create_async_engine(database_url, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        if engine.dialect.name == "postgresql" and hash_partitions > 0:
+            await conn.run_sync(create_hash_partitioned_registros, hash_partitions)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    t0 = time.perf_counter()
+    seeded = await seed_database(
+        engine,
+        n_registros=n_pacientes * registros_por_paciente,
+        n_ejercicios=n_pacientes * ejercicios_por_paciente,
+        n_pacientes=n_pacientes,
+        dias=180,
+        seed=seed
+    )
+    seed_seconds = time.perf_counter() - t0
+
+    rng = random.Random(seed)
+    ejercicios_de = {}
+    for ejercicio_id, paciente_id in zip(seeded.ejercicio_ids, seeded.ejercicio_pacientes):
+        ejercicios_de.setdefault(paciente_id, []).append(ejercicio_id)
+    pacientes = rng.sample(seeded.paciente_ids, min(muestra, n_pacientes))
+
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    tiempos = {nombre: [] for nombre in QUERIES}
+    for paciente_id in pacientes:
+        ejercicio_id = rng.choice(ejercicios_de[paciente_id])
+        for nombre, query in QUERIES.items():
+            for _ in range(repeticiones):
+                async with factory() as session:
+                    t0 = time.perf_counter()
+                    await query(session, paciente_id, ejercicio_id)
+                    tiempos[nombre].append(time.perf_counter() - t0)
+    await engine.dispose()
+
+    return {
+        "pacientes": n_pacientes,
+        "registros_totales": n_pacientes * registros_por_paciente,
+        "seed_seconds": round(seed_seconds, 2),
+        "queries": {
+            nombre: {
+                "p50_ms": round(statistics.median(valores) * 1000, 3),
+                "p95_ms": round(percentile(sorted(valores), 95) * 1000, 3)
+            }
+            for nombre, valores in tiempos.items()
+        }
+    }
+
+
+async def run(args) -> dict:
+    database_url = args.database_url
+    if database_url is None:
+        tmpdir = tempfile.mkdtemp(prefix="physiotrainer-pacientes-")
+        database_url = f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    escalas = []
+    for n in args.pacientes:
+        escalas.append(await bench_scale(
+            database_url, n, args.registros_por_paciente, args.ejercicios_por_paciente,
+            args.muestra, args.repeticiones, args.hash_partitions, args.seed
+        ))
+    return {
+        "meta": {
+            "database": database_url.split(":", 1)[0],
+            "registros_por_paciente": args.registros_por_paciente,
+            "ejercicios_por_paciente": args.ejercicios_por_paciente,
+            "hash_partitions": args.hash_partitions
+        },
+        "escalas": escalas
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer per-patient scaling benchmark")
+    parser.add_argument("--database-url", default=None,
+                        help="Async SQLAlchemy URL (tables are DROPPED; default: temporary SQLite file)")
+    parser.add_argument("--pacientes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--registros-por-paciente", type=int, default=100)
+    parser.add_argument("--ejercicios-por-paciente", type=int, default=5)
+    parser.add_argument("--muestra", type=int, default=50, help="Patients sampled per scale")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--hash-partitions", type=int, default=0, help="PostgreSQL only")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="pacientes_results.json")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    for escala in report["escalas"]:
+        print(f"pacientes={escala['pacientes']:>6} registros={escala['registros_totales']:>9}")
+        for nombre, stats in escala["queries"].items():
+            print(f"    {nombre:<36} p50={stats['p50_ms']:>8.3f}ms p95={stats['p95_ms']:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Minimal in-process Redis-protocol (RESP2) server.
+
+Supports the commands used by ``app.cache.RedisCache`` (GET, SET with
+EX/PX, DEL, INCR, PING, SELECT, AUTH, FLUSHDB) so the Redis backend can be
+tested and benchmarked without a Redis installation.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class RedisStandIn:
+    """Single-database RESP2 server bound to localhost."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._data: dict[bytes, tuple[Optional[float], bytes]] = {}
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> "RedisStandIn":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Closing the transports makes each handler see EOF and return
+            for writer in list(self._connections.values()):
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "RedisStandIn":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _dispatch(self, args: list[bytes]) -> bytes:
+        cmd = args[0].upper()
+        if cmd == b"PING":
+            return b"+PONG\r\n"
+        if cmd in (b"SELECT", b"AUTH"):
+            return b"+OK\r\n"
+        if cmd == b"FLUSHDB":
+            self._data.clear()
+            return b"+OK\r\n"
+        if cmd == b"GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if cmd == b"SET":
+            expires_at = None
+            if len(args) >= 5 and args[3].upper() in (b"PX", b"EX"):
+                scale = 1000 if args[3].upper() == b"PX" else 1
+                expires_at = time.monotonic() + int(args[4]) / scale
+            self._data[args[1]] = (expires_at, args[2])
+            return b"+OK\r\n"
+        if cmd == b"DEL":
+            borrados = sum(1 for key in args[1:] if self._data.pop(key, None) is not None)
+            return b":%d\r\n" % borrados
+        if cmd == b"INCR":
+            actual = self._get(args[1])
+            try:
+                value = int(actual or 0) + 1
+            except ValueError:
+                return b"-ERR value is not an integer or out of range\r\n"
+            entry = self._data.get(args[1])
+            self._data[args[1]] = (entry[0] if entry else None, str(value).encode())
+            return b":%d\r\n" % value
+        return b"-ERR unknown command '%s'\r\n" % cmd
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self._dispatch(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
@@ -0,0 +1,134 @@
+"""Synthetic history generator for benchmarks.
+
+Inserts ejercicios and registros with SQLAlchemy Core in large batches so a
+million-row history can be seeded in a reasonable time on both SQLite and
+PostgreSQL, then builds each ejercicio's rolling state.
+"""
+
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.models import Ejercicio, Registro
+from app.repositories import EstadoEjercicioRepository
+
+CATEGORIAS = ["Fuerza", "Movilidad", "Estabilidad", "Resistencia"]
+
+
+@dataclass
+class SeedResult:
+    """Identifiers of the seeded data, used to build realistic requests."""
+    ejercicio_ids: list[str] = field(default_factory=list)
+    ejercicio_nombres: list[str] = field(default_factory=list)
+    ejercicio_pacientes: list[str] = field(default_factory=list)
+    paciente_ids: list[str] = field(default_factory=list)
+    registro_id_min: int = 0
+    registro_id_max: int = 0
+    fecha_min: datetime = None
+    fecha_max: datetime = None
+
+
+async def seed_database(
+    engine: AsyncEngine,
+    n_registros: int = 100_000,
+    n_ejercicios: int = 500,
+    n_pacientes: int = 1,
+    dias: int = 730,
+    pending_ratio: float = 0.001,
+    batch_size: int = 10_000,
+    seed: int = 42
+) -> SeedResult:
+    """
+    Populate the database with a synthetic training history.
+    
+    Args:
+        engine: Async engine pointing at an initialised (empty) schema
+        n_registros: Number of registros to insert
+        n_ejercicios: Number of distinct ejercicios (spread round-robin over patients)
+        n_pacientes: Number of patients; with 1 everything belongs to the default patient
+        dias: Span of the history in days, ending now
+        pending_ratio: Fraction of registros left without dolor_24h
+        batch_size: Rows per INSERT batch
+        seed: Random seed for reproducible datasets
+        
+    Returns:
+        Identifiers of the seeded rows
+    """
+    rng = random.Random(seed)
+    ahora = datetime.utcnow()
+    inicio = ahora - timedelta(days=dias)
+    span_seconds = dias * 86400
+
+    result = SeedResult(fecha_min=inicio, fecha_max=ahora)
+    if n_pacientes == 1:
+        result.paciente_ids = [get_settings().default_paciente_id]
+    else:
+        result.paciente_ids = [f"paciente-{i:06d}" for i in range(n_pacientes)]
+    
+    ejercicios = []
+    for i in range(n_ejercicios):
+        ejercicio_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        nombre = f"Ejercicio {i:05d}"
+        paciente_id = result.paciente_ids[i % n_pacientes]
+        ejercicios.append({
+            "id": ejercicio_id,
+            "paciente_id": paciente_id,
+            "nombre": nombre,
+            "categoria": rng.choice(CATEGORIAS),
+            "umbral_dolor_max": 4,
+            "created_at": inicio,
+            "updated_at": inicio
+        })
+        result.ejercicio_ids.append(ejercicio_id)
+        result.ejercicio_nombres.append(nombre)
+        result.ejercicio_pacientes.append(paciente_id)
+
+    async with engine.begin() as conn:
+        for start in range(0, len(ejercicios), batch_size):
+            await conn.execute(insert(Ejercicio.__table__), ejercicios[start:start + batch_size])
+
+    remaining = n_registros
+    while remaining > 0:
+        rows = []
+        for _ in range(min(batch_size, remaining)):
+            fecha = inicio + timedelta(seconds=rng.randrange(span_seconds))
+            dolor_intra = min(10, int(rng.expovariate(0.5)))
+            pendiente = rng.random() < pending_ratio or fecha > ahora - timedelta(hours=24)
+            indice = rng.randrange(n_ejercicios)
+            rows.append({
+                "fecha": fecha,
+                "series": rng.randint(1, 5),
+                "reps": rng.randint(5, 15),
+                "peso": round(rng.uniform(0, 60) * 2) / 2,
+                "dolor_intra": dolor_intra,
+                "dolor_24h": None if pendiente else max(0, min(10, dolor_intra + rng.randint(-2, 2))),
+                "notas": None,
+                "ejercicio_id": result.ejercicio_ids[indice],
+                "paciente_id": result.ejercicio_pacientes[indice]
+            })
+        async with engine.begin() as conn:
+            await conn.execute(insert(Registro.__table__), rows)
+        remaining -= len(rows)
+
+    async with engine.connect() as conn:
+        row = (await conn.execute(select(func.min(Registro.id), func.max(Registro.id)))).one()
+        result.registro_id_min, result.registro_id_max = row[0] or 0, row[1] or 0
+
+    # Rows were inserted directly, so build the rolling state the app keeps
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    for start in range(0, n_ejercicios, batch_size):
+        async with factory() as session:
+            for ejercicio_id, paciente_id in zip(
+                result.ejercicio_ids[start:start + batch_size],
+                result.ejercicio_pacientes[start:start + batch_size]
+            ):
+                session.add(await EstadoEjercicioRepository(session, paciente_id).reconstruir(ejercicio_id))
+            await session.commit()
+
+    return result
@@ -0,0 +1,175 @@
+"""Serialization cost of the registro list endpoints.
+
+Measures the per-row cost of turning a 500-row page into a JSON body:
+
+- ``antes``: ORM objects -> ``RegistroResponse`` per row -> FastAPI's
+  ``response_model`` pipeline (dump, re-validate, encode) -> stdlib JSON
+- ``validado_una_vez``: row dicts validated once by ``response_model``
+- ``orjson``: row dicts serialised directly with ``ORJSONResponse``
+
+The serialisation stages call FastAPI's own ``serialize_response`` so they
+match what a request pays. The end-to-end section times
+``GET /registros/?limit=500`` on a seeded SQLite database with
+``fast_json_responses`` off and on.
+
+Example::
+
+    python -m benchmarks.serializacion --filas 500 --iteraciones 200 --output serializacion_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from app.core.config import get_settings
+from app.models import Ejercicio, Registro
+from app.schemas import RegistroResponse
+from benchmarks.bedrock_stub import make_stub_service
+from benchmarks.load_test import install_overrides, percentile
+from benchmarks.seed import seed_database
+
+CAMPO_RESPUESTA = create_response_field(name="Response_registros", type_=List[RegistroResponse])
+
+
+def filas_sinteticas(n: int) -> tuple[list[Registro], list[dict]]:
+    """The same page as ORM objects and as row dicts."""
+    ejercicio = Ejercicio(id="e1", paciente_id="default", nombre="Sentadilla Búlgara", categoria="Fuerza")
+    inicio = datetime(2025, 1, 1, 9, 30)
+    registros, filas = [], []
+    for i in range(n):
+        r = Registro(
+            id=i + 1, paciente_id="default", fecha=inicio + timedelta(hours=i, microseconds=i),
+            series=3, reps=10, peso=12.5, dolor_intra=i % 10,
+            dolor_24h=None if i % 7 else 2, notas=None if i % 3 else "Buena sesión",
+            ejercicio_id=ejercicio.id
+        )
+        r.ejercicio = ejercicio
+        registros.append(r)
+        filas.append({
+            "id": r.id, "fecha": r.fecha, "series": r.series, "reps": r.reps, "peso": r.peso,
+            "dolor_intra": r.dolor_intra, "dolor_24h": r.dolor_24h, "notas": r.notas,
+            "ejercicio_nombre": ejercicio.nombre, "volumen_total": r.series * r.reps * r.peso
+        })
+    return registros, filas
+
+
+async def antes(registros: list[Registro]) -> bytes:
+    contenido = [
+        RegistroResponse(
+            id=r.id, fecha=r.fecha, series=r.series, reps=r.reps, peso=r.peso,
+            dolor_intra=r.dolor_intra, dolor_24h=r.dolor_24h, notas=r.notas,
+            ejercicio_nombre=r.ejercicio.nombre, volumen_total=r.series * r.reps * r.peso
+        )
+        for r in registros
+    ]
+    return JSONResponse(await serialize_response(field=CAMPO_RESPUESTA, response_content=contenido)).body
+
+
+async def validado_una_vez(filas: list[dict]) -> bytes:
+    return JSONResponse(await serialize_response(field=CAMPO_RESPUESTA, response_content=filas)).body
+
+
+async def con_orjson(filas: list[dict]) -> bytes:
+    return ORJSONResponse(filas).body
+
+
+def _resumen(tiempos: list[float], filas: int) -> dict:
+    ordenados = sorted(tiempos)
+    return {
+        "p50_ms": round(statistics.median(ordenados) * 1000, 3),
+        "p95_ms": round(percentile(ordenados, 95) * 1000, 3),
+        "us_por_fila": round(statistics.median(ordenados) / filas * 1e6, 3)
+    }
+
+
+async def bench_serializacion(n_filas: int, iteraciones: int) -> dict:
+    registros, filas = filas_sinteticas(n_filas)
+    casos = {
+        "antes": lambda: antes(registros),
+        "validado_una_vez": lambda: validado_una_vez(filas),
+        "orjson": lambda: con_orjson(filas)
+    }
+    cuerpos = {nombre: json.loads(await caso()) for nombre, caso in casos.items()}
+    assert cuerpos["antes"] == cuerpos["validado_una_vez"] == cuerpos["orjson"]
+
+    resultados = {}
+    for nombre, caso in casos.items():
+        tiempos = []
+        for _ in range(iteraciones):
+            t0 = time.perf_counter()
+            await caso()
+            tiempos.append(time.perf_counter() - t0)
+        resultados[nombre] = _resumen(tiempos, n_filas)
+    return resultados
+
+
+async def bench_endpoint(database_url: str, n_filas: int, iteraciones: int) -> dict:
+    from app.main import app
+
+    engine = create_async_engine(database_url, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    await seed_database(engine, n_registros=max(n_filas * 4, 2000), n_ejercicios=20)
+
+    install_overrides(app, engine, make_stub_service(latency_ms=0))
+    settings = get_settings()
+    original = settings.fast_json_responses
+    resultados = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for nombre, rapido in (("validado_una_vez", False), ("orjson", True)):
+                settings.fast_json_responses = rapido
+                tiempos = []
+                for _ in range(iteraciones):
+                    t0 = time.perf_counter()
+                    response = await client.get("/api/v1/registros/", params={"limit": n_filas})
+                    tiempos.append(time.perf_counter() - t0)
+                    response.raise_for_status()
+                resultados[nombre] = _resumen(tiempos, n_filas)
+    finally:
+        settings.fast_json_responses = original
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    return resultados
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer list serialization benchmark")
+    parser.add_argument("--filas", type=int, default=500)
+    parser.add_argument("--iteraciones", type=int, default=200)
+    parser.add_argument("--database-url", default=None, help="Default: temporary SQLite file")
+    parser.add_argument("--output", default="serializacion_results.json")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'serializacion.db')}"
+        report = {
+            "meta": {"filas": args.filas, "iteraciones": args.iteraciones},
+            "serializacion": asyncio.run(bench_serializacion(args.filas, args.iteraciones)),
+            "endpoint": asyncio.run(bench_endpoint(database_url, args.filas, max(args.iteraciones // 4, 10)))
+        }
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
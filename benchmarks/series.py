@@ -0,0 +1,146 @@
+"""In-memory series store versus SQL for trends, statistics and load reports.
+
+Seeds one patient's history, loads it into the columnar store
+(``app.services.series_service``) and reports:
+
+- memory: bytes held by the arrays, per session and per million
+  sessions, and the peak Python allocation while loading (tracemalloc)
+- load time of the patient (one query)
+- p50/p95 of each read done through SQL and ORM rows (as before) and
+  through the store: the 30-session trend of an ejercicio, a one-month
+  range slice, the general statistics and the daily training load
+
+Example::
+    
+    python -m benchmarks.series --registros 1000000 --ejercicios 50 --output series_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from app.repositories import RegistroRepository
+from app.services.series_service import AlmacenSeries
+from benchmarks.load_test import percentile
+from benchmarks.seed import seed_database
+
+
+def _resumen(tiempos: list[float]) -> dict:
+    ordenados = sorted(tiempos)
+    return {
+        "p50_ms": round(statistics.median(ordenados) * 1000, 3),
+        "p95_ms": round(percentile(ordenados, 95) * 1000, 3)
+    }
+
+
+async def run(database_url: str, n_registros: int, n_ejercicios: int, repeticiones: int, seed: int) -> dict:
+    engine = create_async_engine(database_url, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    seeded = await seed_database(engine, n_registros=n_registros, n_ejercicios=n_ejercicios, seed=seed)
+    paciente_id = seeded.paciente_ids[0]
+    ejercicio_id = seeded.ejercicio_ids[0]
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    almacen = AlmacenSeries(refresco=3600)
+    try:
+        async with factory() as session:
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            paciente = await almacen.obtener(session, paciente_id)
+            carga_s = time.perf_counter() - t0
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            
+            serie = paciente.ejercicio(ejercicio_id)
+            fin = seeded.fecha_max
+            inicio = fin - timedelta(days=30)
+            repo = RegistroRepository(session, paciente_id)
+            
+            async def sql_tendencias():
+                registros = await repo.get_by_ejercicio(ejercicio_id, limit=30)
+                return [(r.fecha, r.series * r.reps * r.peso, r.dolor_intra, r.dolor_24h) for r in reversed(registros)]
+            
+            async def sql_estadisticas():
+                registros = await repo.get_all(limit=1000)
+                pendientes = await repo.get_pending_dolor_24h()
+                return len(registros), len(pendientes), sum(r.dolor_intra for r in registros) / len(registros)
+            
+            lecturas = {
+                "tendencias": (sql_tendencias, lambda: serie.tendencia(30)),
+                "rango_30_dias": (
+                    lambda: repo.get_monthly_data(inicio.year, inicio.month),
+                    lambda: serie.tendencia(10**9, inicio, fin)
+                ),
+                "estadisticas": (sql_estadisticas, paciente.estadisticas),
+                "carga_diaria": (lambda: repo.get_carga_diaria(ejercicio_id), serie.carga_diaria)
+            }
+            resultados = {}
+            for nombre, (sql, memoria) in lecturas.items():
+                tiempos_sql, tiempos_memoria = [], []
+                for _ in range(repeticiones):
+                    t0 = time.perf_counter()
+                    await sql()
+                    tiempos_sql.append(time.perf_counter() - t0)
+                    session.expunge_all()
+                    t0 = time.perf_counter()
+                    memoria()
+                    tiempos_memoria.append(time.perf_counter() - t0)
+                resultados[nombre] = {"sql": _resumen(tiempos_sql), "memoria": _resumen(tiempos_memoria)}
+    finally:
+        await engine.dispose()
+    
+    sesiones = paciente.total
+    return {
+        "meta": {
+            "registros": n_registros,
+            "ejercicios": n_ejercicios,
+            "sesiones_ejercicio": len(serie),
+            "repeticiones": repeticiones,
+            "database": engine.url.get_backend_name()
+        },
+        "memoria": {
+            "bytes": paciente.nbytes,
+            "bytes_por_sesion": round(paciente.nbytes / sesiones, 2),
+            "mb_por_millon": round(paciente.nbytes / sesiones * 1_000_000 / 2**20, 2),
+            "pico_carga_mb": round(pico / 2**20, 2),
+            "carga_s": round(carga_s, 3)
+        },
+        "lecturas": resultados
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer in-memory series store benchmark")
+    parser.add_argument("--database-url", default=None, help="Default: temporary SQLite file")
+    parser.add_argument("--registros", type=int, default=200_000)
+    parser.add_argument("--ejercicios", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="series_results.json")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'series.db')}"
+        report = asyncio.run(run(database_url, args.registros, args.ejercicios, args.repeticiones, args.seed))
+    
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Cold-start profiling: import time and time-to-first-/health.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter to
+get a reproducible import-time breakdown, then launches uvicorn with and
+without ``FAST_STARTUP`` and measures how long ``/health`` takes to answer.
+
+Example::
+
+    python -m benchmarks.startup --repeat 5 --budget-ms 1500 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Optional
+
+HEAVY_MODULES = ("boto3", "botocore", "pandas", "numpy", "pyarrow")
+
+
+def _env(**extra) -> dict:
+    env = dict(os.environ)
+    env.setdefault(
+        "DATABASE_URL",
+        f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='physiotrainer-startup-'), 'app.db')}"
+    )
+    env.setdefault("DEBUG", "false")
+    env.update(extra)
+    return env
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Parse ``-X importtime`` output into ``{module, depth, self_us, cumulative_us}`` rows."""
+    filas = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        partes = linea[len("import time:"):].split("|")
+        self_us, cumulative_us, nombre = int(partes[0]), int(partes[1]), partes[2]
+        depth = (len(nombre) - len(nombre.lstrip(" "))) // 2
+        filas.append({
+            "module": nombre.strip(),
+            "depth": depth,
+            "self_us": self_us,
+            "cumulative_us": cumulative_us
+        })
+    return filas
+
+
+def profile_imports(module: str = "app.main", repeat: int = 3, top: int = 15) -> dict:
+    """Import ``module`` in fresh interpreters and summarise where the time goes."""
+    totales = []
+    ultima: list[dict] = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env=_env(), check=True
+        )
+        ultima = parse_importtime(proc.stderr)
+        totales.append(next(f["cumulative_us"] for f in ultima if f["module"] == module))
+
+    cargados = {f["module"].split(".")[0] for f in ultima}
+    nivel_superior = [f for f in ultima if f["depth"] <= 1 and f["module"] != module]
+    return {
+        "module": module,
+        "total_ms_median": round(statistics.median(totales) / 1000, 1),
+        "total_ms_runs": [round(t / 1000, 1) for t in totales],
+        "heavy_modules_loaded": sorted(m for m in HEAVY_MODULES if m in cargados),
+        "top_cumulative": [
+            {"module": f["module"], "cumulative_ms": round(f["cumulative_us"] / 1000, 1)}
+            for f in sorted(nivel_superior, key=lambda f: f["cumulative_us"], reverse=True)[:top]
+        ]
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_health(fast_startup: bool, timeout: float = 60.0) -> Optional[float]:
+    """Seconds from process spawn until ``/health`` answers 200 (None on timeout)."""
+    port = _free_port()
+    env = _env(FAST_STARTUP="true" if fast_startup else "false")
+    inicio = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - inicio < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.01)
+        return None
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer cold-start profiling")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=2000.0,
+                        help="Startup budget for /health with FAST_STARTUP enabled")
+    parser.add_argument("--skip-server", action="store_true", help="Only profile imports")
+    parser.add_argument("--output", default="startup_results.json")
+    args = parser.parse_args(argv)
+
+    report = {"imports": profile_imports(repeat=args.repeat)}
+    if not args.skip_server:
+        for modo, fast in (("fast_startup", True), ("default", False)):
+            muestras = [time_to_health(fast) for _ in range(args.repeat)]
+            validas = [m for m in muestras if m is not None]
+            mediana = round(statistics.median(validas) * 1000, 1) if validas else None
+            report[modo] = {
+                "health_ms_median": mediana,
+                "health_ms_runs": [round(m * 1000, 1) if m is not None else None for m in muestras]
+            }
+        mediana = report["fast_startup"]["health_ms_median"]
+        report["budget_ms"] = args.budget_ms
+        report["within_budget"] = mediana is not None and mediana <= args.budget_ms
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Delta sync versus re-downloading the lists on every navigation.
+
+Seeds one patient's history, then simulates repeat page loads with a few
+writes between each one. It compares:
+
+- ``listas``: what the frontend fetched before on each navigation,
+  ``GET /ejercicios/`` + ``GET /registros/?limit=100`` +
+  ``GET /registros/pendientes``
+- ``sync``: ``GET /sync?since=<token>`` returning only the delta
+
+It reports response bytes and latency per load.
+
+Example::
+
+    python -m benchmarks.sync --registros 2000 --ejercicios 40 --cargas 50 --output sync_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from benchmarks.bedrock_stub import make_stub_service
+from benchmarks.load_test import install_overrides, percentile
+from benchmarks.seed import seed_database
+
+LISTAS = ["/api/v1/ejercicios/", "/api/v1/registros/?limit=100", "/api/v1/registros/pendientes"]
+
+
+def _resumen(bytes_por_carga: list[int], tiempos: list[float]) -> dict:
+    ordenados = sorted(tiempos)
+    return {
+        "bytes_por_carga": round(statistics.mean(bytes_por_carga)),
+        "p50_ms": round(statistics.median(ordenados) * 1000, 2),
+        "p95_ms": round(percentile(ordenados, 95) * 1000, 2)
+    }
+
+
+async def run(database_url: str, n_registros: int, n_ejercicios: int, cargas: int, escrituras: int) -> dict:
+    from app.main import app
+
+    engine = create_async_engine(database_url, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    seeded = await seed_database(engine, n_registros=n_registros, n_ejercicios=n_ejercicios, dias=365)
+    install_overrides(app, engine, make_stub_service(latency_ms=0))
+
+    medidas = {"listas": ([], []), "sync": ([], [])}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            # The snapshot comes in pages of `limit` registros
+            respuesta = await client.get("/api/v1/sync")
+            token = respuesta.json()["token"]
+            snapshot_bytes = len(respuesta.content)
+            while respuesta.json()["hay_mas"]:
+                respuesta = await client.get(
+                    "/api/v1/sync", params={"since": token, "cursor": respuesta.json()["cursor"]}
+                )
+                snapshot_bytes += len(respuesta.content)
+
+            for carga in range(cargas):
+                for i in range(escrituras):
+                    await client.post("/api/v1/registros/", json={
+                        "ejercicio_nombre": seeded.ejercicio_nombres[(carga + i) % len(seeded.ejercicio_nombres)],
+                        "series": 3, "reps": 10, "peso": 20, "dolor_intra": 2
+                    })
+
+                t0 = time.perf_counter()
+                respuestas = [await client.get(url) for url in LISTAS]
+                medidas["listas"][1].append(time.perf_counter() - t0)
+                medidas["listas"][0].append(sum(len(r.content) for r in respuestas))
+
+                t0 = time.perf_counter()
+                respuesta = await client.get("/api/v1/sync", params={"since": token})
+                medidas["sync"][1].append(time.perf_counter() - t0)
+                medidas["sync"][0].append(len(respuesta.content))
+                token = respuesta.json()["token"]
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    return {
+        "snapshot_inicial_bytes": snapshot_bytes,
+        **{nombre: _resumen(*valores) for nombre, valores in medidas.items()}
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="PhysioTrainer delta sync benchmark")
+    parser.add_argument("--registros", type=int, default=2000)
+    parser.add_argument("--ejercicios", type=int, default=40)
+    parser.add_argument("--cargas", type=int, default=50, help="Repeat page loads")
+    parser.add_argument("--escrituras", type=int, default=2, help="New registros between loads")
+    parser.add_argument("--database-url", default=None, help="Default: temporary SQLite file")
+    parser.add_argument("--output", default="sync_results.json")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'sync.db')}"
+        report = {
+            "meta": vars(args) | {"database_url": None},
+            "resultados": asyncio.run(run(
+                database_url, args.registros, args.ejercicios, args.cargas, args.escrituras
+            ))
+        }
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
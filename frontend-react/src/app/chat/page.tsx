@@ -176,7 +176,7 @@ function ChatMessage({ message }: { message: Message }) {
         <p className="whitespace-pre-wrap">{message.content}</p>
         
         {/* Show extracted data if available */}
-        {message.data?.registro_guardado && message.data.datos_extraidos && (
+        {message.data?.registro_guardado && message.data.ejercicios_extraidos.length > 0 && (
           <div className={cn(
             'mt-3 p-3 rounded-lg',
             isUser ? 'bg-primary-700' : 'bg-white'
@@ -184,29 +184,33 @@ function ChatMessage({ message }: { message: Message }) {
             <div className="flex items-center gap-2 mb-2">
               <Check className={cn('w-4 h-4', isUser ? 'text-green-300' : 'text-green-600')} />
               <span className={cn('text-sm font-medium', isUser ? 'text-white' : 'text-gray-900')}>
-                Registro guardado
+                {message.data.ejercicios_extraidos.length === 1
+                  ? 'Registro guardado'
+                  : `${message.data.ejercicios_extraidos.length} registros guardados`}
               </span>
             </div>
-            <div className="grid grid-cols-3 gap-2 text-sm">
-              <div>
-                <p className={cn('text-xs', isUser ? 'text-primary-200' : 'text-gray-500')}>Ejercicio</p>
-                <p className={cn('font-medium', isUser ? 'text-white' : 'text-gray-900')}>
-                  {message.data.datos_extraidos.ejercicio}
-                </p>
-              </div>
-              <div>
-                <p className={cn('text-xs', isUser ? 'text-primary-200' : 'text-gray-500')}>Series×Reps</p>
-                <p className={cn('font-medium', isUser ? 'text-white' : 'text-gray-900')}>
-                  {message.data.datos_extraidos.series}×{message.data.datos_extraidos.reps}
-                </p>
-              </div>
-              <div>
-                <p className={cn('text-xs', isUser ? 'text-primary-200' : 'text-gray-500')}>Peso</p>
-                <p className={cn('font-medium', isUser ? 'text-white' : 'text-gray-900')}>
-                  {message.data.datos_extraidos.peso}kg
-                </p>
+            {message.data.ejercicios_extraidos.map((datos, index) => (
+              <div key={index} className="grid grid-cols-3 gap-2 text-sm mt-1">
+                <div>
+                  <p className={cn('text-xs', isUser ? 'text-primary-200' : 'text-gray-500')}>Ejercicio</p>
+                  <p className={cn('font-medium', isUser ? 'text-white' : 'text-gray-900')}>
+                    {datos.ejercicio}
+                  </p>
+                </div>
+                <div>
+                  <p className={cn('text-xs', isUser ? 'text-primary-200' : 'text-gray-500')}>Series×Reps</p>
+                  <p className={cn('font-medium', isUser ? 'text-white' : 'text-gray-900')}>
+                    {datos.series}×{datos.reps}
+                  </p>
+                </div>
+                <div>
+                  <p className={cn('text-xs', isUser ? 'text-primary-200' : 'text-gray-500')}>Peso</p>
+                  <p className={cn('font-medium', isUser ? 'text-white' : 'text-gray-900')}>
+                    {datos.peso}kg
+                  </p>
+                </div>
               </div>
-            </div>
+            ))}
           </div>
         )}
 
@@ -214,9 +218,10 @@ function ChatMessage({ message }: { message: Message }) {
         {message.data?.recomendacion && (
           <div className={cn(
             'mt-3 p-3 rounded-lg border-l-4',
-            message.data.datos_extraidos?.dolorIntra !== undefined && message.data.datos_extraidos.dolorIntra <= 3
+            // Colour by the most painful exercise of the session
+            Math.max(...message.data.ejercicios_extraidos.map((d) => d.dolorIntra)) <= 3
               ? 'bg-green-50 border-green-500'
-              : message.data.datos_extraidos?.dolorIntra !== undefined && message.data.datos_extraidos.dolorIntra <= 5
+              : Math.max(...message.data.ejercicios_extraidos.map((d) => d.dolorIntra)) <= 5
               ? 'bg-yellow-50 border-yellow-500'
               : 'bg-red-50 border-red-500'
           )}>
@@ -224,7 +229,7 @@ function ChatMessage({ message }: { message: Message }) {
               <Sparkles className="w-4 h-4 text-primary-600" />
               <span className="text-sm font-medium text-gray-900">Recomendación IA</span>
             </div>
-            <p className="text-sm text-gray-700">{message.data.recomendacion}</p>
+            <p className="text-sm text-gray-700 whitespace-pre-wrap">{message.data.recomendacion}</p>
           </div>
         )}
       </div>
@@ -1,4 +1,6 @@
 const API_BASE_URL = process.env.API_BASE_URL || 'http://localhost:8000/api/v1';
+// Patient whose data this frontend shows; omitted = the API's default patient
+const PACIENTE_ID = process.env.PACIENTE_ID;
 
 export interface Ejercicio {
   id: string;
@@ -21,15 +23,18 @@ export interface Registro {
   volumen_total: number;
 }
 
+export interface EjercicioExtraido {
+  ejercicio: string;
+  series: number;
+  reps: number;
+  peso: number;
+  dolorIntra: number;
+}
+
 export interface ChatResponse {
   mensaje: string;
-  datos_extraidos: {
-    ejercicio: string;
-    series: number;
-    reps: number;
-    peso: number;
-    dolorIntra: number;
-  } | null;
+  datos_extraidos: EjercicioExtraido | null;
+  ejercicios_extraidos: EjercicioExtraido[];
   registro_guardado: boolean;
   recomendacion: string | null;
 }
@@ -56,12 +61,34 @@ export interface InformeMensual {
   tendencias: TendenciaData[];
 }
 
+export interface SyncResponse {
+  token: number;
+  completo: boolean;
+  hay_mas: boolean;
+  cursor: number | null;
+  ejercicios: Ejercicio[];
+  registros: Registro[];
+}
+
+// API timestamps are naive UTC
+const parseFecha = (fecha: string): number =>
+  Date.parse(/(?:[zZ]|[+-]\d\d:\d\d)$/.test(fecha) ? fecha : `${fecha}Z`);
+
 class ApiService {
+  // Local copy of the patient's data, kept current with /sync deltas
+  private ejercicios = new Map<string, Ejercicio>();
+  private registros = new Map<number, Registro>();
+  private syncToken: number | null = null;
+  // Next page of a snapshot still being downloaded
+  private syncCursor: number | null = null;
+  private syncEnCurso: Promise<void> | null = null;
+
   private async fetch<T>(endpoint: string, options?: RequestInit): Promise<T> {
     const response = await fetch(`${API_BASE_URL}${endpoint}`, {
       ...options,
       headers: {
         'Content-Type': 'application/json',
+        ...(PACIENTE_ID ? { 'X-Paciente-Id': PACIENTE_ID } : {}),
         ...options?.headers,
       },
     });
@@ -73,6 +100,42 @@ class ApiService {
     return response.json();
   }
 
+  // Sync: the first call downloads a snapshot (in pages), later ones only what changed
+  private sincronizar(): Promise<void> {
+    if (!this.syncEnCurso) {
+      this.syncEnCurso = this.aplicarCambios().finally(() => {
+        this.syncEnCurso = null;
+      });
+    }
+    return this.syncEnCurso;
+  }
+
+  private async aplicarCambios(): Promise<void> {
+    let hayMas = true;
+    while (hayMas) {
+      const params = new URLSearchParams();
+      if (this.syncToken !== null) params.set('since', String(this.syncToken));
+      if (this.syncCursor !== null) params.set('cursor', String(this.syncCursor));
+      const query = params.toString();
+      const delta = await this.fetch<SyncResponse>(`/sync${query ? `?${query}` : ''}`);
+      if (delta.completo) {
+        this.ejercicios.clear();
+        this.registros.clear();
+      }
+      delta.ejercicios.forEach((e) => this.ejercicios.set(e.id, e));
+      delta.registros.forEach((r) => this.registros.set(r.id, r));
+      this.syncToken = delta.token;
+      this.syncCursor = delta.cursor;
+      hayMas = delta.hay_mas;
+    }
+  }
+
+  private registrosRecientes(): Registro[] {
+    return Array.from(this.registros.values()).sort(
+      (a, b) => parseFecha(b.fecha) - parseFecha(a.fecha)
+    );
+  }
+
   // Chat
   async sendChatMessage(mensaje: string): Promise<ChatResponse> {
     return this.fetch<ChatResponse>('/chat/', {
@@ -83,7 +146,8 @@ class ApiService {
 
   // Ejercicios
   async getEjercicios(): Promise<Ejercicio[]> {
-    return this.fetch<Ejercicio[]>('/ejercicios/');
+    await this.sincronizar();
+    return Array.from(this.ejercicios.values());
   }
 
   async createEjercicio(data: Omit<Ejercicio, 'id' | 'created_at'>): Promise<Ejercicio> {
@@ -95,11 +159,17 @@ class ApiService {
 
   // Registros
   async getRegistros(limit = 100, offset = 0): Promise<Registro[]> {
-    return this.fetch<Registro[]>(`/registros/?limit=${limit}&offset=${offset}`);
+    await this.sincronizar();
+    return this.registrosRecientes().slice(offset, offset + limit);
   }
 
   async getRegistrosPendientes(): Promise<Registro[]> {
-    return this.fetch<Registro[]>('/registros/pendientes');
+    await this.sincronizar();
+    const ahora = Date.now();
+    const dia = 24 * 60 * 60 * 1000;
+    return this.registrosRecientes().filter((r) => {
+      return r.dolor_24h === null && ahora - parseFecha(r.fecha) > dia;
+    });
   }
 
   async getRegistrosByEjercicio(ejercicioId: string, limit = 50): Promise<Registro[]> {
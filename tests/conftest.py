@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 import pytest
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
@@ -5,7 +6,16 @@ from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
 
 from app.main import app
-from app.db import get_session
+from app.cache import MemoryCache, get_cache
+from app.core.config import get_settings
+from app.services import get_series
+from app.repositories import get_indices_nombres
+from app.db import (
+    get_session,
+    get_read_session,
+    get_session_factory,
+    get_read_session_factory
+)
 
 # Test database URL (SQLite in memory for tests)
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -22,6 +32,8 @@ async def test_engine():
     
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+    # Name indexes are cached per patient across sessions
+    get_indices_nombres().reset()
     
     yield engine
     
@@ -45,13 +57,27 @@ async def test_session(test_engine):
 
 
 @pytest.fixture
-async def client(test_session):
+async def client(test_session, monkeypatch):
     """Create test client with overridden dependencies."""
+    # Every test request comes from the same address; admission control has its own tests
+    monkeypatch.setattr(get_settings(), "admission_control", False)
     
     async def override_get_session():
         yield test_session
+        await test_session.commit()
+    
+    @asynccontextmanager
+    async def override_session_factory():
+        yield test_session
     
     app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_read_session] = override_get_session
+    app.dependency_overrides[get_session_factory] = lambda: override_session_factory
+    app.dependency_overrides[get_read_session_factory] = lambda: override_session_factory
+    cache = MemoryCache()
+    app.dependency_overrides[get_cache] = lambda: cache
+    # Every test starts from an empty database
+    get_series().reset()
     
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as client:
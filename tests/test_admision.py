@@ -0,0 +1,85 @@
+"""Tests for admission control."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.admission import (
+    AdmissionMiddleware,
+    ControlAdmision,
+    LimitadorConcurrencia,
+    reset_control_admision
+)
+from app.core.config import Settings, get_settings
+
+
+def test_cubo_cobra_mas_a_las_rutas_de_ia():
+    control = ControlAdmision(Settings(admission_tasa=1.0, admission_rafaga=12.0, admission_coste_ia=10.0))
+    assert control.clase("/api/v1/chat/") == "ia"
+    assert control.clase("/api/v1/registros/") == "crud"
+    assert control.clase("/health") is None
+    
+    assert control.consumir("a", 10.0) == 0.0
+    assert control.consumir("a", 1.0) == 0.0
+    # 1 token left: the next AI request needs 9 more, earned at 1 token/s
+    assert control.consumir("a", 10.0) == pytest.approx(9.0, abs=0.01)
+    # Other clients have their own bucket
+    assert control.consumir("b", 10.0) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_limitador_encola_y_rechaza():
+    limitador = LimitadorConcurrencia(capacidad=1, cola=1, espera_max=0.5)
+    assert await limitador.entrar()
+    
+    en_cola = asyncio.create_task(limitador.entrar())
+    await asyncio.sleep(0)
+    # Queue full: shed right away
+    assert not await limitador.entrar()
+    
+    limitador.salir()
+    assert await en_cola
+    assert limitador.activos == 1
+    limitador.salir()
+    assert limitador.activos == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_responde_429_con_retry_after(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "admission_control", True)
+    monkeypatch.setattr(settings, "admission_tasa", 0.5)
+    monkeypatch.setattr(settings, "admission_rafaga", 2.0)
+    monkeypatch.setattr(settings, "admission_coste_crud", 1.0)
+    monkeypatch.setattr(settings, "admission_coste_ia", 2.0)
+    reset_control_admision()
+    
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+    
+    @app.get("/api/v1/registros/")
+    async def registros():
+        return []
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+    
+    try:
+        transport = ASGITransport(app=app, client=("10.0.0.1", 1000))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            codigos = [(await client.get("/api/v1/registros/")).status_code for _ in range(3)]
+            assert codigos == [200, 200, 429]
+            rechazada = await client.get("/api/v1/registros/")
+            assert rechazada.status_code == 429
+            assert int(rechazada.headers["Retry-After"]) >= 1
+            # Outside /api/ nothing is limited
+            assert (await client.get("/health")).status_code == 200
+        
+        otro = ASGITransport(app=app, client=("10.0.0.2", 1000))
+        async with AsyncClient(transport=otro, base_url="http://test") as client:
+            assert (await client.get("/api/v1/registros/")).status_code == 200
+    finally:
+        reset_control_admision()
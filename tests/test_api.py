@@ -1,3 +1,4 @@
+import json
 import pytest
 from httpx import AsyncClient
 
@@ -111,3 +112,305 @@ async def test_get_estadisticas(client: AsyncClient):
     data = response.json()
     assert "total_registros" in data
     assert "pendientes_dolor_24h" in data
+
+
+@pytest.mark.asyncio
+async def test_export_registros_csv(client: AsyncClient):
+    """Test streaming export of registros as CSV."""
+    for dolor in (1, 2):
+        await client.post(
+            "/api/v1/registros/",
+            json={
+                "ejercicio_nombre": "Puente Glúteo",
+                "series": 3,
+                "reps": 15,
+                "peso": 0,
+                "dolor_intra": dolor
+            }
+        )
+    
+    response = await client.get("/api/v1/registros/export?format=csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lineas = response.text.strip().splitlines()
+    assert lineas[0].startswith("id,fecha,ejercicio_id,ejercicio_nombre")
+    assert len(lineas) == 3
+
+
+@pytest.mark.asyncio
+async def test_export_registros_ndjson_filtra_por_ejercicio(client: AsyncClient):
+    """Test NDJSON export filtered by ejercicio."""
+    creado = await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Plancha", "series": 3, "reps": 1, "peso": 0, "dolor_intra": 0}
+    )
+    await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Remo", "series": 3, "reps": 12, "peso": 20, "dolor_intra": 1}
+    )
+    
+    registro = await client.get(f"/api/v1/registros/{creado.json()['id']}")
+    assert registro.status_code == 200
+    
+    ejercicios = (await client.get("/api/v1/ejercicios/")).json()
+    plancha_id = next(e["id"] for e in ejercicios if e["nombre"] == "Plancha")
+    
+    response = await client.get(f"/api/v1/registros/export?format=ndjson&ejercicio_id={plancha_id}")
+    assert response.status_code == 200
+    filas = [json.loads(linea) for linea in response.text.strip().splitlines()]
+    assert len(filas) == 1
+    assert filas[0]["ejercicio_nombre"] == "Plancha"
+
+
+@pytest.mark.asyncio
+async def test_estadisticas_invalidated_on_write(client: AsyncClient):
+    """Test cached statistics are refreshed after a new registro."""
+    antes = (await client.get("/api/v1/informes/estadisticas")).json()
+    await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Sentadilla", "series": 3, "reps": 10, "peso": 20, "dolor_intra": 4}
+    )
+    despues = (await client.get("/api/v1/informes/estadisticas")).json()
+    assert despues["total_registros"] == antes["total_registros"] + 1
+    assert despues["promedio_dolor_intra"] == 4
+
+
+def test_get_routes_use_read_session():
+    """GET routes must read through the replica-aware dependency."""
+    from fastapi.routing import APIRoute
+    from app.main import app
+    from app.db import get_session
+    
+    def dependencias(dependant):
+        for dep in dependant.dependencies:
+            yield dep.call
+            yield from dependencias(dep)
+    
+    for route in app.routes:
+        if isinstance(route, APIRoute) and "GET" in route.methods:
+            assert get_session not in set(dependencias(route.dependant)), route.path
+
+
+@pytest.mark.asyncio
+async def test_registros_aislados_por_paciente(client: AsyncClient):
+    """Test each patient only sees their own ejercicios and registros."""
+    for paciente in ("ana", "luis"):
+        response = await client.post(
+            "/api/v1/registros/",
+            json={"ejercicio_nombre": "Sentadilla", "series": 3, "reps": 10, "peso": 20, "dolor_intra": 2},
+            headers={"X-Paciente-Id": paciente}
+        )
+        assert response.status_code == 201
+    
+    registros_ana = (await client.get("/api/v1/registros/", headers={"X-Paciente-Id": "ana"})).json()
+    assert len(registros_ana) == 1
+    
+    ejercicios_luis = (await client.get("/api/v1/ejercicios/", headers={"X-Paciente-Id": "luis"})).json()
+    assert [e["nombre"] for e in ejercicios_luis] == ["Sentadilla"]
+    
+    otro = await client.get(f"/api/v1/registros/{registros_ana[0]['id']}", headers={"X-Paciente-Id": "luis"})
+    assert otro.status_code == 404
+    
+    sin_datos = (await client.get("/api/v1/registros/", headers={"X-Paciente-Id": "marta"})).json()
+    assert sin_datos == []
+
+
+@pytest.mark.asyncio
+async def test_paciente_id_invalido(client: AsyncClient):
+    """Test malformed patient identifiers are rejected."""
+    response = await client.get("/api/v1/ejercicios/", headers={"X-Paciente-Id": "no valido!"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_estado_ejercicio_actualizado_en_cada_escritura(client: AsyncClient, test_session):
+    """The rolling state follows every registro insert and 24h update."""
+    from app.repositories import EjercicioRepository, EstadoEjercicioRepository
+    
+    for dolor in [1, 2, 3, 4, 5, 6, 7]:
+        response = await client.post(
+            "/api/v1/registros/",
+            json={"ejercicio_nombre": "Remo", "series": 3, "reps": 10, "peso": 20.0, "dolor_intra": dolor}
+        )
+    ultimo = response.json()
+    await client.patch(f"/api/v1/registros/{ultimo['id']}/dolor-24h", json={"dolor_24h": 4})
+    
+    ejercicio = await EjercicioRepository(test_session).get_by_nombre("Remo")
+    estado = await EstadoEjercicioRepository(test_session).get(ejercicio.id)
+    assert estado.dolores_recientes == [7, 6, 5, 4, 3, 2, 1]
+    assert estado.total_sesiones == 7
+    assert estado.ultimo_registro_id == ultimo["id"]
+    assert estado.ultimo_dolor_24h == 4
+    assert estado.ultimo_dolor_24h_registro_id == ultimo["id"]
+
+
+@pytest.mark.asyncio
+async def test_informe_carga(client: AsyncClient):
+    """Test training-load report for an ejercicio."""
+    creado = await client.post(
+        "/api/v1/ejercicios/",
+        json={"nombre": "Peso Muerto", "categoria": "Fuerza"}
+    )
+    ejercicio_id = creado.json()["id"]
+    for peso in [20.0, 25.0]:
+        await client.post(
+            "/api/v1/registros/",
+            json={"ejercicio_nombre": "Peso Muerto", "series": 3, "reps": 10, "peso": peso, "dolor_intra": 1}
+        )
+    
+    response = await client.get(f"/api/v1/informes/carga/{ejercicio_id}")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_sesiones"] == 2
+    assert data["carga_aguda"] == 1350
+    assert data["acwr"] is None  # Less than 28 days of history
+    assert data["semanas"][-1]["carga"] == 1350
+    
+    response = await client.get("/api/v1/informes/carga/inexistente")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_listados_rapidos_mismo_json(client: AsyncClient, monkeypatch):
+    """The orjson fast path returns the same payload as the validated path."""
+    from app.core.config import get_settings
+    
+    for peso in [12.5, 15.0]:
+        await client.post(
+            "/api/v1/registros/",
+            json={"ejercicio_nombre": "Zancada", "series": 3, "reps": 12, "peso": peso, "dolor_intra": 2}
+        )
+    
+    normal = await client.get("/api/v1/registros/")
+    monkeypatch.setattr(get_settings(), "fast_json_responses", True)
+    rapido = await client.get("/api/v1/registros/")
+    
+    assert rapido.status_code == 200
+    assert rapido.json() == normal.json()
+    assert rapido.json()[0]["volumen_total"] == 540.0
+    assert rapido.json()[0]["ejercicio_nombre"] == "Zancada"
+
+
+@pytest.mark.asyncio
+async def test_chat_sesion_con_varios_ejercicios(client: AsyncClient):
+    """A multi-exercise message is saved at once with two Bedrock calls."""
+    from app.main import app
+    from app.services import BedrockService, get_bedrock_service
+    from benchmarks.bedrock_stub import StubBedrockClient
+    
+    stub = StubBedrockClient(
+        latency_ms=0, jitter_ms=0, seed=1,
+        ejercicios=["Sentadilla Búlgara", "Puente de Glúteo", "Plancha"],
+        ejercicios_por_mensaje=3
+    )
+    app.dependency_overrides[get_bedrock_service] = lambda: BedrockService(client=stub)
+    await client.post("/api/v1/ejercicios/", json={"nombre": "plancha", "categoria": "Core"})
+    
+    response = await client.post(
+        "/api/v1/chat/",
+        json={"mensaje": "búlgaras 3x10 12kg d2, puente glúteo 3x15 d1, plancha 3x30s"}
+    )
+    data = response.json()
+    assert data["registro_guardado"] is True
+    assert len(data["ejercicios_extraidos"]) == 3
+    assert data["recomendacion"]
+    assert stub.calls == 2
+    
+    registros = (await client.get("/api/v1/registros/")).json()
+    assert len(registros) == 3
+    ejercicios = (await client.get("/api/v1/ejercicios/")).json()
+    assert sorted(e["nombre"] for e in ejercicios) == ["Puente de Glúteo", "Sentadilla Búlgara", "plancha"]
+
+
+@pytest.mark.asyncio
+async def test_sync_devuelve_solo_cambios(client: AsyncClient):
+    """/sync returns a full snapshot first, then only what changed since the token."""
+    creado = await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Remo", "series": 3, "reps": 10, "peso": 20, "dolor_intra": 1}
+    )
+    await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Plancha", "series": 3, "reps": 1, "peso": 0, "dolor_intra": 0}
+    )
+    
+    completo = (await client.get("/api/v1/sync")).json()
+    assert completo["completo"] is True
+    assert len(completo["ejercicios"]) == 2
+    assert len(completo["registros"]) == 2
+    
+    sin_cambios = (await client.get(f"/api/v1/sync?since={completo['token']}")).json()
+    assert sin_cambios["completo"] is False
+    assert sin_cambios["ejercicios"] == [] and sin_cambios["registros"] == []
+    assert sin_cambios["token"] == completo["token"]
+    
+    registro_id = creado.json()["id"]
+    await client.patch(f"/api/v1/registros/{registro_id}/dolor-24h", json={"dolor_24h": 3})
+    await client.patch(f"/api/v1/registros/{registro_id}/dolor-24h", json={"dolor_24h": 2})
+    await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Zancada", "series": 3, "reps": 12, "peso": 10, "dolor_intra": 2}
+    )
+    
+    delta = (await client.get(f"/api/v1/sync?since={completo['token']}")).json()
+    assert [e["nombre"] for e in delta["ejercicios"]] == ["Zancada"]
+    assert [r["id"] for r in delta["registros"]] == [registro_id, registro_id + 2]
+    assert delta["registros"][0]["dolor_24h"] == 2
+    assert delta["token"] > completo["token"]
+    
+    pagina = (await client.get(f"/api/v1/sync?since={completo['token']}&limit=1")).json()
+    assert pagina["hay_mas"] is True
+    assert [r["id"] for r in pagina["registros"]] == [registro_id]
+    
+    otro = (await client.get(f"/api/v1/sync?since={completo['token']}", headers={"X-Paciente-Id": "luis"})).json()
+    assert otro["completo"] is True and otro["registros"] == []
+
+
+@pytest.mark.asyncio
+async def test_contador_de_cambios_reservado_al_confirmar(test_session):
+    """Change-log numbers are taken at commit, after the state locks, once per transaction."""
+    from app.repositories import CambioRepository, EjercicioRepository, RegistroRepository
+    from app.schemas import RegistroCreate
+    
+    datos = RegistroCreate(ejercicio_nombre="Remo", series=3, reps=10, peso=20, dolor_intra=1)
+    ejercicios = await EjercicioRepository(test_session).get_or_create_many(["Remo", "Plancha"])
+    await RegistroRepository(test_session).create_many([(datos, e.id) for e in ejercicios.values()])
+    cambios = CambioRepository(test_session)
+    assert await cambios.ultimo() == 0
+    await test_session.commit()
+    assert await cambios.ultimo() == 4
+    
+    remo_id = ejercicios["Remo"].id
+    await RegistroRepository(test_session).create(datos, remo_id)
+    await test_session.rollback()
+    await RegistroRepository(test_session).create(datos, remo_id)
+    await test_session.commit()
+    assert await cambios.ultimo() == 5
+
+
+@pytest.mark.asyncio
+async def test_sync_instantanea_por_paginas(client: AsyncClient):
+    """The snapshot is paged by registro ID under the token of its first page."""
+    for peso in (10, 12, 14):
+        await client.post(
+            "/api/v1/registros/",
+            json={"ejercicio_nombre": "Remo", "series": 3, "reps": 10, "peso": peso, "dolor_intra": 1}
+        )
+    
+    primera = (await client.get("/api/v1/sync?limit=2")).json()
+    assert (primera["completo"], primera["hay_mas"]) == (True, True)
+    assert len(primera["ejercicios"]) == 1 and len(primera["registros"]) == 2
+    
+    # Written while the snapshot is being downloaded
+    await client.patch(f"/api/v1/registros/{primera['registros'][0]['id']}/dolor-24h", json={"dolor_24h": 2})
+    
+    segunda = (await client.get(
+        f"/api/v1/sync?since={primera['token']}&cursor={primera['cursor']}&limit=2"
+    )).json()
+    assert (segunda["completo"], segunda["hay_mas"], segunda["cursor"]) == (False, False, None)
+    assert segunda["token"] == primera["token"]
+    assert segunda["ejercicios"] == []
+    assert [r["id"] for r in segunda["registros"]] == [primera["registros"][-1]["id"] + 1]
+    
+    delta = (await client.get(f"/api/v1/sync?since={segunda['token']}")).json()
+    assert [(r["id"], r["dolor_24h"]) for r in delta["registros"]] == [(primera["registros"][0]["id"], 2)]
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.metrics import metricas
+from app.services.bedrock_regiones import METRICA_COBERTURAS, EstimadorRetraso
+from app.services.bedrock_service import BedrockService, PROMPT_SISTEMA_EXTRACCION
+from benchmarks.bedrock_stub import StubBedrockClient
+
+
+class TestBuildBody:
+    """Tests for the Bedrock request layout."""
+    
+    def test_system_estatico_separado_del_mensaje(self):
+        service = BedrockService(client=StubBedrockClient(latency_ms=0, jitter_ms=0))
+        body = service.build_body('Mensaje del usuario: "búlgaras 3x10"', system=PROMPT_SISTEMA_EXTRACCION)
+        assert body["system"] == PROMPT_SISTEMA_EXTRACCION
+        assert body["messages"] == [{"role": "user", "content": 'Mensaje del usuario: "búlgaras 3x10"'}]
+
+
+class TestCoberturaRegiones:
+    """Tests for calls hedged across regions."""
+    
+    @staticmethod
+    def _servicio(primaria: StubBedrockClient, secundaria: StubBedrockClient, monkeypatch) -> BedrockService:
+        monkeypatch.setattr(get_settings(), "bedrock_hedge_retraso_inicial", 0.05)
+        return BedrockService(clientes={"us-east-1": primaria, "us-west-2": secundaria})
+    
+    @pytest.mark.asyncio
+    async def test_region_lenta_cubierta_por_otra(self, monkeypatch):
+        primaria = StubBedrockClient(latency_ms=0, jitter_ms=0, spike_rate=1.0, spike_ms=1000)
+        secundaria = StubBedrockClient(latency_ms=0, jitter_ms=0)
+        service = self._servicio(primaria, secundaria, monkeypatch)
+        ganadas = metricas.valor(METRICA_COBERTURAS, ganadora="cobertura")
+        
+        inicio = time.perf_counter()
+        ejercicios = await service.extraer_ejercicios("búlgaras 3x10 12kg d2")
+        assert time.perf_counter() - inicio < 0.5
+        assert ejercicios[0].ejercicio == "Sentadilla Búlgara"
+        assert primaria.calls == secundaria.calls == 1
+        assert metricas.valor(METRICA_COBERTURAS, ganadora="cobertura") == ganadas + 1
+    
+    @pytest.mark.asyncio
+    async def test_region_rapida_sin_cobertura(self, monkeypatch):
+        primaria = StubBedrockClient(latency_ms=0, jitter_ms=0)
+        secundaria = StubBedrockClient(latency_ms=0, jitter_ms=0)
+        service = self._servicio(primaria, secundaria, monkeypatch)
+        
+        assert await service.extraer_ejercicios("búlgaras 3x10 12kg d2")
+        assert (primaria.calls, secundaria.calls) == (1, 0)
+    
+    @pytest.mark.asyncio
+    async def test_error_en_la_primaria_pasa_a_otra_region(self, monkeypatch):
+        primaria = StubBedrockClient(latency_ms=0, jitter_ms=0, error_rate=1.0)
+        secundaria = StubBedrockClient(latency_ms=0, jitter_ms=0)
+        service = self._servicio(primaria, secundaria, monkeypatch)
+        
+        assert await service.extraer_ejercicios("búlgaras 3x10 12kg d2")
+        assert primaria.errors == secundaria.calls == 1
+    
+    def test_retraso_es_el_percentil_de_las_latencias(self):
+        estimador = EstimadorRetraso(percentil=90, inicial=2.0)
+        for i in range(10):
+            estimador.registrar(i / 10)
+        assert estimador.retraso() == 2.0
+        for i in range(10, 100):
+            estimador.registrar(i / 10)
+        assert estimador.retraso() == 9.0
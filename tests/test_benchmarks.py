@@ -0,0 +1,45 @@
+"""Smoke tests for the benchmark suite (tiny datasets only)."""
+import pytest
+
+from benchmarks.load_test import run_load_test, percentile, SCENARIOS
+
+
+def test_percentile_interpolates():
+    valores = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(valores, 0) == 1.0
+    assert percentile(valores, 50) == 2.5
+    assert percentile(valores, 100) == 4.0
+    assert percentile([], 99) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_load_test_covers_every_endpoint(tmp_path):
+    report = await run_load_test(
+        database_url=f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}",
+        n_registros=200,
+        n_ejercicios=5,
+        requests_per_endpoint=2,
+        concurrency=2,
+        bedrock_latency_ms=1,
+        bedrock_jitter_ms=0
+    )
+    assert set(report["endpoints"]) == {s.name for s in SCENARIOS}
+    for stats in report["endpoints"].values():
+        assert stats["requests"] == 2
+        assert stats["errors"] == 0
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert report["bedrock_stub"]["calls"] > 0
+
+
+def test_parse_importtime():
+    from benchmarks.startup import parse_importtime
+    salida = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     _io\n"
+        "import time:      3000 |       5000 |   fastapi\n"
+        "import time:       200 |       5200 | app.main\n"
+    )
+    filas = parse_importtime(salida)
+    assert [f["module"] for f in filas] == ["_io", "fastapi", "app.main"]
+    assert filas[1] == {"module": "fastapi", "depth": 1, "self_us": 3000, "cumulative_us": 5000}
+    assert filas[2]["depth"] == 0
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.cache import MemoryCache, SQLiteCache, RedisCache
+from app.cache.cache import PickleSerializer
+from benchmarks.redis_standin import RedisStandIn
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+async def cache(request, tmp_path):
+    """Yield each cache backend in turn."""
+    if request.param == "memory":
+        backend = MemoryCache(max_entries=100)
+        yield backend
+    elif request.param == "sqlite":
+        backend = SQLiteCache(str(tmp_path / "cache.db"))
+        yield backend
+        await backend.close()
+    else:
+        async with RedisStandIn() as server:
+            backend = RedisCache(server.url)
+            yield backend
+            await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_set_get_delete(cache):
+    assert await cache.get("informes", "a") is None
+    await cache.set("informes", "a", {"total": 3, "lista": [1, 2]})
+    assert await cache.get("informes", "a") == {"total": 3, "lista": [1, 2]}
+    await cache.delete("informes", "a")
+    assert await cache.get("informes", "a") is None
+
+
+@pytest.mark.asyncio
+async def test_ttl_expira(cache):
+    await cache.set("informes", "corto", 1, ttl=0.05)
+    assert await cache.get("informes", "corto") == 1
+    await asyncio.sleep(0.1)
+    assert await cache.get("informes", "corto") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_namespace(cache):
+    await cache.set("informes", "a", 1)
+    await cache.set("extraccion", "a", 2)
+    await cache.invalidate("informes")
+    assert await cache.get("informes", "a") is None
+    assert await cache.get("extraccion", "a") == 2
+
+
+@pytest.mark.asyncio
+async def test_get_or_set(cache):
+    llamadas = []
+
+    async def factory():
+        llamadas.append(1)
+        return "valor"
+
+    assert await cache.get_or_set("ns", "k", factory) == "valor"
+    assert await cache.get_or_set("ns", "k", factory) == "valor"
+    assert len(llamadas) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_invalidado_mientras_calcula(cache):
+    # A write commits and invalidates while the value is being computed from the old data
+    async def factory():
+        await cache.invalidate("ns")
+        return "antiguo"
+
+    assert await cache.get_or_set("ns", "k", factory) == "antiguo"
+    assert await cache.get("ns", "k") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_lru_eviction():
+    cache = MemoryCache(max_entries=2, serializer=PickleSerializer())
+    await cache.set("ns", "a", 1)
+    await cache.set("ns", "b", 2)
+    await cache.get("ns", "a")
+    await cache.set("ns", "c", 3)
+    assert await cache.get("ns", "a") == 1
+    assert await cache.get("ns", "b") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.db")
+    worker_a, worker_b = SQLiteCache(path), SQLiteCache(path)
+    await worker_a.set("informes", "estadisticas", {"total": 1})
+    assert await worker_b.get("informes", "estadisticas") == {"total": 1}
+    await worker_b.invalidate("informes")
+    assert await worker_a.get("informes", "estadisticas") is None
+    await worker_a.close()
+    await worker_b.close()
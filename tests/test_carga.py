@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from app.services.carga_service import calcular_metricas_carga
+
+
+class TestCalcularMetricasCarga:
+    """Tests for calcular_metricas_carga function."""
+    
+    def test_sin_historial(self):
+        assert calcular_metricas_carga([], hasta=date(2025, 3, 30)) is None
+    
+    def test_carga_constante(self):
+        hasta = date(2025, 3, 30)  # Sunday
+        filas = [(hasta - timedelta(days=i), 1, 100.0) for i in range(56)]
+        metricas = calcular_metricas_carga(filas, hasta=hasta)
+        assert metricas["carga_aguda"] == 700
+        assert metricas["carga_cronica"] == 700
+        assert metricas["acwr"] == 1
+        semana = metricas["semanas"][-1]
+        assert semana["semana"] == date(2025, 3, 24)
+        assert semana["carga"] == 700
+        # No day-to-day variation: monotony is undefined
+        assert semana["monotonia"] is None
+    
+    def test_dias_sin_sesion_cuentan_como_cero(self):
+        hasta = date(2025, 3, 30)
+        filas = [(hasta - timedelta(days=i), 1, 100.0) for i in range(7, 35)]
+        metricas = calcular_metricas_carga(filas, hasta=hasta, semanas=2)
+        assert metricas["carga_aguda"] == 0
+        assert metricas["acwr"] == 0
+        assert [s["sesiones"] for s in metricas["semanas"]] == [7, 0]
@@ -0,0 +1,87 @@
+"""Tests for request deadlines."""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.config import Settings
+from app.core.deadline import METRICA_PLAZO_AGOTADO, DeadlineMiddleware, plazo, resolver_plazo
+from app.core.metrics import metricas
+from app.services import BedrockService
+from benchmarks.bedrock_stub import StubBedrockClient
+
+
+def test_resolver_plazo_por_ruta_y_cabecera():
+    settings = Settings(
+        request_deadline=10.0,
+        request_deadlines={"/api/v1/chat": 25.0, "/api/v1/registros/export": 0.0},
+        request_deadline_max=60.0
+    )
+    assert resolver_plazo("/api/v1/ejercicios/", None, settings) == ("*", 10.0)
+    assert resolver_plazo("/api/v1/chat/", None, settings) == ("/api/v1/chat", 25.0)
+    assert resolver_plazo("/api/v1/registros/export", None, settings) == ("/api/v1/registros/export", 0.0)
+    assert resolver_plazo("/api/v1/chat/", "1500", settings) == ("/api/v1/chat", 1.5)
+    # Capped at request_deadline_max; invalid values keep the route default
+    assert resolver_plazo("/api/v1/chat/", "600000", settings) == ("/api/v1/chat", 60.0)
+    assert resolver_plazo("/api/v1/chat/", "pronto", settings) == ("/api/v1/chat", 25.0)
+
+
+@pytest.mark.asyncio
+async def test_middleware_responde_504_al_agotar_el_plazo():
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+    
+    @app.get("/lento")
+    async def lento():
+        await asyncio.sleep(5)
+        return {"ok": True}
+    
+    antes = metricas.valor(METRICA_PLAZO_AGOTADO, ruta="*", etapa="request")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        inicio = time.perf_counter()
+        response = await client.get("/lento", headers={"X-Request-Deadline-Ms": "100"})
+    
+    assert response.status_code == 504
+    assert time.perf_counter() - inicio < 1
+    assert metricas.valor(METRICA_PLAZO_AGOTADO, ruta="*", etapa="request") == antes + 1
+
+
+@pytest.mark.asyncio
+async def test_recomendacion_degradada_antes_del_plazo():
+    """A slow Bedrock call is abandoned in time for the deterministic fallback."""
+    service = BedrockService(client=StubBedrockClient(latency_ms=1000, jitter_ms=0))
+    
+    antes = metricas.valor(METRICA_PLAZO_AGOTADO, ruta="*", etapa="bedrock")
+    with plazo(0.5):
+        inicio = time.perf_counter()
+        recomendacion = await service.generar_recomendacion("Remo", 2, [1, 2], 600.0)
+        transcurrido = time.perf_counter() - inicio
+    
+    assert recomendacion == service._recomendacion_fallback(2)
+    assert transcurrido < 0.5
+    assert metricas.valor(METRICA_PLAZO_AGOTADO, ruta="*", etapa="bedrock") == antes + 1
+
+
+@pytest.mark.asyncio
+async def test_chat_con_plazo_agotado(client: AsyncClient):
+    """The chat answers right away when extraction cannot finish before the deadline."""
+    from app.main import app
+    from app.services import get_bedrock_service
+    
+    stub = StubBedrockClient(latency_ms=800, jitter_ms=0)
+    app.dependency_overrides[get_bedrock_service] = lambda: BedrockService(client=stub)
+    
+    response = await client.post(
+        "/api/v1/chat/",
+        json={"mensaje": "búlgaras 3x10 12kg d2"},
+        headers={"X-Request-Deadline-Ms": "400"}
+    )
+    assert response.status_code == 200
+    assert response.json()["registro_guardado"] is False
+    assert response.json()["mensaje"].startswith("⏱️")
+    
+    exportado = (await client.get("/metrics")).text
+    assert 'physiotrainer_deadline_exceeded_total{etapa="bedrock",ruta="/api/v1/chat"}' in exportado
@@ -0,0 +1,180 @@
+"""Tests for Idempotency-Key handling on the retried POSTs."""
+
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from app.api.idempotencia import HEADER_REPLAYED
+from app.core.config import Settings, get_settings
+from app.db import get_read_session, get_read_session_factory, get_session, get_session_factory
+from app.db.lectura import crear_fabrica_lectura
+from app.db.sqlite import create_sqlite_engines
+from app.main import app
+from app.models import ClaveIdempotencia
+from app.services import BedrockService, get_bedrock_service
+from benchmarks.bedrock_stub import StubBedrockClient
+
+REGISTRO = {"ejercicio_nombre": "Sentadilla", "series": 3, "reps": 10, "peso": 20.0, "dolor_intra": 2}
+
+
+@pytest.mark.asyncio
+async def test_registro_repetido_devuelve_la_primera_respuesta(client: AsyncClient):
+    cabeceras = {"Idempotency-Key": "registro-1"}
+    primera = await client.post("/api/v1/registros/", json=REGISTRO, headers=cabeceras)
+    assert primera.status_code == 201
+    assert HEADER_REPLAYED not in primera.headers
+    
+    repetida = await client.post("/api/v1/registros/", json=REGISTRO, headers=cabeceras)
+    assert repetida.status_code == 201
+    assert repetida.headers[HEADER_REPLAYED] == "true"
+    assert repetida.json() == primera.json()
+    assert len((await client.get("/api/v1/registros/")).json()) == 1
+    
+    # Same key, different request
+    otra = await client.post("/api/v1/registros/", json={**REGISTRO, "peso": 25.0}, headers=cabeceras)
+    assert otra.status_code == 422
+    # Keys belong to one patient
+    ajena = await client.post(
+        "/api/v1/registros/", json=REGISTRO, headers={**cabeceras, "X-Paciente-Id": "luis"}
+    )
+    assert ajena.status_code == 201
+    assert HEADER_REPLAYED not in ajena.headers
+    
+    invalida = await client.post("/api/v1/registros/", json=REGISTRO, headers={"Idempotency-Key": "x" * 256})
+    assert invalida.status_code == 400
+    sin_clave = await client.post("/api/v1/registros/", json=REGISTRO)
+    assert sin_clave.status_code == 201
+    assert len((await client.get("/api/v1/registros/")).json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_repetido_no_vuelve_a_llamar_a_bedrock(client: AsyncClient):
+    stub = StubBedrockClient(latency_ms=0, jitter_ms=0, seed=1)
+    app.dependency_overrides[get_bedrock_service] = lambda: BedrockService(client=stub)
+    mensaje = {"mensaje": "Hoy búlgaras 3x10 con 12kg, dolor 2"}
+    cabeceras = {"Idempotency-Key": "chat-1"}
+    
+    primera = await client.post("/api/v1/chat/", json=mensaje, headers=cabeceras)
+    assert primera.json()["recomendacion"]
+    assert stub.calls == 2
+    
+    repetida = await client.post("/api/v1/chat/", json=mensaje, headers=cabeceras)
+    assert repetida.headers[HEADER_REPLAYED] == "true"
+    assert repetida.json() == primera.json()
+    assert stub.calls == 2
+    assert len((await client.get("/api/v1/registros/")).json()) == 1
+    
+    # The async mode replays the 202 with its Location
+    asincrona = {"Idempotency-Key": "chat-2", "Prefer": "respond-async"}
+    aceptada = await client.post("/api/v1/chat/", json=mensaje, headers=asincrona)
+    repetida = await client.post("/api/v1/chat/", json=mensaje, headers=asincrona)
+    assert aceptada.status_code == repetida.status_code == 202
+    assert repetida.headers["Location"] == aceptada.headers["Location"]
+    assert repetida.json()["job_id"] == aceptada.json()["job_id"]
+
+
+@pytest.mark.asyncio
+async def test_reintento_en_curso_espera_la_respuesta(tmp_path, monkeypatch):
+    """A retry sent while the first request waits on Bedrock gets its response, not a second run."""
+    monkeypatch.setattr(get_settings(), "admission_control", False)
+    monkeypatch.setattr(get_settings(), "idempotency_sondeo", 0.01)
+    settings = Settings(database_url=f"sqlite+aiosqlite:///{tmp_path / 'physio.db'}", debug=False)
+    engine, read_engine = create_sqlite_engines(settings)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    escritura = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    lectura = crear_fabrica_lectura(read_engine)
+    
+    async def override_get_session():
+        async with escritura() as session:
+            yield session
+            await session.commit()
+    
+    async def override_get_read_session():
+        async with lectura() as session:
+            yield session
+    
+    stub = StubBedrockClient(latency_ms=150, jitter_ms=0, seed=1)
+    app.dependency_overrides.update({
+        get_session: override_get_session,
+        get_read_session: override_get_read_session,
+        get_session_factory: lambda: escritura,
+        get_read_session_factory: lambda: lectura,
+        get_bedrock_service: lambda: BedrockService(client=stub)
+    })
+    mensaje = {"mensaje": "Hoy búlgaras 3x10 con 12kg, dolor 2"}
+    cabeceras = {"Idempotency-Key": "chat-lento"}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            primera = asyncio.create_task(client.post("/api/v1/chat/", json=mensaje, headers=cabeceras))
+            await asyncio.sleep(0.05)
+            repetida = await client.post("/api/v1/chat/", json=mensaje, headers=cabeceras)
+            primera = await primera
+            
+            assert repetida.headers[HEADER_REPLAYED] == "true"
+            assert repetida.json() == primera.json()
+            assert primera.json()["recomendacion"]
+            assert stub.calls == 2
+            assert len((await client.get("/api/v1/registros/")).json()) == 1
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+        await read_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reintento_consulta_la_primaria(tmp_path, monkeypatch):
+    """A retry waiting on the key polls the primary, not a replica that lags behind it."""
+    monkeypatch.setattr(get_settings(), "admission_control", False)
+    monkeypatch.setattr(get_settings(), "idempotency_sondeo", 0.01)
+    monkeypatch.setattr(get_settings(), "idempotency_bloqueo", 2.0)
+    primaria = Settings(database_url=f"sqlite+aiosqlite:///{tmp_path / 'primaria.db'}", debug=False)
+    replica = Settings(database_url=f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", debug=False)
+    engine, _ = create_sqlite_engines(primaria)
+    replica_engine, _ = create_sqlite_engines(replica)
+    for motor in (engine, replica_engine):
+        async with motor.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+    escritura = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    lectura = crear_fabrica_lectura(replica_engine)
+    
+    async def override_get_session():
+        async with escritura() as session:
+            yield session
+            await session.commit()
+    
+    stub = StubBedrockClient(latency_ms=150, jitter_ms=0, seed=1)
+    app.dependency_overrides.update({
+        get_session: override_get_session,
+        get_session_factory: lambda: escritura,
+        get_read_session_factory: lambda: lectura,
+        get_bedrock_service: lambda: BedrockService(client=stub)
+    })
+    mensaje = {"mensaje": "Hoy búlgaras 3x10 con 12kg, dolor 2"}
+    cabeceras = {"Idempotency-Key": "chat-replica"}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            primera = asyncio.create_task(client.post("/api/v1/chat/", json=mensaje, headers=cabeceras))
+            await asyncio.sleep(0.05)
+            # The replica stopped replicating while the key was in flight
+            async with escritura() as session:
+                clave = await session.get(ClaveIdempotencia, ("default", "chat-replica"))
+            async with replica_engine.begin() as conn:
+                await conn.execute(insert(ClaveIdempotencia).values(**clave.model_dump()))
+            repetida = await asyncio.wait_for(
+                client.post("/api/v1/chat/", json=mensaje, headers=cabeceras), timeout=1.5
+            )
+            primera = await primera
+            
+            assert repetida.headers[HEADER_REPLAYED] == "true"
+            assert repetida.json() == primera.json()
+            assert stub.calls == 2
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+        await replica_engine.dispose()
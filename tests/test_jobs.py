@@ -0,0 +1,189 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, update
+
+from app.jobs import HANDLERS, JobWorkerPool, enqueue
+from app.models import Job
+from app.repositories import JobRepository
+from app.services import BedrockService
+from benchmarks.bedrock_stub import StubBedrockClient
+
+
+def _pool(session, **kwargs) -> JobWorkerPool:
+    """Worker pool on the test session, answering with the stub Bedrock client."""
+    @asynccontextmanager
+    async def factory():
+        yield session
+    
+    stub = StubBedrockClient(latency_ms=0, jitter_ms=0, seed=1, ejercicios=["Sentadilla"])
+    return JobWorkerPool(factory, bedrock_factory=lambda: BedrockService(client=stub), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_chat_asincrono_y_polling(client: AsyncClient, test_session):
+    """With Prefer: respond-async the recommendation is a job polled at /jobs/{id}."""
+    from app.main import app
+    from app.services import get_bedrock_service
+    
+    stub = StubBedrockClient(latency_ms=0, jitter_ms=0, seed=1, ejercicios=["Sentadilla"])
+    app.dependency_overrides[get_bedrock_service] = lambda: BedrockService(client=stub)
+    
+    response = await client.post(
+        "/api/v1/chat/",
+        json={"mensaje": "sentadilla 3x10 20kg dolor 2"},
+        headers={"Prefer": "respond-async"}
+    )
+    assert response.status_code == 202
+    data = response.json()
+    assert data["registro_guardado"] is True
+    assert data["recomendacion"] is None
+    assert response.headers["location"] == f"/api/v1/jobs/{data['job_id']}"
+    assert stub.calls == 1  # Extraction only
+    
+    job = (await client.get(f"/api/v1/jobs/{data['job_id']}")).json()
+    assert job["estado"] == "pendiente"
+    
+    pool = _pool(test_session)
+    # Next-session prescription, then the recommendation
+    assert await pool.procesar_siguiente() is True
+    assert await pool.procesar_siguiente() is True
+    assert await pool.procesar_siguiente() is False
+    
+    job = (await client.get(f"/api/v1/jobs/{data['job_id']}")).json()
+    assert job["estado"] == "completado"
+    assert job["intentos"] == 1
+    assert job["resultado"]["recomendacion"]
+    
+    otro = await client.get(f"/api/v1/jobs/{data['job_id']}", headers={"X-Paciente-Id": "luis"})
+    assert otro.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_informe_mensual_asincrono(client: AsyncClient, test_session):
+    """The monthly report job stores the same report the synchronous route returns."""
+    from datetime import datetime
+    
+    await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Remo", "series": 3, "reps": 10, "peso": 20, "dolor_intra": 1}
+    )
+    hoy = datetime.utcnow()
+    response = await client.get(
+        f"/api/v1/informes/mensual/{hoy.year}/{hoy.month}",
+        headers={"Prefer": "respond-async, wait=5"}
+    )
+    assert response.status_code == 202
+    
+    pool = _pool(test_session)
+    while await pool.procesar_siguiente():
+        pass
+    
+    job = (await client.get(response.headers["location"])).json()
+    assert job["estado"] == "completado"
+    assert job["resultado"]["periodo"] == f"{hoy.month:02d}/{hoy.year}"
+    assert job["resultado"]["total_sesiones"] == 1
+
+
+@pytest.mark.asyncio
+async def test_job_reintentado_hasta_max_intentos(test_session, monkeypatch):
+    """A failing job is retried and then failed for good."""
+    async def falla(contexto, payload):
+        raise RuntimeError("Bedrock no disponible")
+    
+    monkeypatch.setitem(HANDLERS, "prueba", falla)
+    job = await enqueue(test_session, "ana", "prueba", {})
+    job.max_intentos = 2
+    await test_session.commit()
+    
+    pool = _pool(test_session, retry_backoff=0)
+    assert await pool.procesar_siguiente() is True
+    await test_session.refresh(job)
+    assert (job.estado, job.intentos, job.error) == ("pendiente", 1, "Bedrock no disponible")
+    
+    assert await pool.procesar_siguiente() is True
+    await test_session.refresh(job)
+    assert (job.estado, job.intentos) == ("fallido", 2)
+    assert await pool.procesar_siguiente() is False
+
+
+@pytest.mark.asyncio
+async def test_siguiente_sesion_precalculada(client: AsyncClient, test_session):
+    """The next-session prescription is stored by a job and follows the 24h response."""
+    creado = (await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Peso muerto", "series": 3, "reps": 8, "peso": 40, "dolor_intra": 2}
+    )).json()
+    ejercicios = (await client.get("/api/v1/ejercicios/")).json()
+    ejercicio_id = next(e["id"] for e in ejercicios if e["nombre"] == "Peso muerto")
+    url = f"/api/v1/ejercicios/{ejercicio_id}/siguiente-sesion"
+    assert (await client.get(url)).status_code == 404
+    
+    pool = _pool(test_session)
+    assert await pool.procesar_siguiente() is True
+    prescripcion = (await client.get(url)).json()
+    assert (prescripcion["estado"], prescripcion["peso"], prescripcion["reps"]) == ("verde", 43, 8)
+    assert prescripcion["registro_id"] == creado["id"]
+    assert prescripcion["pendiente_24h"] is True
+    
+    # Pain rose overnight: hold the load instead of progressing
+    await client.patch(f"/api/v1/registros/{creado['id']}/dolor-24h", json={"dolor_24h": 3})
+    assert await pool.procesar_siguiente() is True
+    prescripcion = (await client.get(url)).json()
+    assert (prescripcion["estado"], prescripcion["peso"]) == ("amarillo", 40)
+    assert prescripcion["respuesta_24h"] == "respuesta_aceptable"
+    assert prescripcion["pendiente_24h"] is False
+    
+    otro = await client.get(url, headers={"X-Paciente-Id": "luis"})
+    assert otro.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_handler_cancelado_antes_de_caducar_la_reserva(test_session, monkeypatch):
+    """A slow handler is cancelled with time left to record the attempt before its claim expires."""
+    async def lento(contexto, payload):
+        await asyncio.sleep(5)
+    
+    monkeypatch.setitem(HANDLERS, "prueba", lento)
+    job = await enqueue(test_session, "ana", "prueba", {})
+    await test_session.commit()
+    
+    pool = _pool(test_session, visibility_timeout=0.3, visibility_margin=0.2, retry_backoff=0)
+    inicio = time.monotonic()
+    assert await pool.procesar_siguiente() is True
+    assert time.monotonic() - inicio < 0.3
+    await test_session.refresh(job)
+    assert (job.estado, job.intentos, job.error) == ("pendiente", 1, "TimeoutError")
+    
+    with pytest.raises(ValueError):
+        _pool(test_session, visibility_timeout=10, visibility_margin=10)
+
+
+@pytest.mark.asyncio
+async def test_purga_jobs_terminados(test_session, monkeypatch):
+    """Finished jobs past their retention are deleted; pending ones are kept."""
+    async def ok(contexto, payload):
+        return payload
+    
+    monkeypatch.setitem(HANDLERS, "prueba", ok)
+    terminado = await enqueue(test_session, "ana", "prueba", {"n": 1})
+    await test_session.commit()
+    assert await _pool(test_session).procesar_siguiente() is True
+    pendiente = await enqueue(test_session, "ana", "prueba", {"n": 2})
+    await test_session.commit()
+    
+    repo = JobRepository(test_session)
+    assert await repo.purgar(retencion=3600) == 0
+    await test_session.execute(
+        update(Job).values(updated_at=datetime.utcnow() - timedelta(hours=2))
+    )
+    assert await repo.purgar(retencion=3600) == 1
+    await test_session.commit()
+    
+    ids = (await test_session.execute(select(Job.id))).scalars().all()
+    assert ids == [pendiente.id]
+    assert terminado.id not in ids
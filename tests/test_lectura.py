@@ -0,0 +1,69 @@
+"""Tests for the read-only sessions of GET routes."""
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel, select
+
+import app.db.database as database
+from app.core.config import Settings
+from app.core.metrics import metricas
+from app.db import get_read_session
+from app.db.lectura import METRICA_CONEXION, crear_fabrica_lectura
+from app.db.sqlite import create_sqlite_engines
+from app.models import Ejercicio
+from app.repositories import EjercicioRepository
+
+
+@pytest.fixture
+async def engines(tmp_path):
+    settings = Settings(database_url=f"sqlite+aiosqlite:///{tmp_path / 'physio.db'}", debug=False)
+    engine, read_engine = create_sqlite_engines(settings)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        await EjercicioRepository(session, "ana").get_or_create("Sentadilla")
+        await session.commit()
+    yield engine, read_engine
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sesion_lectura_devuelve_la_conexion_tras_cada_consulta(engines):
+    _, read_engine = engines
+    pool = read_engine.sync_engine.pool
+    
+    async with crear_fabrica_lectura(read_engine)() as session:
+        assert pool.checkedout() == 0
+        ejercicios = (await session.execute(select(Ejercicio))).scalars().all()
+        assert pool.checkedout() == 0
+        assert not session.in_transaction()
+        # Loaded objects outlive the connection
+        assert ejercicios[0].nombre == "Sentadilla"
+        
+        assert (await session.get(Ejercicio, ejercicios[0].id)) is ejercicios[0]
+        assert await session.scalar(select(Ejercicio.nombre)) == "Sentadilla"
+        assert pool.checkedout() == 0
+        assert session.tiempo_conexion > 0
+
+
+@pytest.mark.asyncio
+async def test_get_read_session_registra_tiempo_de_conexion(engines, monkeypatch):
+    _, read_engine = engines
+    monkeypatch.setattr(database, "async_lectura_session", crear_fabrica_lectura(read_engine))
+    app = FastAPI()
+    
+    @app.get("/ejercicios/{nombre}")
+    async def ver(nombre: str, session: AsyncSession = Depends(get_read_session)):
+        ejercicio = await EjercicioRepository(session, "ana").get_by_nombre(nombre)
+        # Released before the route returns
+        assert read_engine.sync_engine.pool.checkedout() == 0
+        return {"id": ejercicio.id}
+    
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/ejercicios/Sentadilla")).status_code == 200
+    
+    assert f'{METRICA_CONEXION}_count{{ruta="/ejercicios/{{nombre}}"}}' in metricas.exportar()
@@ -0,0 +1,97 @@
+"""Tests for the queue-based structured logging."""
+
+import json
+import logging
+import queue
+import sys
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.logs import (
+    HEADER_REQUEST_ID,
+    METRICA_DESCARTADOS,
+    ColaLogs,
+    FiltroMuestreo,
+    FormateadorJSON,
+    RequestIdMiddleware,
+    request_id_actual
+)
+from app.core.metrics import metricas
+
+
+def _record(nombre: str, nivel: int, mensaje: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord(nombre, nivel, __file__, 1, mensaje, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_formateador_json_incluye_request_id_y_extras():
+    handler = ColaLogs(queue.Queue())
+    token = request_id_actual.set("abc123")
+    try:
+        handler.handle(_record("app.test", logging.INFO, "paciente=%s", "ana", duracion_ms=12))
+    finally:
+        request_id_actual.reset(token)
+    
+    linea = FormateadorJSON().format(handler.queue.get_nowait())
+    datos = json.loads(linea)
+    assert datos["message"] == "paciente=ana"
+    assert datos["level"] == "INFO"
+    assert datos["logger"] == "app.test"
+    assert datos["request_id"] == "abc123"
+    assert datos["duracion_ms"] == 12
+
+
+def test_cola_congela_argumentos_y_excepcion():
+    handler = ColaLogs(queue.Queue())
+    datos = {"series": 3}
+    handler.handle(_record("app.test", logging.INFO, "datos=%s", datos))
+    datos["series"] = 4
+    try:
+        raise ValueError("fallo")
+    except ValueError:
+        record = _record("app.test", logging.ERROR, "error")
+        record.exc_info = sys.exc_info()
+        handler.handle(record)
+    
+    primero, segundo = handler.queue.get_nowait(), handler.queue.get_nowait()
+    assert (primero.msg, primero.args) == ("datos={'series': 3}", None)
+    assert segundo.exc_info is None
+    assert "ValueError: fallo" in json.loads(FormateadorJSON().format(segundo))["exc_info"]
+
+
+def test_muestreo_y_cola_llena():
+    filtro = FiltroMuestreo({"sqlalchemy.engine": 0.0})
+    assert not filtro.filter(_record("sqlalchemy.engine.Engine", logging.INFO, "SELECT 1"))
+    assert filtro.filter(_record("sqlalchemy.engine.Engine", logging.WARNING, "lento"))
+    assert filtro.filter(_record("sqlalchemy.pool", logging.INFO, "checkout"))
+    
+    handler = ColaLogs(queue.Queue(1))
+    antes = metricas.valor(METRICA_DESCARTADOS)
+    for _ in range(3):
+        handler.handle(_record("app.test", logging.INFO, "x"))
+    assert handler.queue.qsize() == 1
+    assert metricas.valor(METRICA_DESCARTADOS) == antes + 2
+
+
+@pytest.mark.asyncio
+async def test_request_id_propagado_o_generado():
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+    
+    @app.get("/id")
+    async def ver_id():
+        return {"request_id": request_id_actual.get()}
+    
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/id", headers={HEADER_REQUEST_ID: "cliente-1"})
+        assert response.headers[HEADER_REQUEST_ID] == "cliente-1"
+        assert response.json()["request_id"] == "cliente-1"
+        
+        response = await client.get("/id")
+        generado = response.headers[HEADER_REQUEST_ID]
+        assert len(generado) == 32
+        assert response.json()["request_id"] == generado
+    assert request_id_actual.get() is None
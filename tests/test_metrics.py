@@ -0,0 +1,18 @@
+"""Tests for the Prometheus metrics registry."""
+
+from app.core.metrics import Metricas
+
+
+def test_exportar_sin_perder_precision():
+    metricas = Metricas()
+    metricas.incrementar("peticiones_total", 1234567)
+    metricas.incrementar("bytes_total", 0.1)
+    metricas.incrementar("bytes_total", 0.2)
+    for _ in range(3):
+        metricas.observar("duracion_segundos", 1234.56789, ruta="/a")
+    
+    lineas = metricas.exportar().splitlines()
+    assert "peticiones_total 1234567" in lineas
+    assert f"bytes_total {0.1 + 0.2!r}" in lineas
+    assert 'duracion_segundos_count{ruta="/a"} 3' in lineas
+    assert f'duracion_segundos_sum{{ruta="/a"}} {1234.56789 * 3!r}' in lineas
@@ -0,0 +1,48 @@
+"""Tests for in-place upgrades of existing tables."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from app.db.migraciones import migrar_paciente_id
+from app.repositories import EjercicioRepository, RegistroRepository
+
+# Tables as created before patients existed
+ESQUEMA_ANTERIOR = [
+    """CREATE TABLE ejercicios (
+        id VARCHAR NOT NULL PRIMARY KEY, nombre VARCHAR NOT NULL, categoria VARCHAR NOT NULL,
+        umbral_dolor_max INTEGER NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+    )""",
+    "CREATE UNIQUE INDEX ix_ejercicios_nombre ON ejercicios (nombre)",
+    """CREATE TABLE registros (
+        id INTEGER NOT NULL PRIMARY KEY, fecha DATETIME NOT NULL, series INTEGER NOT NULL,
+        reps INTEGER NOT NULL, peso FLOAT NOT NULL, dolor_intra INTEGER NOT NULL, dolor_24h INTEGER,
+        notas VARCHAR, ejercicio_id VARCHAR NOT NULL REFERENCES ejercicios (id)
+    )""",
+    "INSERT INTO ejercicios VALUES ('e1', 'Sentadilla', 'Fuerza', 4, '2024-01-01', '2024-01-01')",
+    "INSERT INTO registros VALUES (1, '2024-01-02', 3, 10, 20.0, 2, NULL, NULL, 'e1')"
+]
+
+
+@pytest.mark.asyncio
+async def test_tablas_anteriores_pasan_al_paciente_por_defecto(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'antigua.db'}")
+    async with engine.begin() as conn:
+        for sentencia in ESQUEMA_ANTERIOR:
+            await conn.execute(text(sentencia))
+        assert await conn.run_sync(migrar_paciente_id, "ana") == ["ejercicios", "registros"]
+        await conn.run_sync(SQLModel.metadata.create_all)
+        # Already migrated
+        assert await conn.run_sync(migrar_paciente_id, "ana") == []
+    
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        registros = await RegistroRepository(session, "ana").get_all()
+        assert [r.ejercicio_id for r in registros] == ["e1"]
+        assert await RegistroRepository(session, "luis").get_all() == []
+        # The name is now unique per patient only
+        propio = await EjercicioRepository(session, "luis").get_or_create("Sentadilla", categoria="Fuerza")
+        assert propio.id != "e1"
+        await session.commit()
+    await engine.dispose()
@@ -0,0 +1,112 @@
+import pytest
+from httpx import AsyncClient
+
+from app.services.nombres_service import IndiceTrigramas, normalizar_nombre, similitud, trigramas
+
+
+def test_trigramas_como_pg_trgm():
+    """Words are padded like pg_trgm: two spaces before, one after."""
+    assert trigramas("Remo") == {"  r", " re", "rem", "emo", "mo "}
+    assert normalizar_nombre("Elevación de Talones") == "elevacion de talones"
+    assert similitud("Búlgaras", "bulgaras") == 1.0
+
+
+def test_indice_trigramas_mejor_coincidencia():
+    indice = IndiceTrigramas()
+    for clave, nombre in enumerate(["Sentadilla", "Sentadilla Búlgara", "Press de Banca", "Remo con Barra"]):
+        indice.add(clave, nombre)
+    
+    assert indice.buscar("sentadillas bulgaras", umbral=0.6)[0] == 1
+    assert indice.buscar("press banca", umbral=0.6)[0] == 2
+    # Shorter names are not absorbed by longer ones containing them
+    assert indice.buscar("remo", umbral=0.6) is None
+    # Names that differ only in a number are different exercises
+    indice.add(4, "Plancha Nivel 1")
+    assert indice.buscar("plancha nivel 2", umbral=0.6) is None
+    assert indice.buscar("plancha nivel 1", umbral=0.6)[0] == 4
+    assert indice.buscar("", umbral=0.6) is None
+
+
+@pytest.mark.asyncio
+async def test_registro_reutiliza_ejercicio_similar(client: AsyncClient):
+    """Accent-less, plural or misspelt names resolve to the existing ejercicio."""
+    for nombre in ["Sentadilla Búlgara", "sentadillas bulgaras", "Sentadila bulgara"]:
+        response = await client.post(
+            "/api/v1/registros/",
+            json={"ejercicio_nombre": nombre, "series": 3, "reps": 10, "peso": 12, "dolor_intra": 2}
+        )
+        assert response.status_code == 201
+        assert response.json()["ejercicio_nombre"] == "Sentadilla Búlgara"
+    
+    await client.post(
+        "/api/v1/registros/",
+        json={"ejercicio_nombre": "Sentadilla", "series": 3, "reps": 10, "peso": 20, "dolor_intra": 1}
+    )
+    ejercicios = (await client.get("/api/v1/ejercicios/")).json()
+    assert sorted(e["nombre"] for e in ejercicios) == ["Sentadilla", "Sentadilla Búlgara"]
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_many_resuelve_en_una_pasada(test_session):
+    """A batch resolves similar names together and later lookups see the ejercicios it created."""
+    from app.repositories import EjercicioRepository
+    
+    repo = EjercicioRepository(test_session, "ana")
+    await repo.get_or_create("Sentadilla Búlgara")
+    assert await repo.buscar_similar("press banca") is None  # Builds the name index
+    
+    resueltos = await repo.get_or_create_many(
+        ["sentadillas bulgaras", "Press de Banca", "press banca", "Remo"]
+    )
+    assert resueltos["sentadillas bulgaras"].nombre == "Sentadilla Búlgara"
+    assert resueltos["press banca"] is resueltos["Press de Banca"]
+    assert (await repo.buscar_similar("Press de banca")).id == resueltos["Press de Banca"].id
+    assert (await repo.get_or_create("remo")).id == resueltos["Remo"].id
+    assert len(await repo.get_all()) == 3
+
+
+@pytest.mark.asyncio
+async def test_indice_de_nombres_compartido_entre_peticiones(test_engine):
+    """Requests reuse a patient's name index until the change log shows a new ejercicio."""
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.repositories import EjercicioRepository, RegistroRepository, get_indices_nombres
+    from app.schemas import RegistroCreate
+    
+    async_session = sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    indices = get_indices_nombres()
+    
+    async with async_session() as session:
+        sentadilla = await EjercicioRepository(session, "ana").get_or_create("Sentadilla Búlgara")
+        await session.commit()
+    async with async_session() as session:
+        assert (await EjercicioRepository(session, "ana").buscar_similar("sentadillas bulgaras")).nombre == "Sentadilla Búlgara"
+        indice = indices._indices["ana"][1]
+    
+    # New registros move the counter but leave the catalog alone
+    async with async_session() as session:
+        await RegistroRepository(session, "ana").create(
+            RegistroCreate(ejercicio_nombre="Sentadilla Búlgara", series=3, reps=10, peso=20, dolor_intra=2),
+            sentadilla.id
+        )
+        await session.commit()
+    async with async_session() as session:
+        assert await EjercicioRepository(session, "ana").buscar_similar("press banca") is None
+        assert indices._indices["ana"][1] is indice
+    
+    # An uncommitted ejercicio stays out of the shared index
+    async with async_session() as session:
+        await EjercicioRepository(session, "ana").get_or_create("Press de Banca")
+        assert (await EjercicioRepository(session, "ana").buscar_similar("press banca")).nombre == "Press de Banca"
+        await session.rollback()
+    async with async_session() as session:
+        assert await EjercicioRepository(session, "ana").buscar_similar("press banca") is None
+        assert indices._indices["ana"][1] is indice
+    
+    # A committed one rebuilds it
+    async with async_session() as session:
+        await EjercicioRepository(session, "ana").get_or_create("Press de Banca")
+        await session.commit()
+    async with async_session() as session:
+        assert (await EjercicioRepository(session, "ana").buscar_similar("press banca")).nombre == "Press de Banca"
+        assert indices._indices["ana"][1] is not indice
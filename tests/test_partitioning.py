@@ -0,0 +1,23 @@
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.db.partitioning import _add_months, _partitioned_copy, monthly_partition_name
+
+
+class TestMonthlyPartitions:
+    """Tests for the monthly registros partition helpers."""
+
+    def test_add_months_crosses_year(self):
+        assert _add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert _add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+    def test_partition_name(self):
+        assert monthly_partition_name(date(2025, 3, 17)) == "registros_y2025m03"
+
+    def test_range_ddl_includes_partition_key_in_primary_key(self):
+        tabla = _partitioned_copy("RANGE (fecha)", ["fecha", "paciente_id"])
+        ddl = str(CreateTable(tabla).compile(dialect=postgresql.dialect()))
+        assert "PRIMARY KEY (id, fecha, paciente_id)" in ddl
+        assert "PARTITION BY RANGE (fecha)" in ddl
@@ -0,0 +1,108 @@
+"""Tests for on-demand request profiling."""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.core.config import get_settings
+from app.core.profiling import HEADER_PROFILE_ID, ProfilingMiddleware, ruta_perfil
+
+
+async def _esperar_perfil(directorio, perfil_id: str):
+    # The sampler thread writes the file once the response is sent
+    for _ in range(200):
+        ruta = ruta_perfil(str(directorio), perfil_id)
+        if ruta is not None:
+            return ruta
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Profile {perfil_id} not written")
+
+
+@pytest.fixture
+def profiling(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    monkeypatch.setattr(settings, "profiling_token", "secreto")
+    monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+    return settings
+
+
+@pytest.mark.asyncio
+async def test_perfil_muestrea_cpu_y_esperas(profiling, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "profiling_max_archivos", 1)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    
+    def calcular():
+        return sum(i * i for i in range(300_000))
+    
+    @app.get("/lenta")
+    async def lenta():
+        await asyncio.sleep(0.05)
+        return {"total": calcular()}
+    
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert HEADER_PROFILE_ID not in (await client.get("/lenta")).headers
+        assert HEADER_PROFILE_ID not in (await client.get("/lenta", headers={"X-Profile": "otro"})).headers
+        
+        response = await client.get("/lenta", headers={"X-Profile": "secreto"})
+        perfil_id = response.headers[HEADER_PROFILE_ID]
+        documento = json.loads((await _esperar_perfil(tmp_path, perfil_id)).read_text())
+        
+        nombres = [frame["name"] for frame in documento["shared"]["frames"]]
+        assert "[await]" in nombres
+        assert any(nombre.endswith("<locals>.calcular") for nombre in nombres)
+        perfil = documento["profiles"][0]
+        assert perfil["name"] == "GET /lenta"
+        assert len(perfil["samples"]) == len(perfil["weights"]) > 0
+        assert perfil["endValue"] >= 50
+        
+        # Only the newest profiling_max_archivos are kept
+        otro = await client.get("/lenta", headers={"X-Profile": "secreto"})
+        await _esperar_perfil(tmp_path, otro.headers[HEADER_PROFILE_ID])
+        assert ruta_perfil(str(tmp_path), perfil_id) is None
+
+
+@pytest.mark.asyncio
+async def test_admin_lista_y_descarga_perfiles(client: AsyncClient, profiling, tmp_path):
+    response = await client.get("/api/v1/ejercicios/", headers={"X-Profile": "secreto"})
+    perfil_id = response.headers[HEADER_PROFILE_ID]
+    await _esperar_perfil(tmp_path, perfil_id)
+    
+    assert (await client.get("/api/v1/admin/profiles")).status_code == 403
+    cabeceras = {"X-Profile-Token": "secreto"}
+    perfiles = (await client.get("/api/v1/admin/profiles", headers=cabeceras)).json()
+    assert [p["id"] for p in perfiles] == [perfil_id]
+    assert perfiles[0]["bytes"] > 0
+    
+    descarga = await client.get(f"/api/v1/admin/profiles/{perfil_id}", headers=cabeceras)
+    assert descarga.status_code == 200
+    assert descarga.json()["name"].startswith("GET /api/v1/ejercicios/")
+    assert descarga.json()["profiles"][0]["type"] == "sampled"
+    assert (await client.get("/api/v1/admin/profiles/..%2Fsecreto", headers=cabeceras)).status_code == 404
+    
+    profiling.profiling_enabled = False
+    assert (await client.get("/api/v1/admin/profiles", headers=cabeceras)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_perfil_limita_las_muestras(profiling, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "profiling_max_muestras", 5)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    
+    @app.get("/larga")
+    async def larga():
+        await asyncio.sleep(0.1)
+        return {}
+    
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/larga", headers={"X-Profile": "secreto"})
+        documento = json.loads((await _esperar_perfil(tmp_path, response.headers[HEADER_PROFILE_ID])).read_text())
+    
+    perfil = documento["profiles"][0]
+    assert len(perfil["samples"]) == len(perfil["weights"]) == 5
+    assert "sampled)" in documento["name"]
@@ -4,6 +4,7 @@ from app.services.progresion_service import (
     calcular_estado_semaforo,
     generar_recomendacion_progresion,
     calcular_nueva_carga,
+    calcular_siguiente_sesion,
     evaluar_dolor_24h
 )
 
@@ -93,3 +94,27 @@ class TestEvaluarDolor24h:
         result = evaluar_dolor_24h(dolor_intra=3, dolor_24h=7)
         assert result["interpretacion"] == "respuesta_excesiva"
         assert result["puede_progresar"] == False
+
+
+class TestCalcularSiguienteSesion:
+    """Tests for calcular_siguiente_sesion function."""
+    
+    def test_progresa_peso(self):
+        sesion = calcular_siguiente_sesion(3, 10, 20.0, dolor_intra=2)
+        assert (sesion["series"], sesion["reps"], sesion["peso"]) == (3, 10, 21.5)
+        assert sesion["volumen"] == 645
+    
+    def test_sin_peso_progresa_reps(self):
+        sesion = calcular_siguiente_sesion(3, 10, 0, dolor_intra=2)
+        assert (sesion["reps"], sesion["peso"]) == (11, 0)
+    
+    def test_respuesta_24h_excesiva_reduce(self):
+        respuesta = evaluar_dolor_24h(dolor_intra=2, dolor_24h=7)
+        sesion = calcular_siguiente_sesion(3, 10, 20.0, dolor_intra=2, respuesta_24h=respuesta)
+        assert sesion["estado"] == "rojo"
+        assert sesion["peso"] < 20
+    
+    def test_respuesta_24h_optima_no_limita(self):
+        respuesta = evaluar_dolor_24h(dolor_intra=2, dolor_24h=1)
+        sesion = calcular_siguiente_sesion(3, 10, 20.0, dolor_intra=2, respuesta_24h=respuesta)
+        assert sesion["estado"] == "verde"
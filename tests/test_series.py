@@ -0,0 +1,101 @@
+"""Tests for the in-memory series store."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+
+from app.core.config import get_settings
+from app.models import Registro
+from app.repositories import EjercicioRepository, RegistroRepository
+from app.schemas import RegistroCreate
+from app.services.series_service import AlmacenSeries, SerieEjercicio
+
+
+def test_serie_upsert_ordena_y_actualiza():
+    base = datetime(2025, 3, 1, 10)
+    serie = SerieEjercicio(capacidad=2)
+    serie.upsert(1, base, 300.0, 2, None)
+    serie.upsert(2, base + timedelta(days=2), 360.0, 3, None)
+    # Out of order: shifted in, and the arrays grow past their capacity
+    serie.upsert(3, base + timedelta(days=1), 330.0, 1, 4)
+    serie.upsert(2, base + timedelta(days=2), 360.0, 3, 5)
+    
+    assert len(serie) == 3
+    assert serie.ids[:serie.n].tolist() == [1, 3, 2]
+    assert [p["dolor_24h"] for p in serie.tendencia(10)] == [None, 4, 5]
+    assert [p["volumen_total"] for p in serie.tendencia(2)] == [330.0, 360.0]
+    
+    rango = serie.tendencia(10, desde=base + timedelta(hours=1), hasta=base + timedelta(days=2))
+    assert [p["fecha"] for p in rango] == [base + timedelta(days=1)]
+    assert serie.carga_diaria() == [
+        (base.date() + timedelta(days=i), 1, volumen) for i, volumen in enumerate([300.0, 330.0, 360.0])
+    ]
+
+
+@pytest.mark.asyncio
+async def test_tendencias_servidas_desde_memoria(client: AsyncClient):
+    """Test trends reflect new registros and dolor_24h updates."""
+    creados = []
+    for peso in (10, 12):
+        response = await client.post(
+            "/api/v1/registros/",
+            json={"ejercicio_nombre": "Puente", "series": 3, "reps": 10, "peso": peso, "dolor_intra": 2}
+        )
+        creados.append(response.json())
+    ejercicios = (await client.get("/api/v1/ejercicios/")).json()
+    ejercicio_id = next(e["id"] for e in ejercicios if e["nombre"] == "Puente")
+    
+    puntos = (await client.get(f"/api/v1/informes/tendencias/{ejercicio_id}")).json()
+    assert [p["volumen_total"] for p in puntos] == [300, 360]
+    
+    await client.patch(f"/api/v1/registros/{creados[0]['id']}/dolor-24h", json={"dolor_24h": 3})
+    puntos = (await client.get(f"/api/v1/informes/tendencias/{ejercicio_id}")).json()
+    assert [p["dolor_24h"] for p in puntos] == [3, None]
+    
+    desde = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    response = await client.get(f"/api/v1/informes/tendencias/{ejercicio_id}", params={"desde": desde})
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_almacen_recupera_escrituras_de_otros_procesos(test_session):
+    """Test a loaded patient catches up writes it did not see from the change log."""
+    almacen = AlmacenSeries(refresco=0)
+    ejercicio = await EjercicioRepository(test_session, "ana").get_or_create("Plancha")
+    repo = RegistroRepository(test_session, "ana")
+    await repo.create(RegistroCreate(ejercicio_nombre="Plancha", series=3, reps=1, peso=0, dolor_intra=1), ejercicio.id)
+    await test_session.commit()
+    
+    paciente = await almacen.obtener(test_session, "ana")
+    assert paciente.total == 1
+    
+    # Committed through the global store: this one only learns about it from the change log
+    await repo.create(RegistroCreate(ejercicio_nombre="Plancha", series=3, reps=1, peso=0, dolor_intra=5), ejercicio.id)
+    await test_session.commit()
+    paciente = await almacen.obtener(test_session, "ana")
+    assert paciente.total == 2
+    assert paciente.estadisticas()["promedio_dolor_intra"] == 3
+
+
+@pytest.mark.asyncio
+async def test_pendientes_antiguos_se_listan_sin_ventana(test_session, monkeypatch):
+    """Test registros pending dolor_24h for months are listed unless a window is configured."""
+    ejercicio = await EjercicioRepository(test_session, "ana").get_or_create("Plancha")
+    repo = RegistroRepository(test_session, "ana")
+    registro = await repo.create(
+        RegistroCreate(ejercicio_nombre="Plancha", series=3, reps=1, peso=0, dolor_intra=1), ejercicio.id
+    )
+    await test_session.execute(
+        update(Registro).where(Registro.id == registro.id).values(fecha=datetime.utcnow() - timedelta(days=90))
+    )
+    await test_session.commit()
+    
+    assert [r.id for r in await repo.get_pending_dolor_24h()] == [registro.id]
+    paciente = await AlmacenSeries(refresco=0).obtener(test_session, "ana")
+    assert paciente.estadisticas()["pendientes_dolor_24h"] == 1
+    
+    monkeypatch.setattr(get_settings(), "pendientes_max_dias", 30)
+    assert await repo.get_pending_dolor_24h() == []
+    assert paciente.estadisticas()["pendientes_dolor_24h"] == 0